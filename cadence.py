@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+
+# Odstępy zadań (sekundy): (w trakcie streama, poza streamem)
+CADENCE_POLICY = {
+    'followers': (15, 120),
+    'subscribers': (15, 300),
+    'permissions': (int(os.getenv("PERMISSIONS_RECONCILE_INTERVAL", "1800")), 3600),
+    'stream_monitor': (60, 90),
+}
+
+# Zadania uruchamiane od razu po wykryciu startu streama (nadrobienie zaległości)
+CATCH_UP_JOBS = ('followers', 'subscribers', 'permissions')
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+class AdaptiveCadence:
+    """Dopasowuje częstotliwość zadań harmonogramu do stanu streama (LIVE szybko, OFFLINE wolno)"""
+
+    def __init__(self, scheduler, helix=None, policy=None):
+        self.scheduler = scheduler
+        self.helix = helix
+        self.policy = policy or CADENCE_POLICY
+        self.lock = threading.Lock()
+        self.state = 'offline'  # Do pierwszego sprawdzenia streama zakładamy wolne tempo
+        self.state_since = time.time()
+        self.time_in_state = {'live': 0.0, 'offline': 0.0}
+        self.transitions = 0
+        if self.helix:
+            self.helix.set_stream_state(self.state)
+
+    def interval_for(self, name):
+        """Zwraca odstęp zadania dla aktualnego stanu"""
+        live_interval, offline_interval = self.policy[name]
+        return live_interval if self.state == 'live' else offline_interval
+
+    def set_live(self, is_live):
+        """Aktualizuje stan streama; przy zmianie przestawia odstępy zadań. Zwraca True przy zmianie"""
+        new_state = 'live' if is_live else 'offline'
+        with self.lock:
+            if new_state == self.state:
+                return False
+            now = time.time()
+            self.time_in_state[self.state] += now - self.state_since
+            self.state = new_state
+            self.state_since = now
+            self.transitions += 1
+
+        if self.helix:
+            self.helix.set_stream_state(new_state)
+        for name in self.policy:
+            self.scheduler.set_interval(name, self.interval_for(name))
+
+        if is_live:
+            # Nadrób zaległości od razu zamiast czekać na kolejny cykl
+            for name in CATCH_UP_JOBS:
+                self.scheduler.run_now(name)
+        safe_print(f"⏱️ Tempo zadań: {'LIVE (szybkie)' if is_live else 'OFFLINE (wolne)'}")
+        return True
+
+    def get_stats(self):
+        """Zwraca stan, czas w każdym stanie i aktualne odstępy zadań"""
+        with self.lock:
+            time_in_state = dict(self.time_in_state)
+            time_in_state[self.state] += time.time() - self.state_since
+            return {
+                'state': self.state,
+                'transitions': self.transitions,
+                'time_in_state': {state: round(seconds) for state, seconds in time_in_state.items()},
+                'intervals': {name: self.interval_for(name) for name in self.policy},
+                'helix_calls_by_state': dict(self.helix.calls_by_state) if self.helix else {}
+            }
@@ -0,0 +1,507 @@
+import os
+import json
+import time
+import queue
+import socket
+import itertools
+import threading
+from concurrent.futures import Future
+from database import UserDatabase
+
+# Tryb usługi danych: bot Twitch jest właścicielem bazy, pozostałe procesy wysyłają mu zapytania
+# (a gdy go nie ma - wykonują je lokalnie jak dotąd). Wyłączony = każdy proces pisze sam
+DATA_SERVICE_ENABLED = os.getenv("DATA_SERVICE", "false").lower() == "true"
+DATA_SERVICE_HOST = "127.0.0.1"
+DATA_SERVICE_PORT = int(os.getenv("DATA_SERVICE_PORT", "8766"))
+DATA_SERVICE_TOKEN = os.getenv("DATA_SERVICE_TOKEN", "")
+DATA_SERVICE_TIMEOUT = 15      # Maksymalny czas oczekiwania na odpowiedź (sekundy)
+DATA_SERVICE_RETRY = 30        # Po utracie połączenia klient pracuje lokalnie tyle sekund przed ponowną próbą
+GROUP_COMMIT_MAX = 100         # Ile zapisów najwyżej trafia do jednej transakcji
+DATA_SERVICE_CLIENT_QUEUE = 1000  # Klient z tyloma nieodebranymi odpowiedziami jest rozłączany
+
+# Metody UserDatabase dostępne przez usługę. Zapisy (również get_user, który tworzy brakującego
+# użytkownika) wykonuje jeden wątek zapisu, odczyty - od razu
+WRITE_METHODS = {
+    'get_user', 'add_points', 'remove_points', 'add_message', 'daily_bonus',
+    'update_game_stats', 'set_user_points', 'reset_all_points'
+}
+READ_METHODS = {
+    'get_data_version', 'get_total_users_count', 'get_total_points_distributed', 'get_top_users',
+    'get_all_users_with_points', 'get_user_points', 'get_daily_stats', 'get_ranking_page', 'get_user_profile'
+}
+# Tych nie łączymy w paczki (backup pliku bazy w trakcie transakcji)
+EXCLUSIVE_METHODS = {'reset_all_points'}
+
+class DataServiceError(Exception):
+    """Błąd usługi danych (utracone połączenie z właścicielem bazy w trakcie zapytania)"""
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def encode_message(message):
+    """Wiadomość protokołu: jedna linia JSON"""
+    return (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
+class ServiceConnection:
+    """Połączenie klienta po stronie właściciela - własna kolejka i wątek wysyłki odpowiedzi.
+
+    Odpowiedzi na zapisy powstają w wątku zapisu - nie może on czekać na gniazdo wolnego klienta.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=DATA_SERVICE_CLIENT_QUEUE)
+        self.closed = False
+        threading.Thread(target=self._writer_loop, name='data-service-reply', daemon=True).start()
+
+    def send(self, message):
+        """Dokłada odpowiedź do kolejki (nie blokuje). Klient, który nie nadąża, jest rozłączany"""
+        try:
+            self.queue.put_nowait(encode_message(message))
+        except queue.Full:
+            safe_print("⚠️ Usługa danych: klient nie odbiera odpowiedzi - rozłączam")
+            self.close()
+
+    def _writer_loop(self):
+        try:
+            while True:
+                payload = self.queue.get()
+                if payload is None:
+                    return
+                self.conn.sendall(payload)
+        except OSError:
+            self.close()
+        finally:
+            self.conn.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class DataService:
+    """Właściciel bazy użytkowników - jedyny proces, który do niej pisze.
+
+    Zapisy (lokalne i od klientów) trafiają do kolejki jednego wątku, który wykonuje wszystko,
+    co się w niej zebrało, w jednej transakcji (każde wywołanie we własnym SAVEPOINT) i zatwierdza
+    raz. Odczyty idą od razu do bazy. Udostępnia to samo API co UserDatabase.
+    """
+
+    def __init__(self, db, port=DATA_SERVICE_PORT):
+        self.db = db
+        self.db_path = db.db_path
+        self.port = port
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.server = None
+
+        # Statystyki
+        self.writes = 0
+        self.reads = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.errors = 0
+        self.clients = 0
+        self.total_commit_time = 0.0
+
+        threading.Thread(target=self._writer_loop, name='data-service-writer', daemon=True).start()
+
+    def __getattr__(self, name):
+        if name in WRITE_METHODS:
+            return lambda *args, **kwargs: self.submit(name, args, kwargs).result()
+        if name in READ_METHODS:
+            return lambda *args, **kwargs: self.read(name, args, kwargs)
+        raise AttributeError(name)
+
+    def add_listener(self, callback):
+        self.db.add_listener(callback)
+
+    # === ZAPISY (GROUP COMMIT) ===
+
+    def submit(self, name, args=(), kwargs=None):
+        """Dokłada zapis do kolejki. Zwraca Future z wynikiem metody"""
+        future = Future()
+        self.queue.put((name, list(args), kwargs or {}, future))
+        return future
+
+    def read(self, name, args=(), kwargs=None):
+        with self.lock:
+            self.reads += 1
+        return getattr(self.db, name)(*args, **(kwargs or {}))
+
+    def _writer_loop(self):
+        """Zbiera zapisy z kolejki i zatwierdza je paczkami"""
+        while True:
+            items = [self.queue.get()]
+            while len(items) < GROUP_COMMIT_MAX and items[-1][0] not in EXCLUSIVE_METHODS:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[0] in EXCLUSIVE_METHODS:
+                    # Wykonaj osobno po bieżącej paczce
+                    self._run_batch(items)
+                    items = [item]
+                    break
+                items.append(item)
+            self._run_batch(items)
+
+    def _run_batch(self, items):
+        """Wykonuje zapisy w jednej transakcji; błąd jednego wywołania nie psuje pozostałych"""
+        if len(items) == 1 and items[0][0] in EXCLUSIVE_METHODS:
+            name, args, kwargs, future = items[0]
+            try:
+                future.set_result(getattr(self.db, name)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            with self.lock:
+                self.writes += 1
+                self.batches += 1
+            return
+
+        results = []
+        started = time.monotonic()
+        try:
+            with self.db.batch() as conn:
+                for name, args, kwargs, future in items:
+                    conn.execute('SAVEPOINT call')
+                    try:
+                        result = getattr(self.db, name)(*args, **kwargs)
+                        conn.execute('RELEASE call')
+                        results.append((future, result, None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO call')
+                        conn.execute('RELEASE call')
+                        results.append((future, None, e))
+        except Exception as e:
+            # Nie udało się zatwierdzić paczki - żadne wywołanie nie zostało zapisane
+            safe_print(f"❌ Usługa danych: błąd zatwierdzania paczki {len(items)} zapisów: {e}")
+            results = [(item[3], None, e) for item in items]
+
+        with self.lock:
+            self.writes += len(items)
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(items))
+            self.total_commit_time += time.monotonic() - started
+            self.errors += sum(1 for _, _, error in results if error is not None)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # === SERWER DLA INNYCH PROCESÓW ===
+
+    def serve(self):
+        """Nasłuchuje zapytań klientów na 127.0.0.1. Zwraca False gdy port jest zajęty"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name == 'nt':
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server.bind((DATA_SERVICE_HOST, self.port))
+            server.listen(16)
+        except OSError as e:
+            server.close()
+            safe_print(f"❌ Usługa danych: nie można nasłuchiwać na porcie {self.port}: {e}")
+            return False
+        self.server = server
+        threading.Thread(target=self._accept_loop, name='data-service', daemon=True).start()
+        safe_print(f"🗄️ Usługa danych: właściciel bazy {self.db_path} na porcie {self.port}")
+        return True
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._client_loop, args=(conn,), name='data-service-client', daemon=True).start()
+
+    def _client_loop(self, conn):
+        """Obsługuje zapytania jednego klienta - może wysłać wiele naraz, odpowiedzi mają jego id.
+
+        Odczyt czeka na wcześniejsze zapisy tego samego klienta, więc klient widzi własne zmiany.
+        """
+        client = ServiceConnection(conn)
+        last_write = None
+        authorized = not DATA_SERVICE_TOKEN
+
+        def reply(request_id, result=None, error=None):
+            # Tylko kolejka - wywoływane też z wątku zapisu (callback Future)
+            client.send({'id': request_id, 'result': result} if error is None else {'id': request_id, 'error': str(error)})
+
+        with self.lock:
+            self.clients += 1
+        try:
+            for line in conn.makefile('rb'):
+                request = json.loads(line)
+                request_id = request.get('id')
+                if not authorized:
+                    if request.get('token') != DATA_SERVICE_TOKEN:
+                        reply(request_id, error="Nieprawidłowy token usługi danych")
+                        return
+                    authorized = True
+                    reply(request_id, result=True)
+                    continue
+
+                name = request.get('method')
+                args, kwargs = request.get('args', []), request.get('kwargs', {})
+                if name in WRITE_METHODS:
+                    last_write = self.submit(name, args, kwargs)
+                    last_write.add_done_callback(
+                        lambda future, request_id=request_id: reply(
+                            request_id,
+                            result=None if future.exception() else future.result(),
+                            error=future.exception()
+                        )
+                    )
+                elif name in READ_METHODS:
+                    if last_write is not None:
+                        try:
+                            last_write.result()
+                        except Exception:
+                            pass
+                    try:
+                        reply(request_id, result=self.read(name, args, kwargs))
+                    except Exception as e:
+                        reply(request_id, error=e)
+                else:
+                    reply(request_id, error=f"Nieznana metoda: {name}")
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.clients -= 1
+            # Wątek wysyłki kończy się na znaczniku końca - oczekujące odpowiedzi zostaną wysłane
+            try:
+                client.queue.put_nowait(None)
+            except queue.Full:
+                client.close()
+
+    def get_stats(self):
+        """Zwraca statystyki usługi"""
+        with self.lock:
+            return {
+                'mode': 'owner',
+                'listening': self.server is not None,
+                'clients': self.clients,
+                'queued': self.queue.qsize(),
+                'writes': self.writes,
+                'reads': self.reads,
+                'batches': self.batches,
+                'avg_batch': round(self.writes / self.batches, 2) if self.batches else 0.0,
+                'max_batch': self.max_batch,
+                'errors': self.errors,
+                'avg_commit_ms': round(self.total_commit_time / self.batches * 1000, 2) if self.batches else 0.0
+            }
+
+class DataServiceClient:
+    """Klient usługi danych z API UserDatabase.
+
+    Wiele wątków może wysyłać zapytania jednym połączeniem naraz (odpowiedzi dopasowywane po id).
+    Gdy właściciela bazy nie ma, wywołania wykonuje lokalny UserDatabase (jak bez usługi)
+    i co DATA_SERVICE_RETRY sekund klient próbuje wrócić do usługi.
+    """
+
+    def __init__(self, db_path="users.db", port=DATA_SERVICE_PORT, **db_options):
+        self.db_path = db_path
+        self.db_options = db_options  # Opcje lokalnego UserDatabase (np. pooled=True w web API)
+        self.port = port
+        self.lock = threading.Lock()
+        self.sock = None
+        self.pending = {}  # id zapytania -> Future
+        self.ids = itertools.count(1)
+        self.retry_at = 0
+        self.local_db = None
+        self.listeners = []
+
+        # Statystyki
+        self.remote_calls = 0
+        self.local_calls = 0
+        self.failures = 0
+        self.connects = 0
+
+    def __getattr__(self, name):
+        if name in WRITE_METHODS or name in READ_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def add_listener(self, callback):
+        """Słuchacze działają tylko dla zapisów lokalnych - zmiany przez usługę zgłasza właściciel bazy"""
+        with self.lock:
+            self.listeners.append(callback)
+            if self.local_db is not None:
+                self.local_db.add_listener(callback)
+
+    def call(self, name, *args, **kwargs):
+        """Wywołuje metodę UserDatabase w usłudze albo lokalnie, gdy usługa jest niedostępna"""
+        future = self._send(name, args, kwargs)
+        if future is None:
+            with self.lock:
+                self.local_calls += 1
+            return getattr(self._get_local_db(), name)(*args, **kwargs)
+        try:
+            return future.result(DATA_SERVICE_TIMEOUT)
+        except DataServiceError:
+            raise
+        except TimeoutError:
+            # Zapis mógł zostać wykonany - nie powtarzamy go lokalnie
+            raise DataServiceError(f"Usługa danych nie odpowiedziała na {name}")
+
+    def _send(self, name, args, kwargs):
+        """Wysyła zapytanie. Zwraca Future albo None, gdy trzeba działać lokalnie"""
+        with self.lock:
+            if self.sock is None and not self._connect_locked():
+                return None
+            request_id = next(self.ids)
+            future = Future()
+            self.pending[request_id] = future
+            try:
+                self.sock.sendall(encode_message({'id': request_id, 'method': name, 'args': list(args), 'kwargs': kwargs}))
+            except OSError:
+                self.pending.pop(request_id, None)
+                self._disconnect_locked()
+                return None  # Nic nie zostało wysłane - bezpiecznie wykonać lokalnie
+            self.remote_calls += 1
+            return future
+
+    def _connect_locked(self):
+        """Łączy z właścicielem bazy - wywoływać pod lockiem"""
+        if time.monotonic() < self.retry_at:
+            return False
+        try:
+            sock = socket.create_connection((DATA_SERVICE_HOST, self.port), timeout=5)
+            reader = sock.makefile('rb')
+            if DATA_SERVICE_TOKEN:
+                sock.sendall(encode_message({'id': 0, 'token': DATA_SERVICE_TOKEN}))
+                if 'error' in json.loads(reader.readline()):
+                    raise OSError("usługa danych odrzuciła token")
+            sock.settimeout(None)
+        except (OSError, ValueError) as e:
+            self.retry_at = time.monotonic() + DATA_SERVICE_RETRY
+            safe_print(f"⚠️ Usługa danych niedostępna ({e}) - zapytania wykonywane lokalnie")
+            return False
+        self.sock = sock
+        self.connects += 1
+        threading.Thread(target=self._reader_loop, args=(sock, reader), name='data-service-reader', daemon=True).start()
+        return True
+
+    def _reader_loop(self, sock, reader):
+        """Odbiera odpowiedzi i przekazuje je oczekującym wątkom"""
+        try:
+            for line in reader:
+                response = json.loads(line)
+                with self.lock:
+                    future = self.pending.pop(response.get('id'), None)
+                if future is None:
+                    continue
+                if 'error' in response:
+                    future.set_exception(DataServiceError(response['error']))
+                else:
+                    future.set_result(response.get('result'))
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            if self.sock is sock:
+                self._disconnect_locked()
+
+    def _disconnect_locked(self):
+        """Zamyka połączenie; zapytania w toku kończą się błędem - wywoływać pod lockiem"""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.sock = None
+        self.retry_at = time.monotonic() + DATA_SERVICE_RETRY
+        self.failures += 1
+        for future in self.pending.values():
+            future.set_exception(DataServiceError("Utracono połączenie z usługą danych"))
+        self.pending.clear()
+
+    def _get_local_db(self):
+        with self.lock:
+            if self.local_db is None:
+                self.local_db = UserDatabase(self.db_path, **self.db_options)
+                for callback in self.listeners:
+                    self.local_db.add_listener(callback)
+            return self.local_db
+
+    def release_connection(self):
+        """Koniec zapytania HTTP - zwalnia połączenie lokalnej bazy (jeśli była używana)"""
+        if self.local_db is not None and hasattr(self.local_db, 'release_connection'):
+            self.local_db.release_connection()
+
+    def close(self):
+        """Zamyka połączenie z usługą i lokalną bazę"""
+        with self.lock:
+            if self.sock is not None:
+                self._disconnect_locked()
+            local_db = self.local_db
+        if local_db is not None:
+            local_db.close()
+
+    def health_check(self):
+        """Sprawdza dostęp do danych (przez usługę albo lokalnie)"""
+        started = time.monotonic()
+        try:
+            self.get_data_version()
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'connected': self.sock is not None}
+        return {
+            'ok': True,
+            'latency_ms': round((time.monotonic() - started) * 1000, 2),
+            'connected': self.sock is not None
+        }
+
+    def get_stats(self):
+        """Zwraca statystyki klienta"""
+        with self.lock:
+            return {
+                'mode': 'client',
+                'connected': self.sock is not None,
+                'connects': self.connects,
+                'remote_calls': self.remote_calls,
+                'local_calls': self.local_calls,
+                'failures': self.failures,
+                'in_flight': len(self.pending)
+            }
+
+DATA_SERVICE = None
+DATA_SERVICE_LOCK = threading.Lock()
+
+def open_user_database(owner=False, db_path="users.db", **db_options):
+    """Zwraca obiekt z API UserDatabase: UserDatabase, właściciela bazy (owner=True) lub klienta usługi.
+
+    Przy włączonej usłudze obiekt jest jeden na proces - kolejne wywołania zwracają ten sam.
+    db_options trafiają do UserDatabase (pooled, maintenance).
+    """
+    global DATA_SERVICE
+    if not DATA_SERVICE_ENABLED:
+        return UserDatabase(db_path, **db_options)
+    with DATA_SERVICE_LOCK:
+        if DATA_SERVICE is None:
+            if owner:
+                DATA_SERVICE = DataService(UserDatabase(db_path, **db_options))
+                DATA_SERVICE.serve()
+            else:
+                DATA_SERVICE = DataServiceClient(db_path, **db_options)
+        return DATA_SERVICE
+
+def get_data_service_stats():
+    """Statystyki usługi danych (dla web API) - pusty słownik gdy wyłączona"""
+    return DATA_SERVICE.get_stats() if DATA_SERVICE else {'mode': 'off'}
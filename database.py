@@ -3,21 +3,122 @@ import os
 import shutil
 from datetime import datetime, timedelta
 import threading
+import time
 import glob
+from contextlib import contextmanager
+
+# Boty i konta wykluczone z rankingu
+RANKING_EXCLUDED_USERS = ['streamelements', 'moobot', 'nightbot', 'fossabot', 'wizebot', 'wuhdo', 'kranik1606', 'kranikbot']
+
+class BatchConnection:
+    """Połączenie współdzielone przez wywołania w paczce - commit i wyjście z with nie zatwierdzają"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def commit(self):
+        pass  # Zatwierdza UserDatabase.batch() raz dla całej paczki
+    
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
 
 class UserDatabase:
-    def __init__(self, db_path="users.db"):
+    def __init__(self, db_path="users.db", pooled=False, maintenance=True):
         self.db_path = db_path
         self.lock = threading.Lock()
+        # pooled=True: każdy wątek trzyma jedno otwarte połączenie zamiast otwierać je przy każdym zapytaniu
+        self.pooled = pooled
+        self.pool = {}  # Wątek -> otwarte połączenie puli (do zamknięcia w close())
+        self.pool_opened = 0
+        # maintenance=False: bez sprawdzania backupów i usuwania plików WAL (robi to proces bota)
+        self.maintenance = maintenance
+        # Cache dziennego bonusu: użytkownik -> timestamp, od którego należy się kolejny bonus
+        self.daily_bonus_next = {}
+        # Wersja danych: rośnie przy każdej zmianie punktów, użytkowników i statystyk gier.
+        # Obserwatorzy (ranking Discord, web API) porównują liczby zamiast liczyć zapytania i hashe
+        self.data_version = 0
+        self.pending_changes = []  # Użytkownicy zmienieni w bieżącej transakcji (None = wielu)
+        self.listeners = []        # Powiadamiani po zatwierdzeniu zmiany (np. szyna zdarzeń)
+        self.local = threading.local()  # Połączenie paczki (batch) i połączenie z puli - osobne dla wątku
+        self.pool_lock = threading.Lock()
         self.init_database()
     
     def get_connection(self):
-        """Tworzy nowe połączenie z bazą danych"""
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        """Tworzy nowe połączenie z bazą danych (w trakcie batch() - połączenie paczki, w puli - połączenie wątku)"""
+        batch_conn = getattr(self.local, 'batch_conn', None)
+        if batch_conn is not None:
+            return batch_conn
+        if self.pooled:
+            conn = getattr(self.local, 'pooled_conn', None)
+            if conn is None:
+                conn = self._open_connection(check_same_thread=False)
+                self.local.pooled_conn = conn
+                with self.pool_lock:
+                    # Połączenia zakończonych wątków (np. serwer deweloperski Flask - wątek na zapytanie)
+                    for thread in [t for t in self.pool if not t.is_alive()]:
+                        self.pool.pop(thread).close()
+                    self.pool[threading.current_thread()] = conn
+                    self.pool_opened += 1
+            return conn
+        return self._open_connection()
+    
+    def _open_connection(self, check_same_thread=True):
+        conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=check_same_thread)
         conn.execute('PRAGMA journal_mode=DELETE')  # Unikanie problemów z synchronizacją WAL
         conn.execute('PRAGMA synchronous=FULL')     # Pełna synchronizacja dla bezpieczeństwa danych
         return conn
     
+    def release_connection(self):
+        """Koniec zapytania HTTP: wycofuje niezatwierdzoną transakcję połączenia wątku (zostaje w puli)"""
+        conn = getattr(self.local, 'pooled_conn', None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+    
+    def reset_connection(self):
+        """Zamyka połączenie wątku z puli - kolejne zapytanie otworzy nowe (np. po błędzie)"""
+        conn = getattr(self.local, 'pooled_conn', None)
+        if conn is None:
+            return
+        self.local.pooled_conn = None
+        with self.pool_lock:
+            self.pool.pop(threading.current_thread(), None)
+        conn.close()
+    
+    def close(self):
+        """Zamyka wszystkie połączenia puli (przy zamykaniu procesu)"""
+        with self.pool_lock:
+            connections, self.pool = list(self.pool.values()), {}
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+    
+    def health_check(self):
+        """Sprawdza połączenie z bazą. Zwraca słownik ze stanem i czasem odpowiedzi"""
+        started = time.monotonic()
+        try:
+            with self.lock:
+                self.get_connection().execute('SELECT 1').fetchone()
+        except sqlite3.Error as e:
+            self.reset_connection()
+            return {'ok': False, 'error': str(e)}
+        with self.pool_lock:
+            pool_size, pool_opened = len(self.pool), self.pool_opened
+        return {
+            'ok': True,
+            'latency_ms': round((time.monotonic() - started) * 1000, 2),
+            'pooled': self.pooled,
+            'pool_size': pool_size,
+            'pool_opened': pool_opened
+        }
+    
     def _ensure_delete_mode(self):
         """Wymusza tryb DELETE i usuwa pliki WAL jeśli istnieją"""
         try:
@@ -101,11 +202,12 @@ class UserDatabase:
     def init_database(self):
         """Inicjalizuje bazę danych użytkowników"""
         with self.lock:
-            # Sprawdź integralność backupów (zabezpieczenie przed OneDrive)
-            self._check_backup_integrity()
-            
-            # Wymuszenie trybu DELETE i usunięcie plików WAL jeśli istnieją
-            self._ensure_delete_mode()
+            if self.maintenance:
+                # Sprawdź integralność backupów (zabezpieczenie przed OneDrive)
+                self._check_backup_integrity()
+                
+                # Wymuszenie trybu DELETE i usunięcie plików WAL jeśli istnieją
+                self._ensure_delete_mode()
             
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -132,6 +234,11 @@ class UserDatabase:
                     # Kolumna już istnieje
                     pass
                 
+                # Indeks rankingu: kolejność (punkty malejąco, nazwa) - strony i miejsce użytkownika bez sortowania tabeli
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_users_ranking ON users (points DESC, username)
+                ''')
+
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS game_stats (
                         username TEXT,
@@ -143,8 +250,87 @@ class UserDatabase:
                     )
                 ''')
                 
+                # Licznik wersji danych (jeden wiersz) - wspólny dla bota i web API
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS data_version (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+                cursor.execute('SELECT version FROM data_version WHERE id = 1')
+                self.data_version = cursor.fetchone()[0]
+                
                 conn.commit()
     
+    def _bump_version(self, cursor, username=None):
+        """Podbija wersję danych w tej samej transakcji co zmiana - wywoływać pod lockiem"""
+        cursor.execute('UPDATE data_version SET version = version + 1 WHERE id = 1')
+        cursor.execute('SELECT version FROM data_version WHERE id = 1')
+        self.data_version = cursor.fetchone()[0]
+        batch_changes = getattr(self.local, 'batch_changes', None)
+        (self.pending_changes if batch_changes is None else batch_changes).append(username)
+    
+    def _commit(self, conn):
+        """Zatwierdza transakcję i dopiero wtedy powiadamia słuchaczy o zmianie - wywoływać pod lockiem"""
+        conn.commit()
+        if getattr(self.local, 'batch_conn', None) is not None:
+            return  # Powiadomienie po zatwierdzeniu całej paczki
+        self._notify_changes()
+    
+    def _notify_changes(self):
+        """Przekazuje słuchaczom zatwierdzone zmiany - wywoływać pod lockiem"""
+        if not self.pending_changes:
+            return
+        users = sorted({username for username in self.pending_changes if username})
+        self.pending_changes = []
+        for callback in self.listeners:
+            try:
+                callback(self.data_version, users)
+            except Exception as e:
+                print(f"[DB] Błąd powiadomienia o zmianie danych: {e}")
+    
+    def add_listener(self, callback):
+        """Rejestruje funkcję callback(version, users) wywoływaną po zatwierdzeniu zmiany (musi być szybka)"""
+        self.listeners.append(callback)
+    
+    @contextmanager
+    def batch(self):
+        """Wykonuje wywołania metod w jednej transakcji (group commit) - jeden commit na całą paczkę.
+        
+        Zwraca połączenie, na którym można robić SAVEPOINT dla pojedynczych wywołań.
+        Działa tylko w wątku, który otworzył paczkę.
+        """
+        conn = self.get_connection()
+        self.local.batch_conn = BatchConnection(conn)
+        self.local.batch_changes = []
+        try:
+            conn.execute('BEGIN')
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        else:
+            with self.lock:
+                self.pending_changes.extend(self.local.batch_changes)
+                self._notify_changes()
+        finally:
+            self.local.batch_conn = None
+            self.local.batch_changes = None
+            if not self.pooled:
+                conn.close()  # Połączenie z puli zostaje otwarte dla wątku
+    
+    def get_data_version(self):
+        """Zwraca aktualną wersję danych (z bazy - uwzględnia zmiany zrobione przez web API)"""
+        with self.lock:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT version FROM data_version WHERE id = 1')
+                result = cursor.fetchone()
+                self.data_version = result[0] if result else 0
+                return self.data_version
+    
     def get_total_users_count(self):
         """Zwraca łączną liczbę użytkowników"""
         with self.lock:
@@ -176,10 +362,11 @@ class UserDatabase:
                 
                 cursor.execute('UPDATE users SET points = 0')
                 affected_rows = cursor.rowcount
+                self._bump_version(cursor)
                 
                 print(f"[DB] Zresetowano punkty dla {affected_rows} użytkowników")
                 
-                conn.commit()
+                self._commit(conn)
                 return affected_rows
     
     def get_user(self, username):
@@ -197,7 +384,8 @@ class UserDatabase:
                         INSERT INTO users (username, points, messages_count, last_seen, first_seen, total_time_minutes, last_daily_bonus, first_message_bonus_received)
                         VALUES (?, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 0, NULL, 0)
                     ''', (username,))
-                    conn.commit()
+                    self._bump_version(cursor, username)
+                    self._commit(conn)
                     cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
                     user = cursor.fetchone()
                 
@@ -235,7 +423,8 @@ class UserDatabase:
                     ''', (points, username))
                     print(f"[DB] Dodano punkty {username}: {old_points} -> {old_points + points} (+{points})")
                 
-                conn.commit()
+                self._bump_version(cursor, username)
+                self._commit(conn)
     
     def remove_points(self, username, points):
         """Usuwa punkty użytkownikowi (nie może zejść poniżej 0)"""
@@ -257,7 +446,8 @@ class UserDatabase:
                 new_points = max(0, old_points - points)
                 print(f"[DB] Usunięto punkty {username}: {old_points} -> {new_points} (-{points})")
                 
-                conn.commit()
+                self._bump_version(cursor, username)
+                self._commit(conn)
     
     def add_message(self, username, is_follower=True):
         """Dodaje wiadomość i punkty tylko za pierwszą wiadomość (10 pkt) - tylko dla followerów"""
@@ -278,6 +468,8 @@ class UserDatabase:
                         INSERT INTO users (username, points, messages_count, last_seen, first_seen, first_message_bonus_received)
                         VALUES (?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?)
                     ''', (username, points, 1 if is_follower else 0))
+                    self._bump_version(cursor, username)
+                    self._commit(conn)
                     return points  # Zwróć liczbę punktów za pierwszą wiadomość
                 else:
                     # Istniejący użytkownik - tylko zwiększ licznik wiadomości, bez punktów
@@ -293,28 +485,95 @@ class UserDatabase:
     
     def get_top_users(self, limit=10):
         """Pobiera ranking użytkowników (bez botów i z punktami > 0)"""
+        return self.get_ranking_page(limit)
+    
+    def get_ranking_page(self, limit=50, after_points=None, after_username=None):
+        """Strona rankingu po kluczu (punkty, nazwa) ostatniej pozycji poprzedniej strony.
+        
+        Koszt strony nie zależy od jej głębokości - zapytanie zaczyna od klucza w indeksie rankingu.
+        """
         with self.lock:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Lista botów i użytkowników do wykluczenia z rankingu
-                excluded_bots = ['streamelements', 'moobot', 'nightbot', 'fossabot', 'wizebot', 'wuhdo', 'kranik1606', 'kranikbot']
-                placeholders = ','.join(['?' for _ in excluded_bots])
+                placeholders = ','.join(['?' for _ in RANKING_EXCLUDED_USERS])
                 
-                cursor.execute(f'''
-                    SELECT username, points, messages_count 
-                    FROM users 
-                    WHERE username NOT IN ({placeholders}) AND points > 0
-                    ORDER BY points DESC 
-                    LIMIT ?
-                ''', (*excluded_bots, limit))
+                if after_points is None:
+                    cursor.execute(f'''
+                        SELECT username, points, messages_count 
+                        FROM users 
+                        WHERE username NOT IN ({placeholders}) AND points > 0
+                        ORDER BY points DESC, username ASC 
+                        LIMIT ?
+                    ''', (*RANKING_EXCLUDED_USERS, limit))
+                else:
+                    cursor.execute(f'''
+                        SELECT username, points, messages_count 
+                        FROM users 
+                        WHERE username NOT IN ({placeholders}) AND points > 0
+                          AND points <= ? AND (points < ? OR username > ?)
+                        ORDER BY points DESC, username ASC 
+                        LIMIT ?
+                    ''', (*RANKING_EXCLUDED_USERS, after_points, after_points, after_username, limit))
                 
                 return cursor.fetchall()
     
+    def get_user_profile(self, username):
+        """Punkty, miejsce w rankingu, wiadomości i statystyki gier użytkownika (None gdy nie istnieje)"""
+        with self.lock:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT username, points, messages_count, first_seen, last_seen 
+                    FROM users WHERE username = ?
+                ''', (username,))
+                user = cursor.fetchone()
+                
+                if not user:
+                    return None
+                
+                username, points, messages_count, first_seen, last_seen = user
+                
+                # Miejsce = liczba wyżej w rankingu + 1 (zakres w indeksie rankingu)
+                rank = None
+                if points > 0 and username not in RANKING_EXCLUDED_USERS:
+                    placeholders = ','.join(['?' for _ in RANKING_EXCLUDED_USERS])
+                    cursor.execute(f'''
+                        SELECT COUNT(*) FROM users 
+                        WHERE username NOT IN ({placeholders})
+                          AND points >= ? AND (points > ? OR username < ?)
+                    ''', (*RANKING_EXCLUDED_USERS, points, points, username))
+                    rank = cursor.fetchone()[0] + 1
+                
+                cursor.execute('''
+                    SELECT game_type, wins, losses, total_played 
+                    FROM game_stats WHERE username = ? ORDER BY game_type
+                ''', (username,))
+                game_stats = {
+                    game_type: {'wins': wins, 'losses': losses, 'total_played': total_played}
+                    for game_type, wins, losses, total_played in cursor.fetchall()
+                }
+                
+                return {
+                    'username': username,
+                    'points': points,
+                    'rank': rank,
+                    'messages_count': messages_count,
+                    'first_seen': first_seen,
+                    'last_seen': last_seen,
+                    'game_stats': game_stats
+                }
+    
     def daily_bonus(self, username, is_follower=True):
         """Sprawdza i daje dzienny bonus - tylko dla followerów"""
         if not is_follower:
             return 0  # Nie daj bonusu jeśli nie jest followerem
+        
+        # Szybka ścieżka dla każdej wiadomości - baza tylko gdy bonus może się należeć
+        next_eligible = self.daily_bonus_next.get(username)
+        if next_eligible is not None and time.time() < next_eligible:
+            return 0
             
         with self.lock:
             with self.get_connection() as conn:
@@ -344,12 +603,22 @@ class UserDatabase:
                         SET points = points + ?, last_daily_bonus = ?
                         WHERE username = ?
                     ''', (bonus_points, now.isoformat(), username))
+                    self._bump_version(cursor, username)
                     
-                    conn.commit()
+                    self._commit(conn)
+                    self._set_daily_bonus_next(username, now + timedelta(days=1))
                     return bonus_points
                 
+                self._set_daily_bonus_next(username, datetime.fromisoformat(last_bonus) + timedelta(days=1))
                 return 0
     
+    def _set_daily_bonus_next(self, username, next_time):
+        """Zapamiętuje kiedy użytkownikowi należy się kolejny bonus (czyści wygasłe wpisy)"""
+        if len(self.daily_bonus_next) >= 10000:
+            now = time.time()
+            self.daily_bonus_next = {user: ts for user, ts in self.daily_bonus_next.items() if ts > now}
+        self.daily_bonus_next[username] = next_time.timestamp()
+    
     def update_game_stats(self, username, game_type, won=False):
         """Aktualizuje statystyki gier"""
         with self.lock:
@@ -374,7 +643,8 @@ class UserDatabase:
                         WHERE username = ? AND game_type = ?
                     ''', (username, game_type))
                 
-                conn.commit()
+                self._bump_version(cursor, username)
+                self._commit(conn)
 
     def get_all_users_with_points(self):
         """Pobiera wszystkich użytkowników z ich punktami"""
@@ -404,7 +674,8 @@ class UserDatabase:
                 
                 print(f"[DB] Ustawiono punkty {username}: {old_points} -> {points}")
                 
-                conn.commit()
+                self._bump_version(cursor, username)
+                self._commit(conn)
 
     def get_user_points(self, username):
         """Pobiera punkty użytkownika"""
@@ -7,6 +7,7 @@ import threading
 from datetime import datetime
 import pytz
 import sys
+from leaderboard_cache import get_leaderboard_cache
 
 # Konfiguracja UTF-8 dla Windows
 if sys.platform == "win32":
@@ -26,10 +27,13 @@ def safe_print(text):
         print(safe_text)
 
 class DiscordBot:
-    def __init__(self, user_database, discord_integration, shop=None):
+    def __init__(self, user_database, discord_integration, shop=None, now_playing=None, gateway=None):
         self.user_database = user_database
         self.discord_integration = discord_integration
         self.shop = shop
+        self.now_playing = now_playing  # Wspólny cache aktualnego utworu z bota Twitch
+        # Wspólna sesja gateway integracji - bot nie loguje się drugi raz tym samym tokenem
+        self.gateway = gateway
         self.bot_token = os.getenv('DISCORD_BOT_TOKEN')
         self.guild_id = os.getenv('DISCORD_GUILD_ID')
         self.bot = None
@@ -42,6 +46,12 @@ class DiscordBot:
             safe_print(f"⚠️ Discord bot token lub guild ID nie są skonfigurowane")
             return
         
+        if self.gateway:
+            # Slash commands rejestrowane na kliencie sesji (także po jego ponownym utworzeniu)
+            self.gateway.add_listener('ready', self.on_gateway_ready)
+            self.gateway.add_client_setup(self.attach_client)
+            return
+        
         # Konfiguracja intents
         intents = discord.Intents.default()
         intents.guilds = True
@@ -54,25 +64,40 @@ class DiscordBot:
         self.setup_events()
         self.setup_commands()
     
+    async def attach_client(self, client):
+        """Przejmuje klienta sesji gateway i rejestruje na nim slash commands"""
+        self.bot = client
+        self.setup_commands()
+        if client.is_ready():
+            await self.sync_commands()
+    
+    async def on_gateway_ready(self, client):
+        """Sesja gateway gotowa - synchronizacja slash commands"""
+        if client is self.bot:
+            await self.sync_commands()
+    
     def setup_events(self):
         """Konfiguruje event handlers"""
         @self.bot.event
         async def on_ready():
             safe_print(f'🤖 Discord bot zalogowany jako {self.bot.user}')
+            await self.sync_commands()
+    
+    async def sync_commands(self):
+        """Pobiera serwer i synchronizuje slash commands"""
+        # Pobierz guild
+        self.guild = self.bot.get_guild(int(self.guild_id))
+        if self.guild:
+            safe_print(f'🏠 Połączono z serwerem: {self.guild.name}')
             
-            # Pobierz guild
-            self.guild = self.bot.get_guild(int(self.guild_id))
-            if self.guild:
-                safe_print(f'🏠 Połączono z serwerem: {self.guild.name}')
-                
-                # Synchronizuj slash commands
-                try:
-                    synced = await self.bot.tree.sync(guild=self.guild)
-                    safe_print(f'✅ Zsynchronizowano {len(synced)} slash commands')
-                except Exception as e:
-                    safe_print(f'❌ Błąd synchronizacji slash commands: {e}')
-            else:
-                safe_print(f'❌ Nie znaleziono serwera o ID: {self.guild_id}')
+            # Synchronizuj slash commands
+            try:
+                synced = await self.bot.tree.sync(guild=self.guild)
+                safe_print(f'✅ Zsynchronizowano {len(synced)} slash commands')
+            except Exception as e:
+                safe_print(f'❌ Błąd synchronizacji slash commands: {e}')
+        else:
+            safe_print(f'❌ Nie znaleziono serwera o ID: {self.guild_id}')
     
     def setup_commands(self):
         """Konfiguruje slash commands"""
@@ -101,8 +126,8 @@ class DiscordBot:
             )
             
             try:
-                # Wymusz aktualizację rankingu
-                self.discord_integration.force_update_leaderboard(self.user_database)
+                # Wymusz aktualizację rankingu (odczyt bazy poza pętlą sesji gateway)
+                await asyncio.to_thread(self.discord_integration.force_update_leaderboard, self.user_database)
                 safe_print(f"✅ Ranking Discord wymuszony przez slash command przez {interaction.user}")
                 
                 # Wyślij potwierdzenie
@@ -129,42 +154,21 @@ class DiscordBot:
             await interaction.response.defer(ephemeral=True)
             
             try:
-                # Pobierz top użytkowników
-                top_users = self.user_database.get_top_users(10)
+                # Wspólny snapshot rankingu (przebudowywany tylko po zmianie danych)
+                snapshot = await asyncio.to_thread(get_leaderboard_cache(self.user_database).get_snapshot)
                 
-                if not top_users:
+                if not snapshot.rows:
                     await interaction.followup.send(
-                        "📊 Brak danych w rankingu!", 
+                        "📊 Brak danych w rankingu!",
                         ephemeral=True
                     )
                     return
                 
-                # Stwórz embed z rankingiem
-                embed = discord.Embed(
-                    title="🏆 RANKING PUNKTÓW",
+                embed = discord.Embed.from_dict(snapshot.embed(
+                    10,
                     description="Top 10 graczy ze streama",
-                    color=0xFFD700,  # Złoty
-                    timestamp=datetime.now(self.poland_tz)
-                )
-                
-                # Emoji dla pozycji
-                position_emojis = {
-                    1: "🥇", 2: "🥈", 3: "🥉",
-                    4: "4️⃣", 5: "5️⃣", 6: "6️⃣", 7: "7️⃣", 8: "8️⃣", 9: "9️⃣", 10: "🔟"
-                }
-                
-                leaderboard_text = ""
-                for i, (username, points) in enumerate(top_users, 1):
-                    emoji = position_emojis.get(i, f"{i}.")
-                    leaderboard_text += f"{emoji} **{username}** - {points:,} pkt\n"
-                
-                embed.add_field(
-                    name="🏆 TOP 10",
-                    value=leaderboard_text,
-                    inline=False
-                )
-                
-                embed.set_footer(text="KranikBot • Twitch Integration")
+                    footer="KranikBot • Twitch Integration"
+                ))
                 
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 
@@ -175,6 +179,57 @@ class DiscordBot:
                     ephemeral=True
                 )
         
+        @self.bot.tree.command(
+            name="nowplaying",
+            description="Pokazuje aktualnie grany utwór na streamie",
+            guild=discord.Object(id=int(self.guild_id))
+        )
+        async def show_now_playing(interaction: discord.Interaction):
+            """Slash command do pokazania aktualnego utworu (z cache bota, bez zapytań do Spotify)"""
+            
+            track = self.now_playing.get_current(refresh=False) if self.now_playing else None
+            if not track:
+                await interaction.response.send_message("🎵 Aktualnie nic nie gra.", ephemeral=True)
+                return
+            
+            embed = discord.Embed(
+                title="🎵 Teraz gra",
+                description=f"**{track['name']}**\n{track['artists']}",
+                color=0x1DB954,  # Zielony Spotify
+                url=track.get('url'),
+                timestamp=datetime.now(self.poland_tz)
+            )
+            
+            progress = track['progress_ms'] // 1000
+            duration = track['duration_ms'] // 1000
+            embed.add_field(
+                name="⏱️ Postęp",
+                value=f"{progress // 60}:{progress % 60:02d} / {duration // 60}:{duration % 60:02d}",
+                inline=False
+            )
+            embed.set_footer(text="KranikBot • Twitch Integration")
+            
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        @self.bot.tree.command(
+            name="link",
+            description="Łączy konto Discord z kontem Twitch (do automatycznych ról ze sklepu)",
+            guild=discord.Object(id=int(self.guild_id))
+        )
+        async def link_account(interaction: discord.Interaction):
+            """Slash command generujący kod do wpisania na czacie Twitch"""
+            
+            member_index = getattr(self.discord_integration, 'member_index', None)
+            if not member_index:
+                await interaction.response.send_message("❌ Łączenie kont jest wyłączone.", ephemeral=True)
+                return
+            
+            code = member_index.create_link_code(interaction.user.id)
+            await interaction.response.send_message(
+                f"🔗 Wpisz na czacie Twitch: `!link {code}` (kod ważny 10 minut)",
+                ephemeral=True
+            )
+        
         @self.bot.tree.command(
             name="clear_channel",
             description="Usuwa wszystkie wiadomości z tego kanału",
@@ -392,8 +447,8 @@ class DiscordBot:
             )
             
             try:
-                # Pobierz statystyki z bazy danych
-                stats = self.user_database.get_daily_stats()
+                # Pobierz statystyki z bazy danych (poza pętlą sesji gateway)
+                stats = await asyncio.to_thread(self.user_database.get_daily_stats)
                 
                 # ID kanału do wysłania statystyk
                 stats_channel_id = 1402757620837781658
@@ -473,6 +528,12 @@ class DiscordBot:
     
     def start_bot(self):
         """Uruchamia Discord bot w osobnym wątku"""
+        if self.gateway and self.bot_token and self.guild_id:
+            # Sesja gateway loguje się sama - tylko ją uruchamiamy, komendy dołączą się do klienta
+            self.gateway.start()
+            safe_print(f"🚀 Discord bot działa na wspólnej sesji gateway")
+            return True
+        
         if not self.bot or not self.bot_token:
             safe_print(f"❌ Discord bot nie może zostać uruchomiony - brak konfiguracji")
             return False
@@ -494,6 +555,8 @@ class DiscordBot:
     
     def stop_bot(self):
         """Zatrzymuje Discord bot"""
+        if self.gateway:
+            return  # Wspólnej sesji nie zamykamy - używa jej też integracja
         if self.bot:
             try:
                 asyncio.create_task(self.bot.close())
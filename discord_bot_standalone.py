@@ -16,6 +16,9 @@ import pytz
 import sys
 import signal
 from dotenv import load_dotenv
+from leaderboard_cache import get_leaderboard_cache
+from event_bus import get_event_bus, publish_database_changes
+from data_service import open_user_database
 
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
@@ -46,11 +49,12 @@ def safe_print(text):
 class StandaloneDiscordBot:
     def __init__(self):
         # Import lokalny aby uniknąć problemów z zależnościami
-        from database import UserDatabase
         from discord_integration import DiscordIntegration
         from shop import Shop
         
-        self.user_database = UserDatabase()
+        self.user_database = open_user_database()
+        # Zmiany punktów i zakupy z Discorda trafiają na szynę zdarzeń (ranking, web API)
+        publish_database_changes(self.user_database, get_event_bus('discord_bot'))
         self.discord_integration = DiscordIntegration()
         self.shop = Shop(self.user_database)
         self.bot_token = os.getenv('DISCORD_BOT_TOKEN')
@@ -186,42 +190,21 @@ class StandaloneDiscordBot:
             await interaction.response.defer(ephemeral=True)
             
             try:
-                # Pobierz top użytkowników
-                top_users = self.user_database.get_top_users(10)
+                # Wspólny snapshot rankingu (przebudowywany tylko po zmianie danych)
+                snapshot = get_leaderboard_cache(self.user_database).get_snapshot()
                 
-                if not top_users:
+                if not snapshot.rows:
                     await interaction.followup.send(
-                        "📊 Brak danych w rankingu!", 
+                        "📊 Brak danych w rankingu!",
                         ephemeral=True
                     )
                     return
                 
-                # Stwórz embed z rankingiem
-                embed = discord.Embed(
-                    title="🏆 RANKING PUNKTÓW",
+                embed = discord.Embed.from_dict(snapshot.embed(
+                    10,
                     description="Top 10 graczy ze streama",
-                    color=0xFFD700,  # Złoty
-                    timestamp=datetime.now(self.poland_tz)
-                )
-                
-                # Emoji dla pozycji
-                position_emojis = {
-                    1: "🥇", 2: "🥈", 3: "🥉",
-                    4: "4️⃣", 5: "5️⃣", 6: "6️⃣", 7: "7️⃣", 8: "8️⃣", 9: "9️⃣", 10: "🔟"
-                }
-                
-                leaderboard_text = ""
-                for i, (username, points) in enumerate(top_users, 1):
-                    emoji = position_emojis.get(i, f"{i}.")
-                    leaderboard_text += f"{emoji} **{username}** - {points:,} pkt\n"
-                
-                embed.add_field(
-                    name="🏆 TOP 10",
-                    value=leaderboard_text,
-                    inline=False
-                )
-                
-                embed.set_footer(text="KranikBot • Standalone Discord Bot")
+                    footer="KranikBot • Standalone Discord Bot"
+                ))
                 
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 
@@ -232,6 +215,26 @@ class StandaloneDiscordBot:
                     ephemeral=True
                 )
         
+        @self.bot.tree.command(
+            name="link",
+            description="Łączy konto Discord z kontem Twitch (do automatycznych ról ze sklepu)",
+            guild=discord.Object(id=int(self.guild_id))
+        )
+        async def link_account(interaction: discord.Interaction):
+            """Slash command generujący kod do wpisania na czacie Twitch"""
+            
+            member_index = getattr(self.discord_integration, 'member_index', None)
+            if not member_index:
+                await interaction.response.send_message("❌ Łączenie kont jest wyłączone.", ephemeral=True)
+                return
+            
+            # Kod trafia do discord_links.db - zrealizuje go bot Twitch (!link <kod>)
+            code = await asyncio.to_thread(member_index.create_link_code, interaction.user.id)
+            await interaction.response.send_message(
+                f"🔗 Wpisz na czacie Twitch: `!link {code}` (kod ważny 10 minut)",
+                ephemeral=True
+            )
+        
         @self.bot.tree.command(
             name="update_shop",
             description="Wymusza aktualizację sklepu na Discord",
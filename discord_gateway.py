@@ -0,0 +1,299 @@
+import os
+import time
+import asyncio
+import threading
+import aiohttp
+import discord
+from discord.ext import commands
+from resilience import CircuitOpenError, get_breaker
+
+GATEWAY_CONCURRENCY = int(os.getenv("DISCORD_GATEWAY_CONCURRENCY", "2"))  # Ile zadań naraz
+GATEWAY_MAX_PENDING = 50      # Limit zadań czekających w kolejce
+GATEWAY_READY_TIMEOUT = 60    # Ile czekać na połączenie z gateway przed zadaniem
+GATEWAY_JOB_TIMEOUT = float(os.getenv("DISCORD_GATEWAY_TIMEOUT", "300"))
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def is_transient_error(error):
+    """Czy błąd oznacza niedostępność Discord (połączenie, 5xx, limit, przekroczony czas)"""
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, OSError, aiohttp.ClientError,
+                              discord.ConnectionClosed, discord.GatewayNotFound))
+
+class DiscordGateway:
+    """Jedna stała sesja Discord gateway dla wszystkich operacji integracji.
+
+    Sesja działa we własnym wątku z pętlą asyncio i loguje się raz (przy pierwszym zadaniu).
+    Zadania to funkcje async przyjmujące klienta Discord - submit() wrzuca je do pętli
+    i zwraca Future. Równolegle wykonuje się najwyżej GATEWAY_CONCURRENCY zadań.
+    Klient to commands.Bot - DiscordBot rejestruje na nim slash commands zamiast otwierać drugą sesję.
+    """
+
+    def __init__(self, token):
+        self.token = token
+        self.lock = threading.Lock()
+        self.breaker = get_breaker('discord_gateway', failure_threshold=3, reset_timeout=60)
+        self.members_intent = True
+        self.loop = None
+        self.thread = None
+        self.client = None
+        self.ready = None  # Ustawiany w on_ready aktualnego klienta, czyszczony przy ponownym logowaniu
+        self.semaphore = None
+
+        # Statystyki
+        self.pending = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.logins = 0
+        self.disconnects = 0
+        self.connected = False
+        self.last_error = None
+        self.jobs = {}  # nazwa -> {'runs', 'errors', 'total_time', 'total_wait'}
+        self.listeners = {}  # zdarzenie -> lista funkcji async (np. indeks członków)
+
+    def add_listener(self, event, callback):
+        """Rejestruje funkcję async wywoływaną przy zdarzeniu sesji ('ready', 'member_join', ...)"""
+        self.listeners.setdefault(event, []).append(callback)
+
+    async def _dispatch(self, event, *args):
+        """Przekazuje zdarzenie zarejestrowanym funkcjom"""
+        for callback in self.listeners.get(event, []):
+            try:
+                await callback(*args)
+            except Exception as e:
+                safe_print(f"❌ Błąd obsługi zdarzenia Discord {event}: {e}")
+
+    def add_client_setup(self, callback):
+        """Rejestruje funkcję async przygotowującą klienta (np. slash commands) - także dla już utworzonego"""
+        self.add_listener('client', callback)
+        with self.lock:
+            loop, client = self.loop, self.client
+        if client is not None and loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(callback(client), loop)
+
+    def start(self):
+        """Uruchamia wątek sesji (jeśli jeszcze nie działa)"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.ready = asyncio.Event()
+            self.semaphore = asyncio.Semaphore(GATEWAY_CONCURRENCY)
+            self.thread = threading.Thread(target=self._run, name='discord-gateway', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        """Wątek sesji - pętla asyncio z klientem Discord"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._session())
+        except Exception as e:
+            self.last_error = str(e)
+            safe_print(f"❌ Sesja Discord gateway zakończona błędem: {e}")
+        finally:
+            self.connected = False
+            # Zadania, które nie doczekały się sesji, kończą się błędem zamiast wisieć
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    async def _session(self):
+        """Loguje się do gateway i utrzymuje połączenie (discord.py sam wznawia sesję)"""
+        while True:
+            intents = discord.Intents.default()
+            intents.guilds = True
+            intents.message_content = True
+            intents.members = self.members_intent  # Potrzebne do wyszukiwania użytkowników przy rolach
+            client = commands.Bot(command_prefix='!', intents=intents)
+            self._setup_events(client)
+            with self.lock:
+                self.client = client
+            await self._dispatch('client', client)
+            try:
+                self.logins += 1
+                await self.client.start(self.token)
+                return
+            except discord.PrivilegedIntentsRequired:
+                safe_print(f"⚠️ Bot nie ma uprawnienia Server Members Intent - sesja bez listy członków")
+                self.members_intent = False
+                # Zadania czekają na on_ready nowego klienta, nie zamkniętego
+                self.ready.clear()
+                await self.client.close()
+
+    def _setup_events(self, client):
+        """Rejestruje zdarzenia połączenia"""
+        @client.event
+        async def on_ready():
+            self.connected = True
+            self.ready.set()
+            safe_print(f"🔗 Sesja Discord gateway gotowa jako {client.user}")
+            await self._dispatch('ready', client)
+
+        @client.event
+        async def on_disconnect():
+            if self.connected:
+                self.disconnects += 1
+            self.connected = False
+
+        @client.event
+        async def on_resumed():
+            self.connected = True
+
+        @client.event
+        async def on_member_join(member):
+            await self._dispatch('member_join', member)
+
+        @client.event
+        async def on_member_update(before, after):
+            await self._dispatch('member_update', before, after)
+
+        @client.event
+        async def on_member_remove(member):
+            await self._dispatch('member_remove', member)
+
+    def submit(self, name, job, *args, timeout=GATEWAY_JOB_TIMEOUT):
+        """Zleca zadanie job(client, *args). Zwraca concurrent.futures.Future z wynikiem.
+
+        Rzuca CircuitOpenError gdy Discord jest oznaczony jako niedostępny
+        i RuntimeError gdy kolejka jest pełna.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Discord gateway chwilowo niedostępny")
+        with self.lock:
+            if self.pending >= GATEWAY_MAX_PENDING:
+                self.rejected += 1
+                raise RuntimeError(f"Kolejka zadań Discord pełna ({GATEWAY_MAX_PENDING})")
+            self.pending += 1
+            self.submitted += 1
+        try:
+            self.start()
+            return asyncio.run_coroutine_threadsafe(self._execute(name, job, args, timeout), self.loop)
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+            raise
+
+    def run(self, name, job, *args, timeout=GATEWAY_JOB_TIMEOUT):
+        """Zleca zadanie i czeka na wynik (blokuje wątek wywołujący)"""
+        future = self.submit(name, job, *args, timeout=timeout)
+        return future.result(timeout + GATEWAY_READY_TIMEOUT + 10)
+
+    async def _execute(self, name, job, args, timeout):
+        """Wykonuje zadanie w pętli sesji z limitem współbieżności i czasu"""
+        queued_at = time.monotonic()
+        started_at = None
+        error = None
+        try:
+            async with self.semaphore:
+                await asyncio.wait_for(self._wait_ready(), GATEWAY_READY_TIMEOUT)
+                started_at = time.monotonic()
+                with self.lock:
+                    self.running += 1
+                try:
+                    result = await asyncio.wait_for(job(self.client, *args), timeout)
+                finally:
+                    with self.lock:
+                        self.running -= 1
+        except asyncio.CancelledError as e:
+            # Koniec sesji anuluje zadania - bez wpływu na bezpiecznik, ale zadanie schodzi z kolejki
+            error = e
+            raise
+        except Exception as e:
+            error = e
+            if is_transient_error(e):
+                self.breaker.record_failure(e)
+            elif isinstance(e, discord.HTTPException):
+                self.breaker.record_success()  # Discord odpowiedział (np. NotFound, Forbidden)
+            else:
+                self.breaker.record_ignored()  # Błąd w kodzie zadania
+            raise
+        else:
+            self.breaker.record_success()
+            return result
+        finally:
+            self._record(name, queued_at, started_at, error=error)
+
+    async def _wait_ready(self):
+        """Czeka aż aktualny klient zaloguje się i pobierze dane serwerów"""
+        await self.ready.wait()
+
+    def _record(self, name, queued_at, started_at, error=None):
+        """Zapisuje metryki zakończonego zadania"""
+        now = time.monotonic()
+        with self.lock:
+            self.pending -= 1
+            stats = self.jobs.setdefault(name, {'runs': 0, 'errors': 0, 'total_time': 0.0, 'total_wait': 0.0})
+            stats['runs'] += 1
+            stats['total_wait'] += (started_at or now) - queued_at
+            if started_at:
+                stats['total_time'] += now - started_at
+            if error is None:
+                self.completed += 1
+                return
+            stats['errors'] += 1
+            self.failed += 1
+            if isinstance(error, asyncio.TimeoutError):
+                self.timeouts += 1
+            self.last_error = f"{name}: {error!r}"
+        safe_print(f"❌ Zadanie Discord {name} nieudane: {error!r}")
+
+    def get_stats(self):
+        """Zwraca metryki sesji i zadań"""
+        with self.lock:
+            return {
+                'connected': self.connected,
+                'members_intent': self.members_intent,
+                'logins': self.logins,
+                'disconnects': self.disconnects,
+                'concurrency': GATEWAY_CONCURRENCY,
+                'pending': self.pending,
+                'running': self.running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+                'last_error': self.last_error,
+                'jobs': {
+                    name: {
+                        'runs': stats['runs'],
+                        'errors': stats['errors'],
+                        'avg_time': round(stats['total_time'] / stats['runs'], 2),
+                        'avg_wait': round(stats['total_wait'] / stats['runs'], 2)
+                    }
+                    for name, stats in self.jobs.items()
+                }
+            }
+
+GATEWAYS = {}
+GATEWAYS_LOCK = threading.Lock()
+
+def get_gateway(token):
+    """Zwraca wspólną sesję gateway dla tokenu bota (gry, sklep i bot używają jednej)"""
+    with GATEWAYS_LOCK:
+        gateway = GATEWAYS.get(token)
+        if gateway is None:
+            gateway = DiscordGateway(token)
+            GATEWAYS[token] = gateway
+        return gateway
+
+def get_gateway_stats():
+    """Metryki sesji gateway (dla web API) - pusty słownik gdy sesja nie była używana"""
+    with GATEWAYS_LOCK:
+        gateways = list(GATEWAYS.values())
+    return gateways[0].get_stats() if gateways else {}
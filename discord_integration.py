@@ -1,5 +1,4 @@
 import os
-import requests
 import json
 import asyncio
 import threading
@@ -8,7 +7,15 @@ from typing import Optional
 import discord
 import pytz
 import sys
-import hashlib
+from discord_gateway import get_gateway
+from webhook_outbox import get_outbox
+from role_expiry import get_role_expiry
+from member_index import get_member_index
+from leaderboard_cache import get_leaderboard_cache
+
+# ID kanałów i wiadomości z rankingiem/sklepem - edytowane w miejscu zamiast wysyłania od nowa
+DISCORD_POSTS_FILE = os.getenv("DISCORD_POSTS_FILE", "discord_posts.json")
+POSTS_LOCK = threading.Lock()
 
 # Konfiguracja UTF-8 dla Windows
 if sys.platform == "win32":
@@ -27,6 +34,32 @@ def safe_print(text):
         safe_text = text.encode('ascii', 'replace').decode('ascii')
         print(safe_text)
 
+def get_post_ref(key):
+    """Zwraca zapamiętane {'channel_id', 'message_id'} postu (np. 'leaderboard', 'shop') lub None"""
+    with POSTS_LOCK:
+        try:
+            with open(DISCORD_POSTS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f).get(key)
+        except (OSError, ValueError):
+            return None
+
+def save_post_ref(key, channel_id, message_id):
+    """Zapamiętuje post na dysku (odczyt-zapis całego pliku - posty zapisują różne instancje)"""
+    with POSTS_LOCK:
+        try:
+            with open(DISCORD_POSTS_FILE, 'r', encoding='utf-8') as f:
+                posts = json.load(f)
+        except (OSError, ValueError):
+            posts = {}
+        posts[key] = {'channel_id': int(channel_id), 'message_id': int(message_id)}
+        try:
+            tmp_path = DISCORD_POSTS_FILE + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(posts, f, indent=2)
+            os.replace(tmp_path, DISCORD_POSTS_FILE)
+        except Exception as e:
+            safe_print(f"❌ Błąd zapisywania ID postów Discord: {e}")
+
 class DiscordIntegration:
     def __init__(self):
         # Strefa czasowa dla Polski
@@ -38,12 +71,20 @@ class DiscordIntegration:
         self.leaderboard_channel_id = os.getenv('DISCORD_LEADERBOARD_CHANNEL_ID')
         self.stream_channel_id = os.getenv('DISCORD_STREAM_CHANNEL_ID')
         
-        # Hash do sprawdzania zmian w rankingu
-        self.last_leaderboard_hash = None
+        # Wersja danych (UserDatabase.data_version) ostatnio opublikowanego rankingu
+        self.last_leaderboard_version = None
         
         # Sprawdź czy Discord jest skonfigurowany
         self.enabled = bool(self.webhook_url)
         self.bot_enabled = bool(self.bot_token and self.guild_id)
+        # Wiadomości webhooka idą przez wspólną kolejkę wysyłaną w tle
+        self.outbox = get_outbox(self.webhook_url) if self.enabled else None
+        # Operacje bota (role, kanały) idą przez jedną stałą sesję gateway
+        self.gateway = get_gateway(self.bot_token) if self.bot_enabled else None
+        # Wygasanie kupionych ról zapisane w bazie - przetrwa restart bota (zdejmuje je tylko bot Twitch)
+        self.role_expiry = get_role_expiry(self) if self.bot_enabled and self.special_role_id else None
+        # Powiązania Twitch -> Discord i indeks nazw członków (aktualizowany zdarzeniami gateway)
+        self.member_index = get_member_index(self.gateway) if self.bot_enabled else None
         
         if not self.enabled:
             safe_print(f"⚠️ Discord webhook nie jest skonfigurowany - funkcje Discord wyłączone")
@@ -55,30 +96,43 @@ class DiscordIntegration:
         elif self.enabled:
             safe_print(f"⚠️ Discord bot nie skonfigurowany - automatyczne role wyłączone")
     
+    def submit_gateway_job(self, name, job, *args, on_done=None):
+        """Zleca zadanie sesji gateway Discord bez czekania na wynik.
+
+        on_done(wynik) wywoływane po udanym zadaniu. Zwraca Future lub None przy błędzie.
+        """
+        if not self.bot_enabled:
+            return None
+        try:
+            future = self.gateway.submit(name, job, *args)
+        except Exception as e:
+            safe_print(f"❌ Nie można zlecić zadania Discord {name}: {e}")
+            return None
+        if on_done:
+            def callback(done_future):
+                if done_future.cancelled() or done_future.exception():
+                    return
+                try:
+                    on_done(done_future.result())
+                except Exception as e:
+                    safe_print(f"❌ Błąd obsługi wyniku zadania Discord {name}: {e}")
+            future.add_done_callback(callback)
+        return future
+    
     def get_poland_time(self):
         """Zwraca aktualny czas w Polsce"""
         return datetime.now(self.poland_tz)
     
     def send_webhook_message(self, content: str, embeds: list = None, username: str = "KranikBot"):
-        """Wysyła wiadomość przez webhook Discord"""
+        """Dodaje wiadomość do kolejki webhooka Discord (wysyłka w tle, nie blokuje)"""
         if not self.enabled:
             return False
         
         try:
-            data = {
-                "content": content,
-                "username": username,
-                "avatar_url": "https://cdn.discordapp.com/attachments/your_avatar_url_here"
-            }
-            
-            if embeds:
-                data["embeds"] = embeds
-            
-            response = requests.post(self.webhook_url, json=data)
-            return response.status_code == 204
-            
+            return self.outbox.send(content, embeds=embeds, username=username,
+                                    avatar_url="https://cdn.discordapp.com/attachments/your_avatar_url_here")
         except Exception as e:
-            safe_print(f"❌ Błąd wysyłania webhook Discord: {e}")
+            safe_print(f"❌ Błąd kolejkowania webhook Discord: {e}")
             return False
     
     def notify_reward_purchase(self, twitch_username: str, reward_name: str, price: int, duration_hours: int):
@@ -138,604 +192,418 @@ class DiscordIntegration:
         
         self.send_webhook_message("", embeds=[embed])
 
-    async def update_shop_post(self, channel_id: int, embed_data: dict, message_id: int = None):
+    async def publish_embed(self, client, key, channel, embed, purge_limit=100, purge_check=None, message_id=None):
+        """Aktualizuje zapamiętany post z embedem jednym wywołaniem API (edycja w miejscu).
+
+        Gdy posta nie ma, usuwa stare wiadomości zbiorczo (bulk delete) i wysyła nowy,
+        zapamiętując jego ID. Zwraca ID posta.
+        """
+        ref = get_post_ref(key)
+        if (not ref or ref['channel_id'] != channel.id) and message_id:
+            ref = {'channel_id': channel.id, 'message_id': int(message_id)}
+        
+        if ref and ref['channel_id'] == channel.id:
+            try:
+                await channel.get_partial_message(ref['message_id']).edit(content=None, embed=embed)
+                return ref['message_id']
+            except discord.NotFound:
+                safe_print(f"⚠️ Post '{key}' nie istnieje na #{channel.name} - wysyłam nowy")
+        
+        check = purge_check or (lambda message: True)
+        try:
+            # Wiadomości starsze niż 14 dni discord.py usuwa pojedynczo
+            deleted = await channel.purge(limit=purge_limit, check=check, bulk=True)
+        except discord.Forbidden:
+            # Bez uprawnienia Manage Messages można usuwać tylko własne wiadomości, pojedynczo
+            deleted = await channel.purge(limit=purge_limit, check=lambda message: message.author == client.user and check(message), bulk=False)
+        if deleted:
+            safe_print(f"🗑️ Usunięto {len(deleted)} starych wiadomości z #{channel.name}")
+        
+        message = await channel.send(embed=embed)
+        save_post_ref(key, channel.id, message.id)
+        safe_print(f"📌 Nowy post '{key}' w kanale #{channel.name} (ID: {message.id})")
+        return message.id
+    
+    async def update_shop_post(self, client, channel_id: int, embed_data: dict, message_id: int = None):
         """Aktualizuje lub wysyła nowy post ze sklepem na Discord"""
         if not self.bot_enabled:
             safe_print(f"❌ Discord bot nie jest skonfigurowany do aktualizacji sklepu")
             return None
         
         try:
-            intents = discord.Intents.default()
-            intents.guilds = True
-            intents.message_content = True
+            guild = client.get_guild(int(self.guild_id))
+            if not guild:
+                safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
+                return None
             
-            client = discord.Client(intents=intents)
-            result_message_id = None
+            channel = guild.get_channel(int(channel_id))
+            if not channel:
+                safe_print(f"❌ Nie znaleziono kanału o ID: {channel_id}")
+                return None
             
-            @client.event
-            async def on_ready():
-                nonlocal result_message_id
-                try:
-                    guild = client.get_guild(int(self.guild_id))
-                    if not guild:
-                        safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
-                        await client.close()
-                        return
-                    
-                    channel = guild.get_channel(int(channel_id))
-                    if not channel:
-                        safe_print(f"❌ Nie znaleziono kanału o ID: {channel_id}")
-                        await client.close()
-                        return
-                    
-                    # Stwórz embed Discord
-                    embed = discord.Embed(
-                        title=embed_data["title"],
-                        description=embed_data["description"],
-                        color=embed_data["color"]
-                    )
-                    
-                    # Dodaj pola
-                    for field in embed_data["fields"]:
-                        embed.add_field(
-                            name=field["name"],
-                            value=field["value"],
-                            inline=field.get("inline", True)
-                        )
-                    
-                    # Dodaj footer
-                    if "footer" in embed_data:
-                        embed.set_footer(text=embed_data["footer"]["text"])
-                    
-                    # Usuń poprzednie wiadomości bota ze sklepem (podobnie jak w kanale statystyk)
-                    deleted_count = 0
-                    async for message in channel.history(limit=20):
-                        if message.author == client.user:
-                            try:
-                                await message.delete()
-                                deleted_count += 1
-                                await asyncio.sleep(0.5)  # Rate limit
-                            except discord.NotFound:
-                                pass  # Wiadomość już usunięta
-                            except Exception as e:
-                                safe_print(f"⚠️ Nie można usunąć wiadomości: {e}")
-                    
-                    if deleted_count > 0:
-                        safe_print(f"🗑️ Usunięto {deleted_count} poprzednich wiadomości ze sklepem")
-                    
-                    # Wyślij nową wiadomość ze sklepem
-                    message = await channel.send(embed=embed)
-                    result_message_id = message.id
-                    safe_print(f"✅ Wysłano nowy post ze sklepem w kanale #{channel.name}")
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd aktualizacji postu ze sklepem: {e}")
-                finally:
-                    await client.close()
+            # Stwórz embed Discord
+            embed = discord.Embed(
+                title=embed_data["title"],
+                description=embed_data["description"],
+                color=embed_data["color"]
+            )
             
-            await client.start(self.bot_token)
-            return result_message_id
+            # Dodaj pola
+            for field in embed_data["fields"]:
+                embed.add_field(
+                    name=field["name"],
+                    value=field["value"],
+                    inline=field.get("inline", True)
+                )
             
-        except Exception as e:
-            safe_print(f"❌ Błąd połączenia z Discord (sklep): {e}")
-            return None
-
-    def update_shop_post_async(self, channel_id: int, embed_data: dict, message_id: int = None):
-        """Wrapper do uruchamiania aktualizacji sklepu w osobnym wątku"""
-        def run_async():
-            try:
-                result = asyncio.run(self.update_shop_post(channel_id, embed_data, message_id))
-                return result
-            except Exception as e:
-                safe_print(f"❌ Błąd async aktualizacji sklepu: {e}")
-                return None
-        
-        thread = threading.Thread(target=run_async, daemon=True)
-        thread.start()
-        return thread
-    
-    def get_leaderboard_hash(self, user_database):
-        """Generuje hash aktualnego stanu rankingu"""
-        try:
-            # Pobierz top 20 użytkowników
-            top_users = user_database.get_top_users(20)
-            
-            # Pobierz statystyki ogólne
-            total_users = user_database.get_total_users_count()
-            total_points = user_database.get_total_points_distributed()
-            
-            # Stwórz dane do hash (bez timestamp)
-            leaderboard_data = {
-                "top_users": top_users,
-                "total_users": total_users,
-                "total_points": total_points
-            }
+            # Dodaj footer
+            if "footer" in embed_data:
+                embed.set_footer(text=embed_data["footer"]["text"])
             
-            # Generuj hash
-            data_string = json.dumps(leaderboard_data, sort_keys=True)
-            return hashlib.md5(data_string.encode()).hexdigest()
+            # Edytuj zapamiętany post; nowy tylko gdy go nie ma (wtedy usuń stare posty bota)
+            return await self.publish_embed(
+                client, "shop", channel, embed,
+                purge_limit=20,
+                purge_check=lambda message: message.author == client.user,
+                message_id=message_id
+            )
             
         except Exception as e:
-            safe_print(f"❌ Błąd generowania hash rankingu: {e}")
-            return None
+            safe_print(f"❌ Błąd aktualizacji postu ze sklepem: {e}")
+    
+    def update_shop_post_async(self, channel_id: int, embed_data: dict, message_id: int = None, on_done=None):
+        """Zleca aktualizację postu ze sklepem sesji gateway (bez czekania). on_done dostaje ID postu"""
+        return self.submit_gateway_job("shop_post", self.update_shop_post, channel_id, embed_data, message_id, on_done=on_done)
     
     def check_leaderboard_changes(self, user_database):
-        """Sprawdza czy ranking się zmienił od ostatniego sprawdzenia"""
-        current_hash = self.get_leaderboard_hash(user_database)
-        
-        if current_hash is None:
-            return False  # Błąd - nie aktualizuj
-        
-        if self.last_leaderboard_hash is None:
-            self.last_leaderboard_hash = current_hash
+        """Sprawdza czy dane rankingu zmieniły się od ostatniej publikacji (porównanie wersji danych)"""
+        current_version = user_database.get_data_version()
+
+        if self.last_leaderboard_version is None:
+            self.last_leaderboard_version = current_version
             return False  # Pierwsza inicjalizacja - nie wysyłaj wiadomości
-        
-        if current_hash != self.last_leaderboard_hash:
-            self.last_leaderboard_hash = current_hash
-            return True  # Ranking się zmienił
-        
-        return False  # Brak zmian
-    
-    def initialize_leaderboard_hash(self, user_database):
-        """Inicjalizuje hash rankingu bez wysyłania wiadomości na Discord"""
-        current_hash = self.get_leaderboard_hash(user_database)
-        if current_hash is not None:
-            self.last_leaderboard_hash = current_hash
-            safe_print("ℹ️ Zainicjalizowano hash rankingu bez wysyłania wiadomości")
 
-    
-    async def update_leaderboard_channel(self, user_database):
+        return current_version != self.last_leaderboard_version
+
+    def initialize_leaderboard_version(self, user_database):
+        """Zapamiętuje aktualną wersję danych bez wysyłania rankingu na Discord"""
+        self.last_leaderboard_version = user_database.get_data_version()
+        safe_print(f"ℹ️ Zainicjalizowano wersję rankingu ({self.last_leaderboard_version}) bez wysyłania wiadomości")
+
+    async def update_leaderboard_channel(self, client, user_database):
         """Automatycznie aktualizuje kanał z rankingiem punktów"""
         if not self.bot_enabled or not self.leaderboard_channel_id:
             return False
         
         try:
-            intents = discord.Intents.default()
-            intents.guilds = True
-            intents.message_content = True
+            guild = client.get_guild(int(self.guild_id))
+            if not guild:
+                safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
+                return False
             
-            client = discord.Client(intents=intents)
+            channel = guild.get_channel(int(self.leaderboard_channel_id))
+            if not channel:
+                safe_print(f"❌ Nie znaleziono kanału rankingu o ID: {self.leaderboard_channel_id}")
+                return False
             
-            @client.event
-            async def on_ready():
-                try:
-                    guild = client.get_guild(int(self.guild_id))
-                    if not guild:
-                        safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
-                        await client.close()
-                        return
-                    
-                    channel = guild.get_channel(int(self.leaderboard_channel_id))
-                    if not channel:
-                        safe_print(f"❌ Nie znaleziono kanału rankingu o ID: {self.leaderboard_channel_id}")
-                        await client.close()
-                        return
-                    
-                    # Wyczyść kanał
-                    async for message in channel.history(limit=100):
-                        await message.delete()
-                        await asyncio.sleep(0.5)  # Rate limit
-                    
-                    # Pobierz top użytkowników
-                    top_users = user_database.get_top_users(20)  # Top 20
-                    
-                    # Stwórz embed z rankingiem
-                    embed = discord.Embed(
-                        title="🏆 RANKING PUNKTÓW",
-                        description="Najlepsi gracze ze streama",
-                        color=0xFFD700,  # Złoty
-                        timestamp=self.get_poland_time()
-                    )
-                    embed.set_footer(text="KranikBot • Aktualizowane co 30 minut")
-                    
-                    # Emoji dla pozycji
-                    position_emojis = {
-                        1: "🥇", 2: "🥈", 3: "🥉",
-                        4: "4️⃣", 5: "5️⃣", 6: "6️⃣", 7: "7️⃣", 8: "8️⃣", 9: "9️⃣", 10: "🔟"
-                    }
-                    
-                    # Podziel na grupy po 10
-                    top_10 = top_users[:10]
-                    next_10 = top_users[10:20]
-                    
-                    # Top 10
-                    if top_10:
-                        top_10_text = ""
-                        for i, (username, points, messages) in enumerate(top_10, 1):
-                            emoji = position_emojis.get(i, f"{i}.")
-                            top_10_text += f"{emoji} **{username}** - {points:,} pkt\n"
-                        
-                        embed.add_field(
-                            name="🏆 TOP 10",
-                            value=top_10_text,
-                            inline=False
-                        )
-                    
-                    # Pozycje 11-20
-                    if next_10:
-                        next_10_text = ""
-                        for i, (username, points, messages) in enumerate(next_10, 11):
-                            next_10_text += f"{i}. **{username}** - {points:,} pkt\n"
-                        
-                        embed.add_field(
-                            name="📊 Pozycje 11-20",
-                            value=next_10_text,
-                            inline=False
-                        )
-                    
-                    # Statystyki ogólne
-                    total_users = user_database.get_total_users_count()
-                    total_points = user_database.get_total_points_distributed()
-                    
-                    embed.add_field(
-                        name="📈 Statystyki ogólne",
-                        value=f"👥 Łącznie użytkowników: **{total_users}**\n💰 Rozdanych punktów: **{total_points:,}**",
-                        inline=False
-                    )
-                    
-                    # Wyślij embed
-                    await channel.send(embed=embed)
-                    safe_print(f"✅ Zaktualizowano ranking punktów w kanale #{channel.name}")
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd aktualizacji rankingu: {e}")
-                finally:
-                    await client.close()
+            # Gotowy embed ze wspólnego snapshotu rankingu (top 20 + statystyki ogólne)
+            # Odczyt bazy (wersja danych, przebudowa snapshotu) poza pętlą sesji gateway
+            embed = discord.Embed.from_dict(await asyncio.to_thread(
+                get_leaderboard_cache(user_database).embed,
+                20,
+                description="Najlepsi gracze ze streama",
+                footer="KranikBot • Aktualizowane po zmianach punktów",
+                with_stats=True
+            ))
             
-            await client.start(self.bot_token)
-            return True
+            # Edytuj zapamiętany post; nowy tylko gdy go nie ma (wtedy wyczyść kanał)
+            await self.publish_embed(client, "leaderboard", channel, embed, purge_limit=100)
+            safe_print(f"✅ Zaktualizowano ranking punktów w kanale #{channel.name}")
             
+            return True
         except Exception as e:
-            safe_print(f"❌ Błąd połączenia z Discord (ranking): {e}")
-            return False
-    
-
+            safe_print(f"❌ Błąd aktualizacji rankingu: {e}")
     
-
-    
-    def update_leaderboard_async(self, user_database, update_hash_after=True):
-        """Wrapper do uruchamiania aktualizacji rankingu w osobnym wątku"""
-        def run_async():
-            try:
-                result = asyncio.run(self.update_leaderboard_channel(user_database))
-                # Aktualizuj hash po udanej aktualizacji Discord
-                if result and update_hash_after:
-                    self.last_leaderboard_hash = self.get_leaderboard_hash(user_database)
-                    safe_print("🔄 Hash rankingu zaktualizowany po udanej aktualizacji Discord")
-            except Exception as e:
-                safe_print(f"❌ Błąd async aktualizacji rankingu: {e}")
-        
-        thread = threading.Thread(target=run_async, daemon=True)
-        thread.start()
+    def update_leaderboard_async(self, user_database):
+        """Zleca aktualizację rankingu sesji gateway (bez czekania)"""
+        # Wersja sprzed odczytu danych - zmiany w trakcie publikacji trafią do kolejnej aktualizacji
+        version = user_database.get_data_version()
+        
+        def on_done(result):
+            # Zapamiętaj wersję dopiero po udanej aktualizacji Discord (błąd = ponowienie przy kolejnym sprawdzeniu)
+            if result:
+                self.last_leaderboard_version = version
+        
+        return self.submit_gateway_job("leaderboard", self.update_leaderboard_channel, user_database, on_done=on_done)
     
     def update_leaderboard_if_changed(self, user_database):
         """Aktualizuje ranking na Discord tylko jeśli coś się zmieniło"""
         if self.check_leaderboard_changes(user_database):
             safe_print("🔄 Wykryto zmiany w rankingu - aktualizuję Discord...")
-            # Hash już zaktualizowany w check_leaderboard_changes, nie aktualizuj ponownie
-            self.update_leaderboard_async(user_database, update_hash_after=False)
-        else:
-            safe_print("ℹ️ Brak zmian w rankingu - nie aktualizuję Discord")
+            self.update_leaderboard_async(user_database)
     
     def force_update_leaderboard(self, user_database):
         """Wymusza aktualizację rankingu na Discord"""
         safe_print("🔄 Wymuszam aktualizację rankingu na Discord...")
-        # NIE aktualizuj hash przed wymuszeniem - pozwól automatycznemu systemowi wykryć zmiany
         self.update_leaderboard_async(user_database)
     
-    async def clear_discord_channel(self, channel_id: str, requester_username: str = "Admin"):
+    def clear_channel(self, channel_id: str, requester_username: str = "Admin"):
+        """Czyści kanał przez sesję gateway i czeka na wynik (wywoływać z osobnego wątku)"""
+        if not self.bot_enabled:
+            safe_print(f"❌ Discord bot nie jest skonfigurowany do czyszczenia kanałów")
+            return False
+        return self.gateway.run("clear_channel", self.clear_discord_channel, channel_id, requester_username, timeout=3600)
+    
+    async def clear_discord_channel(self, client, channel_id: str, requester_username: str = "Admin"):
         """Czyści wszystkie wiadomości z kanału Discord"""
         if not self.bot_enabled:
             safe_print(f"❌ Discord bot nie jest skonfigurowany do czyszczenia kanałów")
             return False
         
         try:
-            # Konfiguracja intents
-            intents = discord.Intents.default()
-            intents.guilds = True
-            intents.message_content = True
+            guild = client.get_guild(int(self.guild_id))
+            if not guild:
+                safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
+                return False
             
-            client = discord.Client(intents=intents)
+            channel = guild.get_channel(int(channel_id))
+            if not channel:
+                safe_print(f"❌ Nie znaleziono kanału o ID: {channel_id}")
+                return False
             
-            @client.event
-            async def on_ready():
-                try:
-                    guild = client.get_guild(int(self.guild_id))
-                    if not guild:
-                        safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
-                        await client.close()
-                        return
-                    
-                    channel = guild.get_channel(int(channel_id))
-                    if not channel:
-                        safe_print(f"❌ Nie znaleziono kanału o ID: {channel_id}")
-                        await client.close()
-                        return
-                    
-                    safe_print(f"🧹 Rozpoczynam czyszczenie kanału #{channel.name}...")
-                    
-                    # Wyślij powiadomienie o rozpoczęciu czyszczenia
-                    embed = {
-                        "title": "🧹 Rozpoczęto czyszczenie kanału",
-                        "description": f"Kanał **#{channel.name}** jest czyszczony przez **{requester_username}**",
-                        "color": 0xFFA500,  # Pomarańczowy
-                        "timestamp": self.get_poland_time().isoformat(),
-                        "footer": {
-                            "text": "KranikBot • Channel Cleanup"
-                        }
-                    }
-                    
-                    self.send_webhook_message("", embeds=[embed])
-                    
-                    # Pobierz wszystkie wiadomości
-                    messages = []
-                    async for message in channel.history(limit=None):
-                        messages.append(message)
-                    
-                    total_messages = len(messages)
-                    safe_print(f"📊 Znaleziono {total_messages} wiadomości do usunięcia")
-                    
-                    if total_messages == 0:
-                        safe_print(f"✅ Kanał jest już pusty")
-                        await client.close()
-                        return
-                    
-                    deleted_count = 0
-                    
-                    # Podziel wiadomości na nowe (bulk delete) i stare (pojedyncze)
-                    # Użyj UTC z timezone aware datetime
-                    import pytz
-                    now = datetime.now(pytz.UTC)
-                    two_weeks_ago = now - timedelta(days=14)
-                    
-                    new_messages = []
-                    old_messages = []
-                    
-                    for message in messages:
-                        # Upewnij się, że message.created_at ma timezone info
-                        message_time = message.created_at
-                        if message_time.tzinfo is None:
-                            # Jeśli message nie ma timezone, dodaj UTC
-                            message_time = message_time.replace(tzinfo=pytz.UTC)
-                        
-                        if message_time > two_weeks_ago:
-                            new_messages.append(message)
-                        else:
-                            old_messages.append(message)
-                    
-                    # Bulk delete dla nowych wiadomości (do 100 na raz)
-                    if new_messages:
-                        safe_print(f"🚀 Usuwam {len(new_messages)} nowych wiadomości (bulk delete)...")
+            safe_print(f"🧹 Rozpoczynam czyszczenie kanału #{channel.name}...")
+            
+            # Wyślij powiadomienie o rozpoczęciu czyszczenia
+            embed = {
+                "title": "🧹 Rozpoczęto czyszczenie kanału",
+                "description": f"Kanał **#{channel.name}** jest czyszczony przez **{requester_username}**",
+                "color": 0xFFA500,  # Pomarańczowy
+                "timestamp": self.get_poland_time().isoformat(),
+                "footer": {
+                    "text": "KranikBot • Channel Cleanup"
+                }
+            }
+            
+            self.send_webhook_message("", embeds=[embed])
+            
+            # Pobierz wszystkie wiadomości
+            messages = []
+            async for message in channel.history(limit=None):
+                messages.append(message)
+            
+            total_messages = len(messages)
+            safe_print(f"📊 Znaleziono {total_messages} wiadomości do usunięcia")
+            
+            if total_messages == 0:
+                safe_print(f"✅ Kanał jest już pusty")
+                return True
+            
+            deleted_count = 0
+            
+            # Podziel wiadomości na nowe (bulk delete) i stare (pojedyncze)
+            # Użyj UTC z timezone aware datetime
+            import pytz
+            now = datetime.now(pytz.UTC)
+            two_weeks_ago = now - timedelta(days=14)
+            
+            new_messages = []
+            old_messages = []
+            
+            for message in messages:
+                # Upewnij się, że message.created_at ma timezone info
+                message_time = message.created_at
+                if message_time.tzinfo is None:
+                    # Jeśli message nie ma timezone, dodaj UTC
+                    message_time = message_time.replace(tzinfo=pytz.UTC)
+                
+                if message_time > two_weeks_ago:
+                    new_messages.append(message)
+                else:
+                    old_messages.append(message)
+            
+            # Bulk delete dla nowych wiadomości (do 100 na raz)
+            if new_messages:
+                safe_print(f"🚀 Usuwam {len(new_messages)} nowych wiadomości (bulk delete)...")
+                
+                # Podziel na grupy po 100
+                for i in range(0, len(new_messages), 100):
+                    batch = new_messages[i:i+100]
+                    await channel.delete_messages(batch)
+                    deleted_count += len(batch)
+                    safe_print(f"✅ Usunięto {deleted_count}/{total_messages} wiadomości")
+                    
+                    # Krótka pauza między batch'ami
+                    await asyncio.sleep(1)
+            
+            # Pojedyncze usuwanie dla starych wiadomości
+            if old_messages:
+                safe_print(f"⏳ Usuwam {len(old_messages)} starych wiadomości (pojedynczo)...")
+                
+                for i, message in enumerate(old_messages):
+                    try:
+                        await message.delete()
+                        deleted_count += 1
                         
-                        # Podziel na grupy po 100
-                        for i in range(0, len(new_messages), 100):
-                            batch = new_messages[i:i+100]
-                            await channel.delete_messages(batch)
-                            deleted_count += len(batch)
+                        # Progress co 10 wiadomości
+                        if (i + 1) % 10 == 0:
                             safe_print(f"✅ Usunięto {deleted_count}/{total_messages} wiadomości")
-                            
-                            # Krótka pauza między batch'ami
-                            await asyncio.sleep(1)
-                    
-                    # Pojedyncze usuwanie dla starych wiadomości
-                    if old_messages:
-                        safe_print(f"⏳ Usuwam {len(old_messages)} starych wiadomości (pojedynczo)...")
                         
-                        for i, message in enumerate(old_messages):
-                            try:
-                                await message.delete()
-                                deleted_count += 1
-                                
-                                # Progress co 10 wiadomości
-                                if (i + 1) % 10 == 0:
-                                    safe_print(f"✅ Usunięto {deleted_count}/{total_messages} wiadomości")
-                                
-                                # Rate limit - 1 wiadomość na sekundę dla starych
-                                await asyncio.sleep(1.1)
-                                
-                            except discord.errors.NotFound:
-                                # Wiadomość już usunięta
-                                deleted_count += 1
-                                continue
-                            except Exception as e:
-                                safe_print(f"⚠️ Błąd usuwania wiadomości: {e}")
-                                continue
-                    
-                    safe_print(f"✅ Czyszczenie zakończone! Usunięto {deleted_count}/{total_messages} wiadomości")
-                    
-                    # Wyślij powiadomienie o zakończeniu
-                    embed = {
-                        "title": "✅ Czyszczenie kanału zakończone",
-                        "description": f"Kanał **#{channel.name}** został wyczyszczony",
-                        "color": 0x00FF00,  # Zielony
-                        "fields": [
-                            {
-                                "name": "🧹 Usunięto wiadomości",
-                                "value": f"{deleted_count}/{total_messages}",
-                                "inline": True
-                            },
-                            {
-                                "name": "👤 Zlecił",
-                                "value": requester_username,
-                                "inline": True
-                            }
-                        ],
-                        "timestamp": self.get_poland_time().isoformat(),
-                        "footer": {
-                            "text": "KranikBot • Channel Cleanup Complete"
-                        }
-                    }
-                    
-                    self.send_webhook_message("", embeds=[embed])
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd podczas czyszczenia kanału: {e}")
-                    
-                    # Wyślij powiadomienie o błędzie
-                    embed = {
-                        "title": "❌ Błąd czyszczenia kanału",
-                        "description": f"Wystąpił błąd podczas czyszczenia kanału",
-                        "color": 0xFF0000,  # Czerwony
-                        "fields": [
-                            {
-                                "name": "🐛 Błąd",
-                                "value": str(e)[:1000],  # Ogranicz długość
-                                "inline": False
-                            }
-                        ],
-                        "timestamp": self.get_poland_time().isoformat(),
-                        "footer": {
-                            "text": "KranikBot • Error"
-                        }
+                        # Rate limit - 1 wiadomość na sekundę dla starych
+                        await asyncio.sleep(1.1)
+                        
+                    except discord.errors.NotFound:
+                        # Wiadomość już usunięta
+                        deleted_count += 1
+                        continue
+                    except Exception as e:
+                        safe_print(f"⚠️ Błąd usuwania wiadomości: {e}")
+                        continue
+            
+            safe_print(f"✅ Czyszczenie zakończone! Usunięto {deleted_count}/{total_messages} wiadomości")
+            
+            # Wyślij powiadomienie o zakończeniu
+            embed = {
+                "title": "✅ Czyszczenie kanału zakończone",
+                "description": f"Kanał **#{channel.name}** został wyczyszczony",
+                "color": 0x00FF00,  # Zielony
+                "fields": [
+                    {
+                        "name": "🧹 Usunięto wiadomości",
+                        "value": f"{deleted_count}/{total_messages}",
+                        "inline": True
+                    },
+                    {
+                        "name": "👤 Zlecił",
+                        "value": requester_username,
+                        "inline": True
                     }
-                    
-                    self.send_webhook_message("", embeds=[embed])
-                
-                finally:
-                    await client.close()
+                ],
+                "timestamp": self.get_poland_time().isoformat(),
+                "footer": {
+                    "text": "KranikBot • Channel Cleanup Complete"
+                }
+            }
             
-            # Uruchom bota Discord
-            await client.start(self.bot_token)
-            return True
+            self.send_webhook_message("", embeds=[embed])
             
+            return True
         except Exception as e:
-            safe_print(f"❌ Błąd inicjalizacji Discord bota: {e}")
-            return False
+            safe_print(f"❌ Błąd podczas czyszczenia kanału: {e}")
+            
+            # Wyślij powiadomienie o błędzie
+            embed = {
+                "title": "❌ Błąd czyszczenia kanału",
+                "description": f"Wystąpił błąd podczas czyszczenia kanału",
+                "color": 0xFF0000,  # Czerwony
+                "fields": [
+                    {
+                        "name": "🐛 Błąd",
+                        "value": str(e)[:1000],  # Ogranicz długość
+                        "inline": False
+                    }
+                ],
+                "timestamp": self.get_poland_time().isoformat(),
+                "footer": {
+                    "text": "KranikBot • Error"
+                }
+            }
+            
+            self.send_webhook_message("", embeds=[embed])
+        
     
-    async def assign_discord_role(self, twitch_username: str, duration_hours: int = 168):
+    async def assign_discord_role(self, client, twitch_username: str, duration_hours: int = 168):
         """Automatycznie nadaje rolę Discord użytkownikowi"""
         if not self.bot_enabled or not self.special_role_id:
             safe_print(f"❌ Discord bot nie jest skonfigurowany do nadawania ról")
             return False
         
         try:
-            # Konfiguracja intents - z privileged intents
-            intents = discord.Intents.default()
-            intents.guilds = True
-            intents.members = True  # Potrzebne do wyszukiwania użytkowników
+            guild = client.get_guild(int(self.guild_id))
+            if not guild:
+                safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
+                return False
             
-            client = discord.Client(intents=intents)
+            role = guild.get_role(int(self.special_role_id))
+            if not role:
+                safe_print(f"❌ Nie znaleziono roli o ID: {self.special_role_id}")
+                return False
             
-            @client.event
-            async def on_ready():
-                try:
-                    guild = client.get_guild(int(self.guild_id))
-                    if not guild:
-                        safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
-                        await client.close()
-                        return
-                    
-                    role = guild.get_role(int(self.special_role_id))
-                    if not role:
-                        safe_print(f"❌ Nie znaleziono roli o ID: {self.special_role_id}")
-                        await client.close()
-                        return
-                    
-                    # Znajdź użytkownika po nazwie Twitch (może być w nicku lub display name)
-                    target_member = None
-                    for member in guild.members:
-                        # Sprawdź nick, display name i username
-                        if (member.display_name.lower() == twitch_username.lower() or
-                            member.name.lower() == twitch_username.lower() or
-                            (member.nick and member.nick.lower() == twitch_username.lower())):
-                            target_member = member
-                            break
-                    
-                    if not target_member:
-                        safe_print(f"❌ Nie znaleziono użytkownika Discord dla Twitch: {twitch_username}")
-                        # Wyślij powiadomienie o potrzebie ręcznego nadania roli
-                        self.request_manual_action(
-                            "discord_role",
-                            twitch_username,
-                            f"Nie znaleziono użytkownika Discord. Nadaj rolę '{role.name}' ręcznie na {duration_hours} godzin."
-                        )
-                        await client.close()
-                        return
-                    
-                    # Nadaj rolę
-                    await target_member.add_roles(role, reason=f"Automatyczne nadanie roli za zakup w sklepie Twitch (na {duration_hours}h)")
-                    
-                    safe_print(f"✅ Nadano rolę '{role.name}' użytkownikowi {target_member.display_name} ({twitch_username})")
-                    
-                    # Wyślij powiadomienie o sukcesie
-                    embed = {
-                        "title": "👑 Rola VIP nadana automatycznie!",
-                        "description": f"Użytkownik **{target_member.display_name}** otrzymał rolę VIP **{role.name}**",
-                        "color": 0xFFD700,  # Złoty dla VIP
-                        "fields": [
-                            {
-                                "name": "👤 Twitch",
-                                "value": twitch_username,
-                                "inline": True
-                            },
-                            {
-                                "name": "👑 Rola VIP",
-                                "value": role.name,
-                                "inline": True
-                            },
-                            {
-                                "name": "⏰ Czas trwania",
-                                "value": f"{duration_hours} godzin (7 dni)",
-                                "inline": True
-                            }
-                        ],
-                        "timestamp": self.get_poland_time().isoformat(),
-                        "footer": {
-                            "text": "KranikBot • VIP Role Assignment"
-                        }
-                    }
-                    
-                    self.send_webhook_message("", embeds=[embed])
-                    
-                    # Zaplanuj usunięcie roli w osobnym zadaniu
-                    if duration_hours > 0:
-                        asyncio.create_task(self._schedule_role_removal(target_member, role, duration_hours))
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd nadawania roli Discord: {e}")
-                finally:
-                    await client.close()
+            # Znajdź użytkownika: powiązanie z /link, potem indeks nazw (username, display name, nick)
+            target_member = await self.member_index.find_member(guild, twitch_username)
             
-            # Uruchom bota
-            await client.start(self.bot_token)
-            return True
+            if not target_member:
+                safe_print(f"❌ Nie znaleziono użytkownika Discord dla Twitch: {twitch_username}")
+                # Wyślij powiadomienie o potrzebie ręcznego nadania roli
+                self.request_manual_action(
+                    "discord_role",
+                    twitch_username,
+                    f"Nie znaleziono użytkownika Discord. Nadaj rolę '{role.name}' ręcznie na {duration_hours} godzin (lub niech użytkownik połączy konta: /link na Discordzie)."
+                )
+                return False
             
-        except Exception as e:
-            safe_print(f"❌ Błąd połączenia z Discord: {e}")
-            return False
-    
-    async def _schedule_role_removal(self, member, role, duration_hours):
-        """Planuje usunięcie roli po określonym czasie"""
-        try:
-            await asyncio.sleep(duration_hours * 3600)  # Konwersja na sekundy
-            await member.remove_roles(role, reason=f"Automatyczne usunięcie roli po {duration_hours}h")
-            safe_print(f"✅ Usunięto rolę '{role.name}' od użytkownika {member.display_name}")
-            
-            # Powiadomienie o usunięciu roli
-            embed_remove = {
-                "title": "👑 Rola VIP wygasła",
-                "description": f"Rola VIP **{role.name}** została automatycznie usunięta od **{member.display_name}**",
-                "color": 0xFFA500,  # Pomarańczowy
-                "timestamp": datetime.now().isoformat(),
+            # Nadaj rolę
+            await target_member.add_roles(role, reason=f"Automatyczne nadanie roli za zakup w sklepie Twitch (na {duration_hours}h)")
+            
+            safe_print(f"✅ Nadano rolę '{role.name}' użytkownikowi {target_member.display_name} ({twitch_username})")
+            
+            # Wyślij powiadomienie o sukcesie
+            embed = {
+                "title": "👑 Rola VIP nadana automatycznie!",
+                "description": f"Użytkownik **{target_member.display_name}** otrzymał rolę VIP **{role.name}**",
+                "color": 0xFFD700,  # Złoty dla VIP
+                "fields": [
+                    {
+                        "name": "👤 Twitch",
+                        "value": twitch_username,
+                        "inline": True
+                    },
+                    {
+                        "name": "👑 Rola VIP",
+                        "value": role.name,
+                        "inline": True
+                    },
+                    {
+                        "name": "⏰ Czas trwania",
+                        "value": f"{duration_hours} godzin (7 dni)",
+                        "inline": True
+                    }
+                ],
+                "timestamp": self.get_poland_time().isoformat(),
                 "footer": {
-                    "text": "KranikBot • VIP Role Expiration"
+                    "text": "KranikBot • VIP Role Assignment"
                 }
             }
             
-            self.send_webhook_message("", embeds=[embed_remove])
+            self.send_webhook_message("", embeds=[embed])
+            
+            # Zapisz wygaśnięcie roli - zdejmie ją wątek role_expiry
+            if duration_hours > 0:
+                await asyncio.to_thread(
+                    self.role_expiry.add, guild.id, target_member.id, role.id, duration_hours,
+                    twitch_username, target_member.display_name
+                )
+            
+            return True
         except Exception as e:
-            safe_print(f"❌ Błąd usuwania roli: {e}")
+            safe_print(f"❌ Błąd nadawania roli Discord: {e}")
+    
+    def notify_role_expired(self, member_name: str):
+        """Powiadamia o automatycznym usunięciu wygasłej roli"""
+        embed_remove = {
+            "title": "👑 Rola VIP wygasła",
+            "description": f"Rola VIP została automatycznie usunięta od **{member_name}**",
+            "color": 0xFFA500,  # Pomarańczowy
+            "timestamp": self.get_poland_time().isoformat(),
+            "footer": {
+                "text": "KranikBot • VIP Role Expiration"
+            }
+        }
+        
+        self.send_webhook_message("", embeds=[embed_remove])
 
     def assign_role_async(self, twitch_username: str, duration_hours: int = 168):
-        """Wrapper do uruchamiania nadawania ról w osobnym wątku"""
-        def run_async():
-            try:
-                asyncio.run(self.assign_discord_role(twitch_username, duration_hours))
-            except Exception as e:
-                safe_print(f"❌ Błąd async nadawania roli: {e}")
-        
-        thread = threading.Thread(target=run_async, daemon=True)
-        thread.start()
+        """Zleca nadanie roli sesji gateway (bez czekania)"""
+        return self.submit_gateway_job("assign_role", self.assign_discord_role, twitch_username, duration_hours)
     
     def notify_big_win(self, username: str, game: str, points: int):
         """Powiadamia o dużej wygranej w grze"""
@@ -838,81 +706,56 @@ class DiscordIntegration:
         self.send_stream_notification_async(is_live, title, game)
     
     def send_stream_notification_async(self, is_live: bool, title: str = "", game: str = ""):
-        """Wysyła powiadomienie o streamie na dedykowany kanał Discord"""
-        def run_async():
-            try:
-                asyncio.run(self.send_stream_notification(is_live, title, game))
-            except Exception as e:
-                safe_print(f"❌ Błąd wysyłania powiadomienia o streamie: {e}")
-        
-        thread = threading.Thread(target=run_async, daemon=True)
-        thread.start()
+        """Zleca powiadomienie o streamie na dedykowany kanał Discord (bez czekania)"""
+        return self.submit_gateway_job("stream_notification", self.send_stream_notification, is_live, title, game)
     
-    async def send_stream_notification(self, is_live: bool, title: str = "", game: str = ""):
+    async def send_stream_notification(self, client, is_live: bool, title: str = "", game: str = ""):
         """Wysyła powiadomienie o streamie na Discord"""
         try:
-            intents = discord.Intents.default()
-            intents.guilds = True
-            intents.message_content = True
-            
-            client = discord.Client(intents=intents)
+            guild = client.get_guild(int(self.guild_id))
+            if not guild:
+                safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
+                return None
             
-            @client.event
-            async def on_ready():
-                try:
-                    guild = client.get_guild(int(self.guild_id))
-                    if not guild:
-                        safe_print(f"❌ Nie znaleziono serwera Discord o ID: {self.guild_id}")
-                        await client.close()
-                        return
-                    
-                    channel = guild.get_channel(int(self.stream_channel_id))
-                    if not channel:
-                        safe_print(f"❌ Nie znaleziono kanału stream o ID: {self.stream_channel_id}")
-                        await client.close()
-                        return
-                    
-                    if is_live:
-                        # Stream LIVE
-                        embed = discord.Embed(
-                            title="🔴 Stream LIVE!",
-                            description="Stream właśnie się rozpoczął!",
-                            color=0xFF0000,
-                            timestamp=self.get_poland_time()
-                        )
-                        
-                        if title:
-                            embed.add_field(name="📺 Tytuł", value=title, inline=False)
-                        if game:
-                            embed.add_field(name="🎮 Gra", value=game, inline=False)
-                        
-                        embed.add_field(name="🎮 Link", value="**[Oglądaj na Twitch](https://twitch.tv/kranik1606)**", inline=False)
-                        embed.set_footer(text="KranikBot • Stream Notification")
-                        
-                        await channel.send("@everyone Stream się rozpoczął! 🎉", embed=embed)
-                        safe_print(f"✅ Wysłano powiadomienie LIVE na kanał #{channel.name}")
-                    else:
-                        # Stream OFF
-                        embed = discord.Embed(
-                            title="⚫ Stream zakończony",
-                            description="Stream właśnie się zakończył. Dzięki za oglądanie!",
-                            color=0x808080,
-                            timestamp=self.get_poland_time()
-                        )
-                        embed.set_footer(text="KranikBot • Stream Notification")
-                        
-                        await channel.send(embed=embed)
-                        safe_print(f"✅ Wysłano powiadomienie OFF na kanał #{channel.name}")
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd wysyłania powiadomienia o streamie: {e}")
-                finally:
-                    await client.close()
+            channel = guild.get_channel(int(self.stream_channel_id))
+            if not channel:
+                safe_print(f"❌ Nie znaleziono kanału stream o ID: {self.stream_channel_id}")
+                return None
             
-            await client.start(self.bot_token)
+            if is_live:
+                # Stream LIVE
+                embed = discord.Embed(
+                    title="🔴 Stream LIVE!",
+                    description="Stream właśnie się rozpoczął!",
+                    color=0xFF0000,
+                    timestamp=self.get_poland_time()
+                )
+                
+                if title:
+                    embed.add_field(name="📺 Tytuł", value=title, inline=False)
+                if game:
+                    embed.add_field(name="🎮 Gra", value=game, inline=False)
+                
+                embed.add_field(name="🎮 Link", value="**[Oglądaj na Twitch](https://twitch.tv/kranik1606)**", inline=False)
+                embed.set_footer(text="KranikBot • Stream Notification")
+                
+                await channel.send("@everyone Stream się rozpoczął! 🎉", embed=embed)
+                safe_print(f"✅ Wysłano powiadomienie LIVE na kanał #{channel.name}")
+            else:
+                # Stream OFF
+                embed = discord.Embed(
+                    title="⚫ Stream zakończony",
+                    description="Stream właśnie się zakończył. Dzięki za oglądanie!",
+                    color=0x808080,
+                    timestamp=self.get_poland_time()
+                )
+                embed.set_footer(text="KranikBot • Stream Notification")
+                
+                await channel.send(embed=embed)
+                safe_print(f"✅ Wysłano powiadomienie OFF na kanał #{channel.name}")
             
         except Exception as e:
-            safe_print(f"❌ Błąd połączenia z Discord (stream notification): {e}")
+            safe_print(f"❌ Błąd wysyłania powiadomienia o streamie: {e}")
     
     def request_manual_action(self, action_type: str, username: str, details: str):
         """Prosi moderatorów o ręczną akcję"""
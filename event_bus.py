@@ -0,0 +1,393 @@
+import os
+import json
+import time
+import queue
+import socket
+import threading
+from collections import deque
+
+EVENT_BUS_ENABLED = os.getenv("EVENT_BUS_ENABLED", "true").lower() == "true"
+EVENT_BUS_HOST = "127.0.0.1"  # Tylko lokalnie - szyna łączy procesy na jednej maszynie
+EVENT_BUS_PORT = int(os.getenv("EVENT_BUS_PORT", "8765"))
+EVENT_BUS_REPLAY = 200        # Ile ostatnich zdarzeń broker odtwarza nowym subskrybentom
+EVENT_BUS_PENDING = 500       # Ile zdarzeń klient trzyma, gdy nie ma połączenia z brokerem
+EVENT_BUS_RECONNECT = 2       # Odstęp między próbami połączenia (sekundy)
+EVENT_BUS_CONNECT_TIMEOUT = 5
+EVENT_BUS_CLIENT_QUEUE = 1000 # Klient z tyloma niewysłanymi zdarzeniami jest rozłączany
+
+# Typy zdarzeń i ich dane
+EVENT_TYPES = {
+    'points_changed': "version, users - zmiana punktów, użytkowników lub statystyk gier",
+    'follower_added': "username - nowy follower kanału",
+    'purchase': "username, reward_id, price - zakup w sklepie",
+    'role_granted': "grant_id, expires_at - nadanie lub przedłużenie roli Discord (dla wątku wygasania ról)",
+    'stream_status': "live, title, game - start/koniec streama",
+    'bot_health': "dane bota jak w bot_data.json (metryki, bezpieczniki, harmonogram)",
+}
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def encode_message(message):
+    """Wiadomość protokołu: jedna linia JSON"""
+    return (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
+class BrokerClient:
+    """Połączenie klienta po stronie brokera - własna kolejka wysyłki, żeby wolny klient nie blokował reszty"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=EVENT_BUS_CLIENT_QUEUE)
+        self.closed = False
+        threading.Thread(target=self._writer_loop, name='event-broker-writer', daemon=True).start()
+
+    def send(self, payload):
+        """Dokłada wiadomość do kolejki. Zwraca False gdy klient nie nadąża (trzeba go rozłączyć)"""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            return False
+
+    def _writer_loop(self):
+        while True:
+            payload = self.queue.get()
+            if payload is None:
+                return
+            try:
+                self.conn.sendall(payload)
+            except OSError:
+                self.close()
+                return
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+class EventBroker:
+    """Broker szyny zdarzeń - działa w jednym z procesów (tym, który pierwszy zajmie port).
+
+    Każde opublikowane zdarzenie dostaje kolejny numer i trafia do wszystkich klientów
+    oraz do bufora ostatnich EVENT_BUS_REPLAY zdarzeń odtwarzanego po podłączeniu.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.lock = threading.Lock()
+        self.epoch = f"{os.getpid()}-{int(time.time())}"  # Nowy broker = nowa numeracja zdarzeń
+        self.seq = 0
+        self.buffer = deque(maxlen=EVENT_BUS_REPLAY)
+        self.clients = set()
+        self.events = 0
+        self.disconnected = 0
+        threading.Thread(target=self._accept_loop, name='event-broker', daemon=True).start()
+
+    def _accept_loop(self):
+        """Przyjmuje połączenia klientów"""
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._client_loop, args=(conn,), name='event-broker-client', daemon=True).start()
+
+    def _client_loop(self, conn):
+        """Czyta wiadomości klienta: hello (podłączenie + odtworzenie) i publish"""
+        client = BrokerClient(conn)
+        try:
+            for line in conn.makefile('rb'):
+                message = json.loads(line)
+                if message.get('op') == 'hello':
+                    self._register(client, message)
+                elif message.get('op') == 'publish':
+                    self._publish(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._drop(client)
+
+    def _register(self, client, hello):
+        """Dodaje klienta i odtwarza mu zdarzenia, których jeszcze nie widział"""
+        since = hello.get('since', 0) if hello.get('epoch') == self.epoch else 0
+        with self.lock:
+            client.send(encode_message({'op': 'welcome', 'epoch': self.epoch, 'seq': self.seq}))
+            for event in self.buffer:
+                if event['seq'] > since:
+                    client.send(encode_message(event))
+            self.clients.add(client)
+
+    def _publish(self, message):
+        """Numeruje zdarzenie, zapisuje w buforze i rozsyła do klientów"""
+        with self.lock:
+            self.seq += 1
+            self.events += 1
+            event = {
+                'op': 'event',
+                'seq': self.seq,
+                'type': message.get('type'),
+                'data': message.get('data', {}),
+                'source': message.get('source'),
+                'ts': message.get('ts', time.time())
+            }
+            self.buffer.append(event)
+            payload = encode_message(event)
+            for client in list(self.clients):
+                if not client.send(payload):
+                    # Zawieszony klient nie blokuje reszty - odtworzy zdarzenia po ponownym połączeniu
+                    self.clients.discard(client)
+                    self.disconnected += 1
+                    client.close()
+
+    def _drop(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.discard(client)
+                self.disconnected += 1
+        client.close()
+
+    def get_stats(self):
+        """Zwraca statystyki brokera"""
+        with self.lock:
+            return {
+                'epoch': self.epoch,
+                'clients': len(self.clients),
+                'events': self.events,
+                'seq': self.seq,
+                'buffered': len(self.buffer),
+                'disconnected': self.disconnected
+            }
+
+class EventBus:
+    """Lokalna szyna zdarzeń pub/sub między botem Twitch, botem Discord i web API.
+
+    Połączenie TCP na 127.0.0.1 z wiadomościami JSON w liniach. Proces, który pierwszy zajmie
+    port, uruchamia u siebie brokera; pozostałe łączą się jako klienci i przejmują rolę brokera,
+    gdy jego proces się zakończy. Zdarzenia trafiają do bufora, z którego wysyła je osobny wątek,
+    więc publish() nie czeka na gniazdo (wywoływany m.in. przy zapisie do bazy).
+    Funkcje subscribe() są wywoływane w wątku szyny - powinny tylko zlecać pracę.
+    """
+
+    def __init__(self, name, port=EVENT_BUS_PORT):
+        self.name = name
+        self.port = port
+        self.lock = threading.Lock()
+        self.outgoing = threading.Condition(self.lock)  # Sygnał dla wątku wysyłki: nowe zdarzenie lub połączenie
+        self.handlers = {}  # typ zdarzenia -> lista funkcji
+        self.latest = {}    # typ zdarzenia -> ostatnie odebrane zdarzenie
+        self.pending = deque(maxlen=EVENT_BUS_PENDING)
+        self.sock = None
+        self.broker = None
+        self.thread = None
+        self.writer = None
+        self.epoch = None
+        self.last_seq = 0
+
+        # Statystyki
+        self.connected = False
+        self.connects = 0
+        self.published = 0
+        self.received = {}
+        self.dropped = 0
+        self.handler_errors = 0
+        self.last_error = None
+
+    def start(self):
+        """Uruchamia wątek połączenia z brokerem (jeśli szyna włączona)"""
+        with self.lock:
+            if not EVENT_BUS_ENABLED or (self.thread and self.thread.is_alive()):
+                return
+            self.thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+            self.thread.start()
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._writer_loop, name='event-bus-writer', daemon=True)
+                self.writer.start()
+
+    def subscribe(self, event_type, callback, replay_latest=False):
+        """Rejestruje funkcję callback(data, event) dla typu zdarzenia.
+
+        replay_latest=True od razu przekazuje ostatnie odebrane zdarzenie tego typu (stan, np. bot_health).
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Nieznany typ zdarzenia: {event_type}")
+        with self.lock:
+            self.handlers.setdefault(event_type, []).append(callback)
+            latest = self.latest.get(event_type) if replay_latest else None
+        if latest is not None:
+            callback(latest.get('data', {}), latest)
+
+    def publish(self, event_type, **data):
+        """Publikuje zdarzenie (nie blokuje - trafia do bufora, wysyła je wątek event-bus-writer)"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Nieznany typ zdarzenia: {event_type}")
+        message = {'op': 'publish', 'type': event_type, 'data': data, 'source': self.name, 'ts': time.time()}
+        with self.lock:
+            self.published += 1
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(message)
+            self.outgoing.notify()
+
+    def _writer_loop(self):
+        """Wysyła zdarzenia z bufora, gdy jest połączenie - zawieszony broker blokuje tylko ten wątek"""
+        while True:
+            with self.lock:
+                while self.sock is None or not self.pending:
+                    self.outgoing.wait()
+                sock = self.sock
+                message = self.pending.popleft()
+            try:
+                sock.sendall(encode_message(message))
+            except OSError as e:
+                with self.lock:
+                    self.last_error = str(e)
+                    # Zdarzenie wróci do kolejki i pójdzie po ponownym połączeniu
+                    self.pending.appendleft(message)
+                    if self.sock is sock:
+                        self._close_locked()
+
+    def _run(self):
+        """Pętla połączenia: klient brokera albo (gdy brokera nie ma) broker + klient"""
+        while True:
+            sock = self._connect()
+            if sock is None:
+                time.sleep(EVENT_BUS_RECONNECT)
+                continue
+            try:
+                self._session(sock)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+            with self.lock:
+                self._close_locked()
+            time.sleep(EVENT_BUS_RECONNECT)
+
+    def _connect(self):
+        """Łączy z brokerem; gdy nikt nie słucha na porcie - zostaje brokerem"""
+        try:
+            return socket.create_connection((EVENT_BUS_HOST, self.port), timeout=EVENT_BUS_CONNECT_TIMEOUT)
+        except OSError:
+            pass
+        try:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if os.name == 'nt':
+                # Na Windows SO_REUSEADDR pozwala przejąć zajęty port - wymuś wyłączność
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                # Port poprzedniego brokera może jeszcze mieć połączenia w TIME_WAIT
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((EVENT_BUS_HOST, self.port))
+            server.listen(16)
+        except OSError as e:
+            server.close()
+            self.last_error = str(e)
+            return None
+        self.broker = EventBroker(server)
+        safe_print(f"📡 Szyna zdarzeń: {self.name} jest brokerem na porcie {self.port}")
+        try:
+            return socket.create_connection((EVENT_BUS_HOST, self.port), timeout=EVENT_BUS_CONNECT_TIMEOUT)
+        except OSError:
+            return None
+
+    def _session(self, sock):
+        """Przedstawia się brokerowi, wysyła zaległe zdarzenia i odbiera nowe"""
+        sock.sendall(encode_message({'op': 'hello', 'name': self.name, 'epoch': self.epoch, 'since': self.last_seq}))
+        reader = sock.makefile('rb')
+        welcome = json.loads(reader.readline())
+        if welcome.get('epoch') != self.epoch:
+            self.epoch = welcome.get('epoch')
+            self.last_seq = 0
+        sock.settimeout(None)
+
+        with self.lock:
+            self.sock = sock
+            self.connected = True
+            self.connects += 1
+            self.outgoing.notify()  # Zaległe zdarzenia wysyła wątek event-bus-writer
+
+        for line in reader:
+            event = json.loads(line)
+            if event.get('op') == 'event':
+                self.last_seq = event['seq']
+                self._dispatch(event)
+
+    def _dispatch(self, event):
+        """Wywołuje funkcje zarejestrowane dla typu zdarzenia"""
+        event_type = event.get('type')
+        with self.lock:
+            self.received[event_type] = self.received.get(event_type, 0) + 1
+            self.latest[event_type] = event
+            handlers = list(self.handlers.get(event_type, []))
+        for callback in handlers:
+            try:
+                callback(event.get('data', {}), event)
+            except Exception as e:
+                self.handler_errors += 1
+                safe_print(f"❌ Błąd obsługi zdarzenia {event_type}: {e}")
+
+    def _close_locked(self):
+        """Zamyka połączenie - wywoływać pod lockiem"""
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)  # Przerywa też odczyt w wątku szyny
+            except OSError:
+                pass
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.connected = False
+
+    def get_stats(self):
+        """Zwraca statystyki klienta (i brokera, jeśli działa w tym procesie)"""
+        with self.lock:
+            return {
+                'name': self.name,
+                'enabled': EVENT_BUS_ENABLED,
+                'connected': self.connected,
+                'connects': self.connects,
+                'published': self.published,
+                'received': dict(self.received),
+                'pending': len(self.pending),
+                'dropped': self.dropped,
+                'handler_errors': self.handler_errors,
+                'last_seq': self.last_seq,
+                'last_error': self.last_error,
+                'broker': self.broker.get_stats() if self.broker else None
+            }
+
+EVENT_BUS = None
+EVENT_BUS_LOCK = threading.Lock()
+
+def get_event_bus(name=None):
+    """Zwraca szynę zdarzeń procesu (nazwa z pierwszego wywołania) i uruchamia połączenie"""
+    global EVENT_BUS
+    with EVENT_BUS_LOCK:
+        if EVENT_BUS is None:
+            EVENT_BUS = EventBus(name or f"pid-{os.getpid()}")
+        bus = EVENT_BUS
+    bus.start()
+    return bus
+
+def get_event_bus_stats():
+    """Statystyki szyny zdarzeń (dla web API) - pusty słownik gdy nieużywana"""
+    return EVENT_BUS.get_stats() if EVENT_BUS else {}
+
+def publish_database_changes(db, bus=None):
+    """Podpina UserDatabase pod szynę: każda zatwierdzona zmiana danych = zdarzenie points_changed"""
+    bus = bus or get_event_bus()
+    db.add_listener(lambda version, users: bus.publish('points_changed', version=version, users=users))
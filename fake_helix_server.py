@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokalny fałszywy serwer Twitch Helix do testów i benchmarków HelixClient.
+
+Uruchomienie:
+    python fake_helix_server.py --port 8787
+    TWITCH_HELIX_URL=http://127.0.0.1:8787/helix python testBot.py
+
+Benchmark klienta:
+    python fake_helix_server.py --bench 200
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+RATELIMIT_LIMIT = 800
+RATELIMIT_WINDOW = 60
+
+# Dane testowe
+FAKE_USERS = {
+    "kranik1606": {"id": "1000", "login": "kranik1606", "display_name": "Kranik1606"},
+    "raider": {"id": "2000", "login": "raider", "display_name": "Raider"},
+}
+FAKE_FOLLOWERS = [f"follower{i}" for i in range(250)]
+FAKE_SUBSCRIBERS = [f"sub{i}" for i in range(30)]
+FAKE_MODERATORS = ["mod1", "mod2"]
+FAKE_VIPS = ["vip1"]
+FAKE_GAMES = {"just chatting": "509658", "minecraft": "27471"}
+FAKE_CHANNELS = {
+    "1000": {"broadcaster_id": "1000", "title": "Testowy stream", "game_name": "Just Chatting"},
+    "2000": {"broadcaster_id": "2000", "title": "Rajd!", "game_name": "Minecraft"},
+}
+
+class FakeHelixState:
+    """Stan serwera: licznik limitu zapytań i statystyki wywołań"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.remaining = RATELIMIT_LIMIT
+        self.reset_at = int(time.time()) + RATELIMIT_WINDOW
+        self.calls = {}
+        self.live = False
+
+    def consume(self, path):
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.remaining = RATELIMIT_LIMIT
+                self.reset_at = int(now) + RATELIMIT_WINDOW
+            self.calls[path] = self.calls.get(path, 0) + 1
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+STATE = FakeHelixState()
+
+def paginate(items, params):
+    """Prosta paginacja z kursorem będącym indeksem"""
+    first = int(params.get('first', ['20'])[0])
+    start = int(params.get('after', ['0'])[0])
+    page = items[start:start + first]
+    pagination = {'cursor': str(start + first)} if start + first < len(items) else {}
+    return page, pagination
+
+class FakeHelixHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # Cisza w logach
+
+    def _send(self, status, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Ratelimit-Limit', str(RATELIMIT_LIMIT))
+        self.send_header('Ratelimit-Remaining', str(max(STATE.remaining, 0)))
+        self.send_header('Ratelimit-Reset', str(STATE.reset_at))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        path = url.path.replace('/helix', '', 1).strip('/')
+        params = parse_qs(url.query)
+
+        if not STATE.consume(path):
+            self._send(429, {'error': 'Too Many Requests', 'status': 429})
+            return
+
+        if method == 'PATCH' and path == 'channels':
+            length = int(self.headers.get('Content-Length', 0))
+            changes = json.loads(self.rfile.read(length) or b'{}')
+            channel = FAKE_CHANNELS.get(params.get('broadcaster_id', [''])[0])
+            if channel is None:
+                self._send(400, {'error': 'Bad Request'})
+                return
+            channel.update({k: v for k, v in changes.items() if k == 'title'})
+            self._send(204)
+            return
+
+        if path == 'users':
+            logins = params.get('login', [])
+            data = [FAKE_USERS[l.lower()] for l in logins if l.lower() in FAKE_USERS]
+            self._send(200, {'data': data})
+        elif path == 'channels/followers':
+            users = [{'user_name': name} for name in FAKE_FOLLOWERS]
+            page, pagination = paginate(users, params)
+            self._send(200, {'data': page, 'pagination': pagination, 'total': len(users)})
+        elif path == 'subscriptions':
+            users = [{'user_name': name} for name in FAKE_SUBSCRIBERS]
+            page, pagination = paginate(users, params)
+            self._send(200, {'data': page, 'pagination': pagination})
+        elif path == 'moderation/moderators':
+            page, pagination = paginate([{'user_name': n} for n in FAKE_MODERATORS], params)
+            self._send(200, {'data': page, 'pagination': pagination})
+        elif path == 'channels/vips':
+            page, pagination = paginate([{'user_name': n} for n in FAKE_VIPS], params)
+            self._send(200, {'data': page, 'pagination': pagination})
+        elif path == 'channels':
+            channel = FAKE_CHANNELS.get(params.get('broadcaster_id', [''])[0])
+            self._send(200, {'data': [channel] if channel else []})
+        elif path == 'games':
+            names = params.get('name', [])
+            data = [{'id': FAKE_GAMES[n.lower()], 'name': n} for n in names if n.lower() in FAKE_GAMES]
+            self._send(200, {'data': data})
+        elif path == 'streams':
+            self._send(200, {'data': [{'type': 'live'}] if STATE.live else []})
+        else:
+            self._send(404, {'error': 'Not Found'})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_PATCH(self):
+        self._route('PATCH')
+
+def start_fake_server(port=0):
+    """Uruchamia serwer w wątku tła, zwraca (server, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeHelixHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/helix"
+
+def run_benchmark(iterations):
+    """Mierzy HelixClient na lokalnym serwerze i wypisuje metryki per endpoint"""
+    from helix_client import HelixClient
+
+    server, base_url = start_fake_server()
+    client = HelixClient(client_id='fake', access_token='fake', channel='kranik1606', base_url=base_url)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        broadcaster_id = client.get_broadcaster_id()
+        client.get_paginated('channels/followers', {'broadcaster_id': broadcaster_id})
+        client.get_data('streams', {'user_login': client.channel})
+    elapsed = time.perf_counter() - start
+
+    print(f"Iteracje: {iterations}, czas: {elapsed:.2f}s")
+    for endpoint, stats in client.get_metrics()['endpoints'].items():
+        print(f"  {endpoint}: {stats['calls']} wywołań, śr. {stats['avg_ms']} ms, max {stats['max_ms']:.2f} ms")
+    print(f"Wywołania po stronie serwera: {STATE.calls}")
+    server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fałszywy serwer Twitch Helix")
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--live', action='store_true', help="Symuluj stream LIVE")
+    parser.add_argument('--bench', type=int, default=0, help="Uruchom benchmark z N iteracjami")
+    args = parser.parse_args()
+
+    STATE.live = args.live
+    if args.bench:
+        run_benchmark(args.bench)
+        return
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), FakeHelixHandler)
+    print(f"🧪 Fałszywy Helix: http://127.0.0.1:{args.port}/helix")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,20 @@
 import random
+import threading
 import time
 from database import UserDatabase
 from discord_integration import DiscordIntegration
+from leaderboard_cache import get_leaderboard_cache
+
+QUIZ_DURATION = 30  # Sekundy na odpowiedź w quizie
 
 class MiniGames:
-    def __init__(self, db: UserDatabase, bot=None):
+    def __init__(self, db: UserDatabase, bot=None, scheduler=None):
         self.db = db
         self.discord = DiscordIntegration()
         self.bot = bot
+        # Wspólne timery gier na czas (quiz, głosowania, zakłady) - jednorazowe zadania harmonogramu bota
+        self.scheduler = scheduler or getattr(bot, 'scheduler', None)
+        self.lock = threading.Lock()
         self.active_polls = {}
         self.quiz_questions = [
             # Łatwe pytania (10 punktów)
@@ -244,53 +251,82 @@ class MiniGames:
             
             return message
     
+    def arm_deadline(self, game, seconds, on_expire):
+        """Ustawia jednorazowy timer końca gry (zastępuje poprzedni timer tej gry)"""
+        if self.scheduler:
+            self.scheduler.call_later(f"deadline:{game}", seconds, on_expire)
+    
+    def cancel_deadline(self, game):
+        """Anuluje timer końca gry"""
+        if self.scheduler:
+            self.scheduler.cancel(f"deadline:{game}")
+    
+    def announce(self, message):
+        """Wysyła wiadomość gry na czat (np. po upływie czasu)"""
+        if self.bot and message:
+            self.bot.connection.privmsg(self.bot.get_channel_name(), message)
+    
     def start_quiz(self):
         """Rozpoczyna quiz"""
-        if self.current_quiz:
-            return "❓ Quiz już trwa! Odpowiedz na aktualne pytanie."
+        with self.lock:
+            if self.current_quiz:
+                return "❓ Quiz już trwa! Odpowiedz na aktualne pytanie."
+            
+            question_data = random.choice(self.quiz_questions)
+            self.current_quiz = question_data
+            self.quiz_end_time = time.time() + QUIZ_DURATION
         
-        question_data = random.choice(self.quiz_questions)
-        self.current_quiz = question_data
-        self.quiz_end_time = time.time() + 30  # 30 sekund na odpowiedź
+        # Koniec quizu dokładnie po upływie czasu, bez cyklicznego sprawdzania
+        self.arm_deadline("quiz", QUIZ_DURATION, self.on_quiz_deadline)
         
-        return f"❓ QUIZ (30s): {question_data['question']} | Nagroda: {question_data['points']} punktów!"
+        return f"❓ QUIZ ({QUIZ_DURATION}s): {question_data['question']} | Nagroda: {question_data['points']} punktów!"
     
     def answer_quiz(self, username, answer):
         """Sprawdza odpowiedź na quiz"""
-        if not self.current_quiz:
-            return f"❌ @{username}, nie ma aktywnego quizu! Użyj !quiz aby rozpocząć."
+        with self.lock:
+            quiz = self.current_quiz
+            if not quiz:
+                return f"❌ @{username}, nie ma aktywnego quizu! Użyj !quiz aby rozpocząć."
+            
+            if time.time() > self.quiz_end_time:
+                self.current_quiz = None
+                self.cancel_deadline("quiz")
+                return f"⏰ Czas minął! Prawidłowa odpowiedź to: {quiz['answer']}"
+            
+            correct = answer.lower().strip() == quiz['answer'].lower()
+            if correct:
+                # Zajmij quiz pod lockiem - tylko pierwsza poprawna odpowiedź wygrywa
+                self.current_quiz = None
+                self.cancel_deadline("quiz")
         
-        if time.time() > self.quiz_end_time:
-            correct_answer = self.current_quiz['answer']
-            self.current_quiz = None
-            return f"⏰ Czas minął! Prawidłowa odpowiedź to: {correct_answer}"
+        if not correct:
+            self.db.update_game_stats(username, "quiz", won=False)
+            return f"❌ @{username}, nieprawidłowa odpowiedź! Spróbuj ponownie."
         
         # Sprawdź czy użytkownik jest followerem
         is_follower = self.bot.is_follower(username) if self.bot else True
         
-        if answer.lower().strip() == self.current_quiz['answer'].lower():
-            points = self.current_quiz['points']
-            if is_follower:
-                self.db.add_points(username, points, is_follower)
-                self.db.update_game_stats(username, "quiz", won=True)
-                self.current_quiz = None
-                return f"🎉 @{username} odpowiedział prawidłowo! +{points} punktów!"
-            else:
-                self.db.update_game_stats(username, "quiz", won=True)
-                self.current_quiz = None
-                return f"🎉 @{username} odpowiedział prawidłowo! Ale musisz być followerem aby otrzymać punkty!"
-        else:
-            self.db.update_game_stats(username, "quiz", won=False)
-            return f"❌ @{username}, nieprawidłowa odpowiedź! Spróbuj ponownie."
+        points = quiz['points']
+        if is_follower:
+            self.db.add_points(username, points, is_follower)
+            self.db.update_game_stats(username, "quiz", won=True)
+            return f"🎉 @{username} odpowiedział prawidłowo! +{points} punktów!"
+        self.db.update_game_stats(username, "quiz", won=True)
+        return f"🎉 @{username} odpowiedział prawidłowo! Ale musisz być followerem aby otrzymać punkty!"
     
     def check_quiz_timeout(self):
         """Sprawdza czy quiz przekroczył limit czasu i automatycznie go kończy"""
-        if self.current_quiz and time.time() > self.quiz_end_time:
-            correct_answer = self.current_quiz['answer']
-            self.current_quiz = None
-            return f"⏰ Czas minął! Nikt nie odpowiedział. Prawidłowa odpowiedź to: {correct_answer}"
+        with self.lock:
+            if self.current_quiz and time.time() >= self.quiz_end_time:
+                correct_answer = self.current_quiz['answer']
+                self.current_quiz = None
+                return f"⏰ Czas minął! Nikt nie odpowiedział. Prawidłowa odpowiedź to: {correct_answer}"
         return None
     
+    def on_quiz_deadline(self):
+        """Timer końca quizu - ogłasza prawidłową odpowiedź jeśli nikt nie zgadł"""
+        self.announce(self.check_quiz_timeout())
+    
     def check_daily_bonus(self, username):
         """Sprawdza i przyznaje dzienny bonus"""
         # Sprawdź czy użytkownik jest followerem
@@ -319,20 +355,8 @@ class MiniGames:
         return f"📊 @{username}: {points} punktów | {messages} wiadomości{bonus_msg}"
     
     def get_leaderboard(self, limit=5):
-        """Pobiera ranking"""
-        top_users = self.db.get_top_users(limit)
-        
-        if not top_users:
-            return "📊 Ranking jest pusty!"
-        
-        leaderboard = "🏆 TOP RANKING: "
-        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
-        
-        for i, (username, points, messages) in enumerate(top_users):
-            medal = medals[i] if i < len(medals) else f"{i+1}."
-            leaderboard += f"{medal} {username}: {points} pkt | "
-        
-        return leaderboard.rstrip(" | ")
+        """Pobiera ranking (wspólny snapshot - jedno zapytanie na zmianę danych)"""
+        return get_leaderboard_cache(self.db).irc(limit)
     
     def give_points(self, from_user, to_user, points, is_moderator=False):
         """Przekazuje punkty między użytkownikami"""
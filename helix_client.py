@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from metadata_cache import TTLCache
+from resilience import SERVICE_TIMEOUTS, backoff_delay, get_breaker
+
+HELIX_BASE_URL = os.getenv("TWITCH_HELIX_URL", "https://api.twitch.tv/helix")
+HELIX_TIMEOUT = SERVICE_TIMEOUTS['helix']
+HELIX_MAX_RETRIES = 3
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+class HelixClient:
+    """Wspólny klient Twitch Helix API - jedna sesja keep-alive dla wszystkich zapytań"""
+
+    def __init__(self, client_id=None, access_token=None, channel=None, base_url=None, timeout=HELIX_TIMEOUT):
+        self.client_id = client_id or os.getenv('TWITCH_CLIENT_ID')
+        self.access_token = access_token or os.getenv('TWITCH_ACCESS_TOKEN')
+        self.channel = (channel or os.getenv('TWITCH_CHANNEL') or '').lstrip('#').lower()
+        self.base_url = (base_url or HELIX_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        # Wspólny bezpiecznik Helix - przy awarii Twitch zapytania są odrzucane od razu
+        self.breaker = get_breaker('helix')
+
+        # Jedna sesja z pulą połączeń (keep-alive) zamiast requests.get przy każdym wywołaniu
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Cache ID użytkowników (login -> id), ID nie zmieniają się; brak użytkownika pamiętany krótko
+        self.user_ids = TTLCache(maxsize=2048, ttl=24 * 3600, negative_ttl=300, name="helix_user_ids")
+        self.lock = threading.Lock()
+
+        # Stan limitu zapytań z nagłówków Ratelimit-*
+        self.ratelimit_remaining = None
+        self.ratelimit_reset = 0
+
+        # Metryki per endpoint: liczba wywołań, błędy, czasy odpowiedzi
+        self.metrics = {}
+        
+        # Liczba wywołań w podziale na stan streama (live/offline) - do porównania kosztu
+        self.stream_state = 'unknown'
+        self.calls_by_state = {}
+
+    def is_configured(self):
+        """Sprawdza czy klient ma dane dostępowe do Helix"""
+        return bool(self.client_id and self.access_token)
+
+    def get_headers(self):
+        """Zwraca nagłówki autoryzacji Helix"""
+        return {
+            'Client-ID': self.client_id,
+            'Authorization': f'Bearer {self.access_token}'
+        }
+
+    def _record_call(self, endpoint, duration_ms, status_code):
+        """Zapisuje metryki wywołania endpointu"""
+        with self.lock:
+            stats = self.metrics.setdefault(endpoint, {
+                'calls': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'last_ms': 0.0,
+                'last_status': None
+            })
+            stats['calls'] += 1
+            self.calls_by_state[self.stream_state] = self.calls_by_state.get(self.stream_state, 0) + 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['last_ms'] = duration_ms
+            stats['last_status'] = status_code
+            if status_code is None or status_code >= 400:
+                stats['errors'] += 1
+
+    def _update_ratelimit(self, response):
+        """Odczytuje nagłówki Ratelimit-Remaining/Ratelimit-Reset"""
+        remaining = response.headers.get('Ratelimit-Remaining')
+        reset = response.headers.get('Ratelimit-Reset')
+        try:
+            if remaining is not None:
+                self.ratelimit_remaining = int(remaining)
+            if reset is not None:
+                self.ratelimit_reset = int(reset)
+        except ValueError:
+            pass
+
+    def _wait_for_ratelimit(self):
+        """Czeka na odnowienie limitu jeśli został wyczerpany"""
+        if self.ratelimit_remaining is not None and self.ratelimit_remaining <= 0:
+            wait_seconds = self.ratelimit_reset - time.time()
+            if wait_seconds > 0:
+                wait_seconds = min(wait_seconds, 60)
+                safe_print(f"⏳ Limit Helix wyczerpany - czekam {wait_seconds:.1f}s")
+                time.sleep(wait_seconds)
+            self.ratelimit_remaining = None
+
+    def request(self, method, endpoint, params=None, json=None):
+        """Wykonuje zapytanie Helix z timeoutem i ponowieniami (429/5xx). Zwraca Response lub None"""
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        headers = self.get_headers()
+        if json is not None:
+            headers['Content-Type'] = 'application/json'
+
+        response = None
+        for attempt in range(HELIX_MAX_RETRIES):
+            if not self.breaker.allow():
+                safe_print(f"🔌 Helix niedostępny - pomijam {endpoint}")
+                return response
+            self._wait_for_ratelimit()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, params=params,
+                                                json=json, timeout=self.timeout)
+            except requests.RequestException as e:
+                self._record_call(endpoint, (time.perf_counter() - start) * 1000, None)
+                self.breaker.record_failure(e)
+                safe_print(f"❌ Błąd połączenia z Helix ({endpoint}): {e}")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self._record_call(endpoint, (time.perf_counter() - start) * 1000, response.status_code)
+            self._update_ratelimit(response)
+
+            if response.status_code >= 500:
+                self.breaker.record_failure(f"HTTP {response.status_code}")
+                safe_print(f"⚠️ Helix {response.status_code} dla {endpoint} (próba {attempt + 1}/{HELIX_MAX_RETRIES})")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            # Odpowiedź (także 4xx/429) oznacza, że usługa działa
+            self.breaker.record_success()
+            if response.status_code == 429:
+                self.ratelimit_remaining = 0
+                safe_print(f"⚠️ Helix 429 dla {endpoint} (próba {attempt + 1}/{HELIX_MAX_RETRIES})")
+                continue
+            return response
+
+        return response
+
+    def get(self, endpoint, params=None):
+        """GET na endpoint Helix"""
+        return self.request('GET', endpoint, params=params)
+
+    def patch(self, endpoint, params=None, json=None):
+        """PATCH na endpoint Helix"""
+        return self.request('PATCH', endpoint, params=params, json=json)
+
+    def get_data(self, endpoint, params=None):
+        """Zwraca listę 'data' z odpowiedzi lub None przy błędzie"""
+        response = self.get(endpoint, params)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else 'brak odpowiedzi'
+            safe_print(f"❌ Błąd Helix {endpoint}: {status}")
+            return None
+        return response.json().get('data', [])
+
+    def get_paginated(self, endpoint, params=None):
+        """Pobiera wszystkie strony wyników (cursor) lub None przy błędzie"""
+        params = dict(params or {})
+        params.setdefault('first', 100)
+        items = []
+
+        while True:
+            response = self.get(endpoint, params)
+            if response is None or response.status_code != 200:
+                status = response.status_code if response is not None else 'brak odpowiedzi'
+                safe_print(f"❌ Błąd Helix {endpoint}: {status}")
+                return None
+
+            data = response.json()
+            items.extend(data.get('data', []))
+
+            cursor = data.get('pagination', {}).get('cursor')
+            if not cursor:
+                break
+            params['after'] = cursor
+
+        return items
+
+    def get_user_id(self, login):
+        """Zwraca ID użytkownika (cache login -> id, równoległe zapytania łączone)"""
+        login = login.lstrip('#').lower()
+
+        def load():
+            data = self.get_data('users', {'login': login})
+            if data is None:
+                raise RuntimeError(f"Błąd Helix users dla {login}")
+            return data[0]['id'] if data else None
+
+        try:
+            return self.user_ids.get_or_load(login, load)
+        except RuntimeError as e:
+            safe_print(f"❌ {e}")
+            return None
+
+    def set_stream_state(self, state):
+        """Ustawia stan streama, do którego liczone są kolejne wywołania"""
+        self.stream_state = state
+
+    def get_broadcaster_id(self):
+        """Zwraca ID kanału bota (pobierane raz)"""
+        return self.get_user_id(self.channel)
+
+    def get_metrics(self):
+        """Zwraca metryki per endpoint (liczba wywołań, błędy, średni czas)"""
+        with self.lock:
+            result = {}
+            for endpoint, stats in self.metrics.items():
+                result[endpoint] = dict(stats)
+                result[endpoint]['avg_ms'] = round(stats['total_ms'] / stats['calls'], 2) if stats['calls'] else 0.0
+            return {
+                'endpoints': result,
+                'ratelimit_remaining': self.ratelimit_remaining,
+                'ratelimit_reset': self.ratelimit_reset,
+                'calls_by_state': dict(self.calls_by_state),
+                'breaker': self.breaker.get_stats(),
+                'user_id_cache': self.user_ids.stats()
+            }
@@ -0,0 +1,187 @@
+import os
+import copy
+import time
+import threading
+from datetime import datetime, timezone
+
+LEADERBOARD_SNAPSHOT_SIZE = int(os.getenv("LEADERBOARD_SNAPSHOT_SIZE", "50"))  # Ile pozycji trzyma snapshot
+
+POSITION_EMOJIS = {
+    1: "🥇", 2: "🥈", 3: "🥉",
+    4: "4️⃣", 5: "5️⃣", 6: "6️⃣", 7: "7️⃣", 8: "8️⃣", 9: "9️⃣", 10: "🔟"
+}
+
+class LeaderboardSnapshot:
+    """Ranking z jednej wersji danych + gotowe formaty (IRC, embed Discord, JSON) liczone raz"""
+
+    def __init__(self, version, rows, total_users, total_points):
+        self.version = version
+        self.rows = rows  # [(username, points, messages_count), ...] posortowane malejąco
+        self.total_users = total_users
+        self.total_points = total_points
+        self.created_at = datetime.now(timezone.utc)
+        self.lock = threading.Lock()
+        self.rendered = {}  # (format, parametry) -> wynik
+
+    def _render(self, key, renderer):
+        """Zwraca wynik z pamięci snapshotu albo renderuje go raz"""
+        with self.lock:
+            if key not in self.rendered:
+                self.rendered[key] = renderer()
+            return self.rendered[key]
+
+    def irc(self, limit=5):
+        """Jedna linia na czat Twitch (!top)"""
+        return self._render(('irc', limit), lambda: self._render_irc(limit))
+
+    def _render_irc(self, limit):
+        top_users = self.rows[:limit]
+        if not top_users:
+            return "📊 Ranking jest pusty!"
+
+        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+        parts = []
+        for i, (username, points, messages) in enumerate(top_users):
+            medal = medals[i] if i < len(medals) else f"{i+1}."
+            parts.append(f"{medal} {username}: {points} pkt")
+        return "🏆 TOP RANKING: " + " | ".join(parts)
+
+    def embed(self, limit=10, description="Najlepsi gracze ze streama", footer="KranikBot", with_stats=False):
+        """Słownik embeda Discord (discord.Embed.from_dict) - TOP 10 + kolejne pozycje do limitu"""
+        key = ('embed', limit, description, footer, with_stats)
+        # Kopia - Embed.from_dict trzyma referencje do list, a embed bywa potem modyfikowany
+        return copy.deepcopy(self._render(key, lambda: self._render_embed(limit, description, footer, with_stats)))
+
+    def _render_embed(self, limit, description, footer, with_stats):
+        top_users = self.rows[:limit]
+        fields = []
+
+        top_10_text = ""
+        for i, (username, points, messages) in enumerate(top_users[:10], 1):
+            emoji = POSITION_EMOJIS.get(i, f"{i}.")
+            top_10_text += f"{emoji} **{username}** - {points:,} pkt\n"
+        if top_10_text:
+            fields.append({'name': "🏆 TOP 10", 'value': top_10_text, 'inline': False})
+
+        # Dalsze pozycje w polach po 10 (limit długości pola Discord)
+        for start in range(10, len(top_users), 10):
+            chunk_text = ""
+            for i, (username, points, messages) in enumerate(top_users[start:start + 10], start + 1):
+                chunk_text += f"{i}. **{username}** - {points:,} pkt\n"
+            fields.append({'name': f"📊 Pozycje {start + 1}-{start + 10}", 'value': chunk_text, 'inline': False})
+
+        if with_stats:
+            fields.append({
+                'name': "📈 Statystyki ogólne",
+                'value': f"👥 Łącznie użytkowników: **{self.total_users}**\n💰 Rozdanych punktów: **{self.total_points:,}**",
+                'inline': False
+            })
+
+        return {
+            'title': "🏆 RANKING PUNKTÓW",
+            'description': description,
+            'color': 0xFFD700,  # Złoty
+            'timestamp': self.created_at.isoformat(),
+            'footer': {'text': footer},
+            'fields': fields
+        }
+
+    def json(self, limit=20):
+        """Dane rankingu dla web API"""
+        return self._render(('json', limit), lambda: {
+            'ranking': [
+                {'position': i, 'username': username, 'points': points, 'messages': messages}
+                for i, (username, points, messages) in enumerate(self.rows[:limit], 1)
+            ],
+            'total_users': self.total_users,  # Wszyscy użytkownicy kanału, nie długość strony
+            'data_version': self.version,
+            'generated_at': self.created_at.isoformat()
+        })
+
+class LeaderboardCache:
+    """Wspólny snapshot rankingu dla !top, kanału Discord, /leaderboard i /api/users/ranking.
+
+    Snapshot jest ważny dopóki nie zmieni się wersja danych bazy (UserDatabase.get_data_version),
+    więc seria !top czy odświeżeń panelu to jedno zapytanie rankingowe na zmianę danych.
+    Równoległe przebudowy tej samej wersji czekają na jedną.
+    """
+
+    def __init__(self, db, size=LEADERBOARD_SNAPSHOT_SIZE):
+        self.db = db
+        self.size = size
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.snapshot = None
+        self.hits = 0
+        self.builds = 0
+        self.last_build_time = 0.0
+
+    def get_snapshot(self):
+        """Zwraca snapshot dla aktualnej wersji danych (przebudowuje tylko po zmianie)"""
+        version = self.db.get_data_version()
+        with self.lock:
+            if self.snapshot is not None and self.snapshot.version == version:
+                self.hits += 1
+                return self.snapshot
+
+        with self.build_lock:
+            # Inny wątek mógł już zbudować tę wersję
+            with self.lock:
+                if self.snapshot is not None and self.snapshot.version >= version:
+                    self.hits += 1
+                    return self.snapshot
+
+            started = time.monotonic()
+            # Wersja czytana przed zapytaniem - zmiana w trakcie wymusi kolejną przebudowę, nie zgubi się
+            snapshot = LeaderboardSnapshot(
+                version,
+                self.db.get_top_users(self.size),
+                self.db.get_total_users_count(),
+                self.db.get_total_points_distributed()
+            )
+            with self.lock:
+                self.snapshot = snapshot
+                self.builds += 1
+                self.last_build_time = time.monotonic() - started
+            return snapshot
+
+    def irc(self, limit=5):
+        return self.get_snapshot().irc(limit)
+
+    def embed(self, limit=10, **kwargs):
+        return self.get_snapshot().embed(limit, **kwargs)
+
+    def json(self, limit=20):
+        return self.get_snapshot().json(min(limit, self.size))
+
+    def get_stats(self):
+        """Zwraca statystyki cache rankingu"""
+        with self.lock:
+            requests_total = self.hits + self.builds
+            return {
+                'version': self.snapshot.version if self.snapshot else None,
+                'size': self.size,
+                'hits': self.hits,
+                'builds': self.builds,
+                'hit_rate': round(self.hits / requests_total, 3) if requests_total else 0.0,
+                'last_build_ms': round(self.last_build_time * 1000, 1)
+            }
+
+CACHES = {}
+CACHES_LOCK = threading.Lock()
+
+def get_leaderboard_cache(db):
+    """Zwraca wspólny cache rankingu dla pliku bazy (jeden na proces, niezależnie od instancji UserDatabase)"""
+    key = os.path.abspath(db.db_path)
+    with CACHES_LOCK:
+        cache = CACHES.get(key)
+        if cache is None:
+            cache = LeaderboardCache(db)
+            CACHES[key] = cache
+        return cache
+
+def get_leaderboard_cache_stats():
+    """Statystyki cache rankingu (dla web API) - pusty słownik gdy nieużywany"""
+    with CACHES_LOCK:
+        caches = list(CACHES.values())
+    return caches[0].get_stats() if caches else {}
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+
+LIVE_CHECK_INTERVAL = int(os.getenv("LIVE_CHECK_INTERVAL", "5"))  # Sprawdzenie stanu, gdy nie przyszło zdarzenie (sekundy)
+LIVE_HEARTBEAT_INTERVAL = 15   # Co ile sekund heartbeat (utrzymuje połączenie przez proxy, czas serwera dla panelu)
+LIVE_STREAM_DURATION = 600     # Po tylu sekundach serwer kończy strumień - przeglądarka wraca z Last-Event-ID
+LIVE_REPLAY = 200              # Ile ostatnich zmian można odtworzyć po ponownym połączeniu
+LIVE_RETRY_MS = 3000           # Po ilu ms przeglądarka łączy się ponownie
+# Ile strumieni naraz na worker - każdy zajmuje wątek gthread, reszta zostaje dla zwykłych zapytań
+LIVE_MAX_STREAMS = int(os.getenv("LIVE_MAX_STREAMS", "4"))
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def format_event(event_type, data, event_id=None):
+    """Zdarzenie w formacie Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+def diff_ranking(old, new):
+    """Zmiana rankingu: tylko pozycje, które się zmieniły, i użytkownicy, którzy z niego wypadli"""
+    old_entries = {entry['username']: entry for entry in old['ranking']}
+    new_names = {entry['username'] for entry in new['ranking']}
+    return {
+        'full': False,
+        'changed': [entry for entry in new['ranking'] if old_entries.get(entry['username']) != entry],
+        'removed': [username for username in old_entries if username not in new_names],
+        'total_users': new.get('total_users'),
+        'data_version': new.get('data_version')
+    }
+
+class LiveChannel:
+    """Jeden rodzaj danych strumienia (np. status botów) - źródło i sposób liczenia zmian"""
+
+    def __init__(self, name, source, diff=None, ignore=()):
+        self.name = name
+        self.source = source    # Funkcja zwracająca aktualny stan (słownik)
+        self.diff = diff        # diff(stary, nowy) -> dane zdarzenia; bez niej wysyłany jest cały stan
+        self.ignore = ignore    # Klucze pomijane przy porównaniu (np. czas wygenerowania)
+
+    def compare_key(self, state):
+        return {key: value for key, value in state.items() if key not in self.ignore}
+
+class LiveStream:
+    """Stan dla panelu liczony raz na proces i wysyłany wszystkim połączonym panelom tylko po zmianie.
+
+    Identyfikator zdarzenia to "epoka-numer" - po ponownym połączeniu z Last-Event-ID tego samego procesu
+    panel dostaje tylko brakujące zmiany, w innym przypadku pełny stan.
+    """
+
+    def __init__(self):
+        self.channels = {}
+        self.state = {}  # nazwa kanału -> ostatni stan
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.buffer = deque(maxlen=LIVE_REPLAY)  # (numer, kanał, dane)
+        self.condition = threading.Condition()
+        self.wake_event = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+        # Statystyki
+        self.clients = 0
+        self.connections = 0
+        self.resumes = 0
+        self.rejected = 0
+        self.refreshes = 0
+        self.changes = 0
+        self.errors = 0
+
+    def add_channel(self, name, source, diff=None, ignore=()):
+        """Dodaje kanał danych - źródło jest wywoływane tylko w wątku strumienia"""
+        self.channels[name] = LiveChannel(name, source, diff, ignore)
+
+    def start(self):
+        """Uruchamia wątek sprawdzający stan (raz na proces)"""
+        with self.start_lock:
+            if self.thread is not None:
+                return
+            self.refresh()
+            self.thread = threading.Thread(target=self._run, daemon=True, name="live-stream")
+            self.thread.start()
+
+    def wake(self):
+        """Sygnał zmiany (np. zdarzenie z szyny) - stan zostanie sprawdzony od razu"""
+        self.wake_event.set()
+
+    def _run(self):
+        while True:
+            self.wake_event.wait(LIVE_CHECK_INTERVAL)
+            self.wake_event.clear()
+            self.refresh()
+
+    def refresh(self):
+        """Liczy stan kanałów i publikuje te, które się zmieniły"""
+        self.refreshes += 1
+        for channel in self.channels.values():
+            try:
+                new_state = channel.source()
+            except Exception as e:
+                self.errors += 1
+                safe_print(f"⚠️ Strumień na żywo: błąd kanału {channel.name}: {e}")
+                continue
+            old_state = self.state.get(channel.name)
+            if old_state is not None and channel.compare_key(old_state) == channel.compare_key(new_state):
+                continue
+            data = channel.diff(old_state, new_state) if channel.diff and old_state is not None else new_state
+            with self.condition:
+                self.state[channel.name] = new_state
+                self.seq += 1
+                self.buffer.append((self.seq, channel.name, data))
+                self.changes += 1
+                self.condition.notify_all()
+
+    def open(self):
+        """Rezerwuje miejsce dla strumienia panelu. False gdy worker obsługuje już LIVE_MAX_STREAMS strumieni"""
+        with self.condition:
+            if self.clients >= LIVE_MAX_STREAMS:
+                self.rejected += 1
+                return False
+            self.clients += 1
+            self.connections += 1
+            return True
+
+    def release(self):
+        """Zwalnia miejsce strumienia (po zamknięciu odpowiedzi)"""
+        with self.condition:
+            self.clients -= 1
+
+    def _event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def _resume_seq(self, last_event_id):
+        """Numer ostatniego zdarzenia panelu, jeśli brakujące zmiany są jeszcze w buforze - wywoływać pod lockiem"""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self.seq or (self.buffer and self.buffer[0][0] > seq + 1):
+            return None
+        return seq
+
+    def _snapshot(self):
+        """Pełny stan wszystkich kanałów - wywoływać pod lockiem"""
+        return self.seq, [format_event(name, state, self._event_id(self.seq)) for name, state in self.state.items()]
+
+    def stream(self, last_event_id=None):
+        """Generator strumienia SSE dla jednego panelu (miejsce rezerwuje wcześniej open())"""
+        self.start()
+        with self.condition:
+            seq = self._resume_seq(last_event_id)
+            if seq is None:
+                seq, chunks = self._snapshot()
+            else:
+                self.resumes += 1
+                chunks = []
+        yield f"retry: {LIVE_RETRY_MS}\n\n"
+        yield format_event('heartbeat', {'server_time': time.time()})
+        for chunk in chunks:
+            yield chunk
+
+        deadline = time.monotonic() + LIVE_STREAM_DURATION
+        next_heartbeat = time.monotonic() + LIVE_HEARTBEAT_INTERVAL
+        while time.monotonic() < deadline:
+            with self.condition:
+                if self.seq == seq:
+                    self.condition.wait(max(0, next_heartbeat - time.monotonic()))
+                if self.buffer and self.buffer[0][0] > seq + 1:
+                    # Panel nie nadążył - zmiany wypadły z bufora, wysyłamy pełny stan
+                    seq, chunks = self._snapshot()
+                else:
+                    chunks = [format_event(name, data, self._event_id(event_seq))
+                              for event_seq, name, data in self.buffer if event_seq > seq]
+                    seq = self.seq
+            for chunk in chunks:
+                yield chunk
+            if time.monotonic() >= next_heartbeat:
+                yield format_event('heartbeat', {'server_time': time.time()})
+                next_heartbeat = time.monotonic() + LIVE_HEARTBEAT_INTERVAL
+
+    def get_stats(self):
+        """Zwraca statystyki strumienia"""
+        with self.condition:
+            return {
+                'clients': self.clients,
+                'max_clients': LIVE_MAX_STREAMS,
+                'rejected': self.rejected,
+                'connections': self.connections,
+                'resumes': self.resumes,
+                'refreshes': self.refreshes,
+                'changes': self.changes,
+                'errors': self.errors,
+                'last_event_id': self._event_id(self.seq)
+            }
+
+LIVE_STREAM = None
+LIVE_STREAM_LOCK = threading.Lock()
+
+def get_live_stream():
+    """Zwraca strumień zmian procesu (jeden na worker web API)"""
+    global LIVE_STREAM
+    with LIVE_STREAM_LOCK:
+        if LIVE_STREAM is None:
+            LIVE_STREAM = LiveStream()
+        return LIVE_STREAM
+
+def get_live_stream_stats():
+    """Statystyki strumienia zmian (dla web API) - pusty słownik gdy nieużywany"""
+    return LIVE_STREAM.get_stats() if LIVE_STREAM else {}
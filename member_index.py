@@ -0,0 +1,251 @@
+import os
+import time
+import asyncio
+import string
+import secrets
+import sqlite3
+import threading
+import unicodedata
+import discord
+
+DISCORD_LINKS_DB = os.getenv("DISCORD_LINKS_DB", "discord_links.db")
+
+LINK_CODE_TTL = 600      # Ważność kodu z /link (sekundy)
+LINK_CODE_LENGTH = 6
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def normalize_name(name):
+    """Nazwa do porównań: NFKC, bez wielkości liter, bez '@' i białych znaków na brzegach"""
+    return unicodedata.normalize('NFKC', name or "").casefold().strip().lstrip('@')
+
+class MemberIndex:
+    """Mapowanie login Twitch -> członek Discord dla automatycznych ról.
+
+    Najpierw sprawdza trwałe powiązania z bazy (/link na Discordzie + !link <kod> na Twitchu),
+    potem indeks znormalizowanych nazw członków serwera. Indeks buduje się raz po połączeniu
+    z gateway i jest aktualizowany zdarzeniami join/update/remove - wyszukiwanie to O(1).
+
+    Kody i powiązania są w bazie - kod z /link w samodzielnym bocie Discord działa w bocie Twitch,
+    a powiązanie spoza pamięci procesu jest doczytywane przy pierwszym wyszukiwaniu.
+    """
+
+    def __init__(self, gateway=None, db_path=DISCORD_LINKS_DB):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.links = {}          # login Twitch -> ID członka Discord
+        self.names = {}          # znormalizowana nazwa -> zbiór ID członków
+        self.member_names = {}   # ID członka -> jego znormalizowane nazwy (do aktualizacji indeksu)
+        self.hits = {'link': 0, 'name': 0, 'ambiguous': 0, 'miss': 0}
+        self.init_database()
+        self.load()
+
+        if gateway:
+            gateway.add_listener('ready', self.on_ready)
+            gateway.add_listener('member_join', self.on_member_join)
+            gateway.add_listener('member_update', self.on_member_update)
+            gateway.add_listener('member_remove', self.on_member_remove)
+
+    def get_connection(self):
+        """Tworzy nowe połączenie z bazą powiązań"""
+        return sqlite3.connect(self.db_path, timeout=10.0)
+
+    def init_database(self):
+        """Tworzy tabelę powiązań kont"""
+        with self.lock:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS member_links (
+                        twitch_login TEXT PRIMARY KEY,
+                        discord_member_id INTEGER NOT NULL,
+                        linked_at REAL NOT NULL
+                    )
+                ''')
+                # Kody z /link czekające na !link na Twitchu (wspólne dla procesów)
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS link_codes (
+                        code TEXT PRIMARY KEY,
+                        discord_member_id INTEGER NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                conn.commit()
+
+    def load(self):
+        """Wczytuje powiązania z bazy"""
+        with self.lock:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT twitch_login, discord_member_id FROM member_links').fetchall()
+            self.links = {login: member_id for login, member_id in rows}
+        if rows:
+            safe_print(f"🔗 Wczytano {len(rows)} powiązań kont Twitch-Discord")
+
+    # === POWIĄZANIA (/link + !link) ===
+
+    def create_link_code(self, member_id):
+        """Tworzy jednorazowy kod dla członka Discord (wpisywany potem na Twitchu jako !link <kod>)"""
+        now = time.time()
+        code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(LINK_CODE_LENGTH))
+        with self.lock:
+            with self.get_connection() as conn:
+                conn.execute('DELETE FROM link_codes WHERE expires_at <= ?', (now,))
+                conn.execute('INSERT OR REPLACE INTO link_codes (code, discord_member_id, expires_at) VALUES (?, ?, ?)',
+                             (code, int(member_id), now + LINK_CODE_TTL))
+                conn.commit()
+        return code
+
+    def redeem_link_code(self, twitch_login, code):
+        """Wiąże login Twitch z członkiem Discord, który wygenerował kod. Zwraca True przy sukcesie"""
+        code = code.strip().upper()
+        with self.lock:
+            with self.get_connection() as conn:
+                row = conn.execute('SELECT discord_member_id, expires_at FROM link_codes WHERE code = ?',
+                                   (code,)).fetchone()
+                # Kod jednorazowy - usuwany w tej samej transakcji, w której został odczytany
+                deleted = conn.execute('DELETE FROM link_codes WHERE code = ?', (code,)).rowcount
+                conn.commit()
+        if not row or not deleted or row[1] <= time.time():
+            return False
+        self.link(twitch_login, row[0])
+        return True
+
+    def link(self, twitch_login, member_id):
+        """Zapisuje powiązanie login Twitch -> ID członka Discord"""
+        login = normalize_name(twitch_login)
+        with self.lock:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO member_links (twitch_login, discord_member_id, linked_at)
+                    VALUES (?, ?, ?)
+                ''', (login, int(member_id), time.time()))
+                conn.commit()
+            self.links[login] = int(member_id)
+        safe_print(f"🔗 Powiązano Twitch {login} z Discord ID {member_id}")
+
+    def _load_link(self, login):
+        """Doczytuje jedno powiązanie z bazy (po chybieniu w pamięci) - bez locka, który blokuje zdarzenia gateway"""
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT discord_member_id FROM member_links WHERE twitch_login = ?',
+                               (login,)).fetchone()
+        if not row:
+            return None
+        with self.lock:
+            self.links[login] = row[0]
+        return row[0]
+
+    # === INDEKS NAZW ===
+
+    def _index_member(self, member):
+        """Dodaje/aktualizuje nazwy członka w indeksie - wywoływać pod lockiem"""
+        self._unindex_member(member.id)
+        names = {normalize_name(name) for name in (member.name, member.display_name, member.nick) if name}
+        self.member_names[member.id] = names
+        for name in names:
+            self.names.setdefault(name, set()).add(member.id)
+
+    def _unindex_member(self, member_id):
+        """Usuwa członka z indeksu - wywoływać pod lockiem"""
+        for name in self.member_names.pop(member_id, ()):
+            ids = self.names.get(name)
+            if ids:
+                ids.discard(member_id)
+                if not ids:
+                    del self.names[name]
+
+    async def on_ready(self, client):
+        """Buduje indeks z członków serwerów po połączeniu z gateway"""
+        with self.lock:
+            self.names.clear()
+            self.member_names.clear()
+            for guild in client.guilds:
+                for member in guild.members:
+                    self._index_member(member)
+            count = len(self.member_names)
+        safe_print(f"📇 Zindeksowano {count} członków Discord")
+
+    async def on_member_join(self, member):
+        with self.lock:
+            self._index_member(member)
+
+    async def on_member_update(self, before, after):
+        with self.lock:
+            self._index_member(after)
+
+    async def on_member_remove(self, member):
+        with self.lock:
+            self._unindex_member(member.id)
+
+    # === WYSZUKIWANIE ===
+
+    def resolve(self, twitch_login):
+        """Zwraca (ID członka, źródło) dla loginu Twitch; źródło: 'link', 'name', 'ambiguous' lub 'miss'"""
+        login = normalize_name(twitch_login)
+        with self.lock:
+            member_id = self.links.get(login)
+        if not member_id:
+            # Powiązanie mogło powstać w innym procesie (np. !link w bocie Twitch)
+            member_id = self._load_link(login)
+        with self.lock:
+            if member_id:
+                source = 'link'
+            else:
+                ids = self.names.get(login, ())
+                if len(ids) == 1:
+                    member_id = next(iter(ids))
+                    source = 'name'
+                else:
+                    # Kilka osób o tej samej nazwie - nie zgaduj, potrzebne powiązanie przez /link
+                    source = 'ambiguous' if ids else 'miss'
+            self.hits[source] += 1
+        return member_id, source
+
+    async def find_member(self, guild, twitch_login):
+        """Zwraca członka Discord dla loginu Twitch lub None (wywoływać w pętli gateway)"""
+        # Chybienie w pamięci czyta bazę powiązań - poza pętlą sesji
+        member_id, source = await asyncio.to_thread(self.resolve, twitch_login)
+        if not member_id:
+            if source == 'ambiguous':
+                safe_print(f"⚠️ Kilku członków Discord pasuje do {twitch_login} - potrzebne /link")
+            return None
+        member = guild.get_member(member_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.NotFound:
+                return None
+        return member
+
+    def get_stats(self):
+        """Zwraca statystyki indeksu"""
+        with self.get_connection() as conn:
+            pending_codes = conn.execute('SELECT COUNT(*) FROM link_codes WHERE expires_at > ?',
+                                         (time.time(),)).fetchone()[0]
+        with self.lock:
+            return {
+                'links': len(self.links),
+                'indexed_members': len(self.member_names),
+                'indexed_names': len(self.names),
+                'pending_codes': pending_codes,
+                'lookups': dict(self.hits)
+            }
+
+MEMBER_INDEX = None
+MEMBER_INDEX_LOCK = threading.Lock()
+
+def get_member_index(gateway=None):
+    """Zwraca wspólny indeks członków (jeden na proces)"""
+    global MEMBER_INDEX
+    with MEMBER_INDEX_LOCK:
+        if MEMBER_INDEX is None:
+            MEMBER_INDEX = MemberIndex(gateway)
+        return MEMBER_INDEX
+
+def get_member_index_stats():
+    """Statystyki indeksu członków (dla web API) - pusty słownik gdy nieużywany"""
+    return MEMBER_INDEX.get_stats() if MEMBER_INDEX else {}
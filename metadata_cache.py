@@ -0,0 +1,122 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """Cache TTL + LRU z negatywnym cache'owaniem (None = "nie znaleziono") i łączeniem zapytań"""
+
+    def __init__(self, maxsize=512, ttl=600, negative_ttl=60, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.name = name
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # klucz -> (wartość, czas wygaśnięcia)
+        self.inflight = {}            # klucz -> zapytanie w toku (współdzielone przez wątki)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    def _get_entry(self, key):
+        """Zwraca (True, wartość) jeśli klucz jest w cache i nie wygasł - wywoływać pod lockiem"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, value
+
+    def _set_entry(self, key, value, ttl=None):
+        """Zapisuje wartość z odpowiednim TTL - wywoływać pod lockiem"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Zwraca wartość z cache lub default"""
+        with self.lock:
+            found, value = self._get_entry(key)
+            return value if found else default
+
+    def set(self, key, value, ttl=None):
+        """Zapisuje wartość w cache"""
+        with self.lock:
+            self._set_entry(key, value, ttl)
+
+    def invalidate(self, key):
+        """Usuwa klucz z cache"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Czyści cały cache"""
+        with self.lock:
+            self.entries.clear()
+
+    def get_or_load(self, key, loader):
+        """Zwraca wartość z cache lub ładuje ją loaderem.
+
+        Równoległe zapytania o ten sam klucz czekają na jedno wywołanie loadera.
+        Wynik None jest cache'owany krócej (negative_ttl). Wyjątki loadera nie są
+        cache'owane - dostaje je każdy czekający wątek.
+        """
+        with self.lock:
+            found, value = self._get_entry(key)
+            if found:
+                if value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return value
+
+            pending = self.inflight.get(key)
+            if pending is None:
+                pending = {'event': threading.Event(), 'value': None, 'error': None}
+                self.inflight[key] = pending
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            pending['event'].wait()
+            if pending['error'] is not None:
+                raise pending['error']
+            return pending['value']
+
+        try:
+            value = loader()
+            pending['value'] = value
+            with self.lock:
+                self.loads += 1
+                self._set_entry(key, value)
+            return value
+        except Exception as e:
+            pending['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            pending['event'].set()
+
+    def stats(self):
+        """Zwraca statystyki cache"""
+        with self.lock:
+            return {
+                'name': self.name,
+                'size': len(self.entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'coalesced': self.coalesced
+            }
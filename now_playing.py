@@ -0,0 +1,127 @@
+import time
+import threading
+
+NOW_PLAYING_INTERVAL = 15   # Odpytywanie Spotify co tyle sekund w trakcie streama
+ON_DEMAND_MAX_AGE = 15      # Poza streamem: jak długo ważny jest wynik pobrany na żądanie
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+class NowPlaying:
+    """Wspólny cache aktualnie granego utworu dla !currentsong, web panelu i Discord.
+
+    W trakcie streama odpytuje Spotify raz na interwał w harmonogramie bota;
+    poza streamem pobiera dane tylko na żądanie (z krótkim cache).
+    Przy zmianie utworu wywołuje zarejestrowane funkcje on_track_change.
+    """
+
+    def __init__(self, spotify, scheduler=None, interval=NOW_PLAYING_INTERVAL):
+        self.spotify = spotify
+        self.scheduler = scheduler
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()
+        self.track = None          # Ostatni znany utwór (słownik) lub None
+        self.fetched_at = 0.0      # time.monotonic() ostatniego pobrania
+        self.polling = False
+        self.listeners = []
+        self.polls = 0
+        self.track_changes = 0
+
+    def on_track_change(self, callback):
+        """Rejestruje funkcję wywoływaną z nowym utworem (lub None) przy zmianie"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Włącza cykliczne odpytywanie (stream LIVE)"""
+        self.polling = True
+        if self.scheduler:
+            self.scheduler.add_job('now_playing', self.poll, interval=self.interval, timeout=30, max_backoff=300)
+        safe_print(f"🎵 Odpytywanie aktualnego utworu włączone (co {self.interval}s)")
+
+    def stop(self):
+        """Wyłącza cykliczne odpytywanie (stream OFFLINE)"""
+        self.polling = False
+        if self.scheduler:
+            self.scheduler.cancel('now_playing')
+        safe_print(f"🎵 Odpytywanie aktualnego utworu wyłączone")
+
+    def poll(self):
+        """Zadanie harmonogramu - pobiera aktualne odtwarzanie"""
+        with self.fetch_lock:
+            self._fetch()
+
+    def _fetch(self):
+        """Pobiera aktualne odtwarzanie ze Spotify i aktualizuje cache - wywoływać pod fetch_lock"""
+        if not self.spotify.ensure_token_valid():
+            raise RuntimeError("Brak ważnego tokenu Spotify")
+        playback = self.spotify.current_playback()
+        self.polls += 1
+        self._update(playback)
+
+    def _update(self, playback):
+        """Zapisuje odtwarzanie w cache i powiadamia o zmianie utworu"""
+        track = None
+        if playback and playback.get('item'):
+            item = playback['item']
+            track = {
+                'uri': item.get('uri'),
+                'name': item.get('name'),
+                'artists': ", ".join(artist['name'] for artist in item.get('artists', [])),
+                'album': item.get('album', {}).get('name'),
+                'url': item.get('external_urls', {}).get('spotify'),
+                'duration_ms': item.get('duration_ms') or 0,
+                'progress_ms': playback.get('progress_ms') or 0,
+                'is_playing': bool(playback.get('is_playing'))
+            }
+
+        with self.lock:
+            previous_uri = self.track['uri'] if self.track else None
+            self.track = track
+            self.fetched_at = time.monotonic()
+            changed = (track['uri'] if track else None) != previous_uri
+            if changed:
+                self.track_changes += 1
+
+        if changed:
+            for callback in self.listeners:
+                try:
+                    callback(track)
+                except Exception as e:
+                    safe_print(f"❌ Błąd obsługi zmiany utworu: {e}")
+
+    def get_current(self, refresh=True):
+        """Zwraca aktualny utwór z cache (z szacowanym postępem) lub None.
+
+        Poza streamem odświeża cache na żądanie, ale nie częściej niż co ON_DEMAND_MAX_AGE.
+        Z refresh=False nigdy nie odpytuje Spotify.
+        """
+        if refresh and not self.polling and time.monotonic() - self.fetched_at > ON_DEMAND_MAX_AGE:
+            # Jedno pobranie naraz - równoległe wywołania czekają i biorą wynik z cache
+            with self.fetch_lock:
+                if time.monotonic() - self.fetched_at > ON_DEMAND_MAX_AGE:
+                    self._fetch()
+
+        with self.lock:
+            if not self.track:
+                return None
+            track = dict(self.track)
+            age_ms = int((time.monotonic() - self.fetched_at) * 1000)
+        if track['is_playing']:
+            track['progress_ms'] = min(track['progress_ms'] + age_ms, track['duration_ms'])
+        return track
+
+    def get_stats(self):
+        """Zwraca statystyki odpytywania"""
+        with self.lock:
+            return {
+                'polling': self.polling,
+                'polls': self.polls,
+                'track_changes': self.track_changes,
+                'age_seconds': round(time.monotonic() - self.fetched_at, 1) if self.fetched_at else None
+            }
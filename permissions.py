@@ -0,0 +1,81 @@
+OWNER = "kranik1606"
+
+def parse_tags(event):
+    """Zamienia tagi IRCv3 zdarzenia na słownik {klucz: wartość}.
+
+    Biblioteka irc podaje tagi jako listę słowników {'key': ..., 'value': ...};
+    obsługiwany jest też format tekstowy 'klucz=wartość'.
+    """
+    tags = {}
+    for tag in getattr(event, 'tags', None) or []:
+        if isinstance(tag, dict):
+            tags[tag.get('key')] = tag.get('value') or ''
+        elif '=' in tag:
+            key, value = tag.split('=', 1)
+            tags[key] = value
+    return tags
+
+def parse_badges(badges):
+    """Zwraca zbiór nazw odznak z tagu 'badges' (np. 'moderator/1,subscriber/12')"""
+    if not badges:
+        return set()
+    return {badge.split('/', 1)[0] for badge in badges.split(',')}
+
+class PermissionResolver:
+    """Aktualizuje listy uprawnień bota na podstawie tagów każdej wiadomości z czatu.
+
+    Role z tagów działają natychmiast; Helix służy już tylko do rzadkiej synchronizacji.
+    """
+
+    def __init__(self, bot, owner=OWNER):
+        self.bot = bot
+        self.owner = owner
+        self.updates = 0
+
+    def resolve_roles(self, tags):
+        """Zwraca (is_mod, is_vip, is_sub) na podstawie tagów wiadomości"""
+        badges = parse_badges(tags.get('badges'))
+        is_mod = tags.get('mod') == '1' or 'moderator' in badges or 'broadcaster' in badges
+        is_vip = 'vip' in tags or 'vip' in badges
+        is_sub = tags.get('subscriber') == '1' or 'subscriber' in badges or 'founder' in badges
+        return is_mod, is_vip, is_sub
+
+    def update_from_event(self, username, event):
+        """Aktualizuje role użytkownika z tagów PRIVMSG. Zwraca True jeśli coś się zmieniło"""
+        tags = parse_tags(event)
+        if not tags:
+            return False
+        return self.update_user(username, *self.resolve_roles(tags))
+
+    def update_user(self, username, is_mod, is_vip, is_sub):
+        """Ustawia role jednego użytkownika i przelicza jego członkostwo w listach uprawnień"""
+        username = username.lower()
+        bot = self.bot
+
+        changed = self._set_member(bot.moderators, username, is_mod)
+        changed |= self._set_member(bot.vips, username, is_vip)
+        changed |= self._set_member(bot.subscribers, username, is_sub)
+        if not changed:
+            return False
+
+        # Te same reguły co update_permission_lists, ale tylko dla jednego użytkownika
+        is_owner = username == self.owner
+        self._set_member(bot.trusted_users, username, is_mod or is_vip or is_owner)
+        self._set_member(bot.subs_no_limit, username, is_sub or is_vip or is_owner)
+        self._set_member(bot.allowed_skip, username, is_mod or is_vip or is_owner)
+
+        self.updates += 1
+        return True
+
+    @staticmethod
+    def _set_member(members, username, present):
+        """Dodaje lub usuwa użytkownika ze zbioru. Zwraca True jeśli zbiór się zmienił"""
+        if present:
+            if username in members:
+                return False
+            members.add(username)
+            return True
+        if username not in members:
+            return False
+        members.discard(username)
+        return True
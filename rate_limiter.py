@@ -0,0 +1,154 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Limity komend gier: poziom -> (ile użyć od razu, co ile sekund odnawia się jedno użycie)
+# 'global' to wspólny limit komendy dla całego czatu
+COMMAND_LIMITS = {
+    '!roll': {'default': (2, 10), 'sub': (3, 5), 'trusted': (5, 2), 'global': (10, 1)},
+    '!coinflip': {'default': (2, 10), 'sub': (3, 5), 'trusted': (5, 2), 'global': (10, 1)},
+    '!roulette': {'default': (1, 15), 'sub': (2, 10), 'trusted': (3, 5), 'global': (6, 1)},
+    '!answer': {'default': (3, 5), 'sub': (4, 3), 'trusted': (5, 2), 'global': (15, 0.5)},
+}
+
+# Jak TwitchBot.on_message rozpoznaje komendę: (wiadomość równa tekstowi | wiadomość zaczyna się od tekstu, tekst).
+# Limit dotyczy tylko wiadomości, które naprawdę uruchomią grę - zwykły czat nie traci tokenów
+COMMAND_MATCH = {
+    '!roll': ('exact', "!roll"),
+    '!coinflip': ('prefix', "!coinflip"),
+    '!roulette': ('prefix', "!roulette "),
+    '!answer': ('prefix', "!answer "),
+}
+
+# Wspólny budżet odpowiedzi bota na komendy gier (Twitch: ok. 20 wiadomości / 30 s)
+GLOBAL_LIMIT = (20, 1.5)
+
+class TokenBucket:
+    """Kubełek tokenów: capacity użyć od razu, jeden token odnawia się co period sekund"""
+
+    __slots__ = ('capacity', 'period', 'tokens', 'updated', 'notified')
+
+    def __init__(self, capacity, period, now):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = float(capacity)
+        self.updated = now
+        self.notified = False
+
+    def refill(self, now):
+        """Dolicza tokeny za czas od ostatniej aktualizacji"""
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.period)
+            self.updated = now
+
+    def retry_after(self):
+        """Sekundy do odnowienia jednego tokenu"""
+        return max(0.0, (1 - self.tokens) * self.period)
+
+    def idle_full(self, now):
+        """Czy kubełek i tak byłby już pełny (można go zapomnieć)"""
+        return now - self.updated >= (self.capacity - self.tokens) * self.period
+
+class CommandLimiter:
+    """Cooldowny komend gier: kubełki per użytkownik+komenda, per komenda i wspólny.
+
+    Odrzucenia są liczone w pamięci - odrzucona komenda nie dotyka bazy danych.
+    Kubełki użytkowników trzymane są w LRU z limitem rozmiaru; nieaktywne wygasają.
+    """
+
+    def __init__(self, bot=None, limits=None, global_limit=GLOBAL_LIMIT, maxsize=5000):
+        self.bot = bot
+        self.limits = limits or COMMAND_LIMITS
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.user_buckets = OrderedDict()  # (komenda, użytkownik) -> TokenBucket
+        now = time.monotonic()
+        self.command_buckets = {
+            command: TokenBucket(*limits_for_command['global'], now)
+            for command, limits_for_command in self.limits.items()
+        }
+        self.global_bucket = TokenBucket(*global_limit, now)
+        self.allowed = {}
+        self.rejected = {}
+        self.evicted = 0
+
+    def get_tier(self, username):
+        """Poziom limitu na podstawie list uprawnień bota"""
+        if self.bot:
+            if username in self.bot.trusted_users:
+                return 'trusted'
+            if username in self.bot.subs_no_limit:
+                return 'sub'
+        return 'default'
+
+    def is_limited(self, command):
+        """Czy komenda podlega limitom"""
+        return command in self.limits
+
+    def match(self, message):
+        """Komenda z limitem, którą uruchomi wiadomość (reguły COMMAND_MATCH jak w on_message), albo None"""
+        for command in self.limits:
+            kind, text = COMMAND_MATCH.get(command, ('exact', command))
+            if message == text if kind == 'exact' else message.startswith(text):
+                return command
+        return None
+
+    def check(self, username, command):
+        """Zużywa użycie komendy. Zwraca (dozwolone, sekundy do ponowienia, czy powiadomić użytkownika)"""
+        limits_for_command = self.limits.get(command)
+        if limits_for_command is None:
+            return True, 0.0, False
+
+        tier = self.get_tier(username)
+        now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+            key = (command, username)
+            bucket = self.user_buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*limits_for_command[tier], now)
+                self.user_buckets[key] = bucket
+            else:
+                self.user_buckets.move_to_end(key)
+                # Poziom mógł się zmienić (np. nowy sub) - zachowaj zużycie, zmień parametry
+                bucket.capacity, bucket.period = limits_for_command[tier]
+                bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+            buckets = (bucket, self.command_buckets[command], self.global_bucket)
+            for b in buckets:
+                b.refill(now)
+
+            blocking = [b for b in buckets if b.tokens < 1]
+            if blocking:
+                self.rejected[command] = self.rejected.get(command, 0) + 1
+                # Powiadom tylko raz na cooldown i tylko o limicie osobistym
+                notify = blocking[0] is bucket and not bucket.notified
+                if blocking[0] is bucket:
+                    bucket.notified = True
+                return False, max(b.retry_after() for b in blocking), notify
+
+            for b in buckets:
+                b.tokens -= 1
+            bucket.notified = False
+            self.allowed[command] = self.allowed.get(command, 0) + 1
+            return True, 0.0, False
+
+    def _prune(self, now):
+        """Usuwa wygasłe kubełki z początku LRU i pilnuje limitu rozmiaru - wywoływać pod lockiem"""
+        while self.user_buckets:
+            key, bucket = next(iter(self.user_buckets.items()))
+            if len(self.user_buckets) >= self.maxsize:
+                self.evicted += 1
+            elif not bucket.idle_full(now):
+                break
+            self.user_buckets.popitem(last=False)
+
+    def stats(self):
+        """Zwraca statystyki limitera"""
+        with self.lock:
+            return {
+                'tracked_users': len(self.user_buckets),
+                'allowed': dict(self.allowed),
+                'rejected': dict(self.rejected),
+                'evicted': self.evicted
+            }
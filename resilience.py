@@ -0,0 +1,153 @@
+import os
+import time
+import random
+import threading
+
+# Limity czasu zapytań per usługa (sekundy)
+SERVICE_TIMEOUTS = {
+    'helix': float(os.getenv("TWITCH_HELIX_TIMEOUT", "10")),
+    'spotify': float(os.getenv("SPOTIFY_TIMEOUT", "10")),
+    'discord': float(os.getenv("DISCORD_TIMEOUT", "10")),
+}
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Wykładnicze opóźnienie z losowym rozrzutem (full jitter) dla próby nr attempt (od 0)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class CircuitOpenError(Exception):
+    """Usługa jest oznaczona jako niedostępna - zapytanie odrzucone bez wykonywania"""
+
+class CircuitBreaker:
+    """Bezpiecznik usługi: po serii błędów przestaje wysyłać zapytania na pewien czas.
+
+    closed -> (failure_threshold błędów z rzędu) -> open -> (po reset_timeout) -> half_open
+    W stanie half_open przepuszcza jedno zapytanie próbne: sukces zamyka bezpiecznik,
+    błąd otwiera go ponownie na dłużej (wykładniczo, z rozrzutem, do max_reset_timeout).
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, max_reset_timeout=600):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.open_count = 0         # Ile razy z rzędu bezpiecznik się otwierał (do backoffu)
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+
+        # Statystyki
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self.last_failure = None
+
+    def allow(self):
+        """Czy można wykonać zapytanie"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() >= self.opened_until:
+                self.state = 'half_open'
+                self.probe_in_flight = False
+            if self.state == 'half_open' and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Zapisuje udane zapytanie"""
+        with self.lock:
+            self.calls += 1
+            self.consecutive_failures = 0
+            if self.state != 'closed':
+                safe_print(f"✅ Usługa {self.name} znowu dostępna - bezpiecznik zamknięty")
+            self.state = 'closed'
+            self.open_count = 0
+            self.probe_in_flight = False
+
+    def record_failure(self, error=None):
+        """Zapisuje błąd zapytania; po przekroczeniu progu otwiera bezpiecznik"""
+        with self.lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = str(error) if error else None
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def record_ignored(self):
+        """Błąd niezwiązany z dostępnością usługi (np. błąd w kodzie zadania) - tylko zwalnia próbę half_open"""
+        with self.lock:
+            self.calls += 1
+            self.probe_in_flight = False
+
+    def _trip(self):
+        """Otwiera bezpiecznik - wywoływać pod lockiem"""
+        timeout = min(self.reset_timeout * (2 ** self.open_count), self.max_reset_timeout)
+        timeout = random.uniform(timeout / 2, timeout)
+        self.state = 'open'
+        self.opened_until = time.monotonic() + timeout
+        self.open_count += 1
+        self.trips += 1
+        self.probe_in_flight = False
+        safe_print(f"🔌 Usługa {self.name} niedostępna - bezpiecznik otwarty na {timeout:.0f}s")
+
+    def call(self, func, *args, **kwargs):
+        """Wykonuje func przez bezpiecznik. Błędy klienta (status < 500) nie liczą się jako awaria usługi"""
+        if not self.allow():
+            raise CircuitOpenError(f"Usługa {self.name} chwilowo niedostępna")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            status = getattr(e, 'http_status', None) or getattr(e, 'status_code', None)
+            if status is not None and status < 500 and status != 429:
+                self.record_success()
+            else:
+                self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def get_stats(self):
+        """Zwraca stan bezpiecznika"""
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'open_for': round(max(self.opened_until - time.monotonic(), 0), 1) if self.state == 'open' else 0,
+                'calls': self.calls,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'trips': self.trips,
+                'last_failure': self.last_failure
+            }
+
+BREAKERS = {}
+BREAKERS_LOCK = threading.Lock()
+
+def get_breaker(name, **kwargs):
+    """Zwraca wspólny bezpiecznik usługi (tworzy przy pierwszym użyciu)"""
+    with BREAKERS_LOCK:
+        breaker = BREAKERS.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            BREAKERS[name] = breaker
+        return breaker
+
+def get_breakers_stats():
+    """Stan wszystkich bezpieczników (dla web API)"""
+    with BREAKERS_LOCK:
+        breakers = list(BREAKERS.values())
+    return {breaker.name: breaker.get_stats() for breaker in breakers}
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+RESPONSE_CACHE_SIZE = 256  # Ile odpowiedzi (endpoint + parametry) trzyma cache
+
+class CachedResponse:
+    """Zserializowana odpowiedź dla jednej wersji danych"""
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]  # Silny ETag - skrót treści odpowiedzi
+
+class ResponseCache:
+    """Cache gotowych odpowiedzi API (bajty + ETag) kluczowany endpointem i parametrami.
+
+    Wpis jest ważny, dopóki wersja danych podana przez endpoint się nie zmieni - wtedy odpowiedź
+    jest budowana i serializowana od nowa.
+    """
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()  # klucz -> CachedResponse (najdawniej używane na początku)
+        self.lock = threading.Lock()
+        self.stats = {}  # endpoint -> {'hits', 'misses', 'not_modified'}
+
+    def _endpoint_stats(self, endpoint):
+        return self.stats.setdefault(endpoint, {'hits': 0, 'misses': 0, 'not_modified': 0})
+
+    def get(self, endpoint, params, version, build):
+        """Zwraca CachedResponse dla wersji danych - build() (zwraca bajty) tylko przy zmianie wersji"""
+        key = (endpoint, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.version == version:
+                self.entries.move_to_end(key)
+                self._endpoint_stats(endpoint)['hits'] += 1
+                return entry
+            self._endpoint_stats(endpoint)['misses'] += 1
+
+        entry = CachedResponse(version, build())
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self, endpoint):
+        """Klient miał aktualną wersję (If-None-Match) - odpowiedź 304 bez treści"""
+        with self.lock:
+            self._endpoint_stats(endpoint)['not_modified'] += 1
+
+    def get_stats(self):
+        """Zwraca statystyki cache (łącznie i dla każdego endpointu)"""
+        with self.lock:
+            endpoints = {}
+            for endpoint, stats in self.stats.items():
+                total = stats['hits'] + stats['misses']
+                endpoints[endpoint] = {**stats, 'hit_rate': round(stats['hits'] / total, 3) if total else 0}
+            hits = sum(stats['hits'] for stats in self.stats.values())
+            total = hits + sum(stats['misses'] for stats in self.stats.values())
+            return {
+                'entries': len(self.entries),
+                'hits': hits,
+                'misses': total - hits,
+                'not_modified': sum(stats['not_modified'] for stats in self.stats.values()),
+                'hit_rate': round(hits / total, 3) if total else 0,
+                'endpoints': endpoints
+            }
+
+RESPONSE_CACHE = None
+RESPONSE_CACHE_LOCK = threading.Lock()
+
+def get_response_cache():
+    """Zwraca cache odpowiedzi procesu (jeden na worker web API)"""
+    global RESPONSE_CACHE
+    with RESPONSE_CACHE_LOCK:
+        if RESPONSE_CACHE is None:
+            RESPONSE_CACHE = ResponseCache()
+        return RESPONSE_CACHE
+
+def get_response_cache_stats():
+    """Statystyki cache odpowiedzi (dla web API) - pusty słownik gdy nieużywany"""
+    return RESPONSE_CACHE.get_stats() if RESPONSE_CACHE else {}
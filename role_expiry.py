@@ -0,0 +1,275 @@
+import os
+import time
+import heapq
+import sqlite3
+import threading
+import discord
+from event_bus import get_event_bus
+
+ROLE_GRANTS_DB = os.getenv("ROLE_GRANTS_DB", "role_grants.db")
+
+EXPIRY_BATCH = 25          # Ile ról zdejmować w jednym zadaniu gateway
+EXPIRY_RETRY_DELAY = 300   # Ponowienie po błędzie Discorda
+MAX_SLEEP = 3600           # Maksymalny sen wątku (odporność na zmiany zegara systemowego)
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+class RoleExpiry:
+    """Trwałe wygasanie ról Discord kupionych w sklepie.
+
+    Nadane role trafiają do tabeli role_grants z expires_at. Jeden wątek śpi do najbliższego
+    wygaśnięcia (kopiec), zdejmuje wygasłe role partiami przez sesję gateway i zapisuje wynik.
+    Po restarcie wczytuje aktywne nadania i od razu nadrabia te, które wygasły w międzyczasie.
+
+    Wątek działa tylko w procesie-właścicielu (bot Twitch, start()). Inne procesy jedynie zapisują
+    nadania do bazy i ogłaszają je zdarzeniem role_granted na szynie.
+    """
+
+    def __init__(self, integration, db_path=ROLE_GRANTS_DB):
+        self.integration = integration
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(threading.Lock())
+        self.heap = []         # (expires_at, grant_id)
+        self.expiry = {}       # grant_id -> aktualne expires_at (stare wpisy w kopcu są pomijane)
+        self.removed = 0
+        self.missing = 0
+        self.failures = 0
+        self.reconciled = 0
+        self.thread = None
+        self.init_database()
+
+    def start(self):
+        """Uruchamia zdejmowanie ról - tylko w jednym procesie (właścicielu bazy nadań)"""
+        with self.wakeup:
+            if self.thread is not None:
+                return
+        get_event_bus().subscribe('role_granted', self._on_granted)
+        self.reconciled = self.load()
+        with self.wakeup:
+            self.thread = threading.Thread(target=self._run, name='role-expiry', daemon=True)
+            self.thread.start()
+
+    def get_connection(self):
+        """Tworzy nowe połączenie z bazą nadanych ról"""
+        return sqlite3.connect(self.db_path, timeout=10.0)
+
+    def init_database(self):
+        """Tworzy tabelę nadanych ról"""
+        with self.lock:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS role_grants (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        guild_id INTEGER NOT NULL,
+                        member_id INTEGER NOT NULL,
+                        role_id INTEGER NOT NULL,
+                        twitch_username TEXT,
+                        member_name TEXT,
+                        granted_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        removed_at REAL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_role_grants_active
+                    ON role_grants (removed_at, expires_at)
+                ''')
+                conn.commit()
+
+    def load(self):
+        """Wczytuje aktywne nadania do kopca (rekoncyliacja po restarcie). Zwraca liczbę zaległych"""
+        now = time.time()
+        with self.lock:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    'SELECT id, expires_at FROM role_grants WHERE removed_at IS NULL'
+                ).fetchall()
+        overdue = 0
+        with self.wakeup:
+            for grant_id, expires_at in rows:
+                self._push(grant_id, expires_at)
+                if expires_at <= now:
+                    overdue += 1
+        if rows:
+            safe_print(f"⏰ Wczytano {len(rows)} aktywnych ról Discord ({overdue} do zdjęcia od razu)")
+        return overdue
+
+    def _on_granted(self, data, event):
+        """Zdarzenie role_granted (też z innych procesów) - dokłada nadanie do kopca"""
+        grant_id, expires_at = data.get('grant_id'), data.get('expires_at')
+        if grant_id is None or expires_at is None:
+            return
+        with self.wakeup:
+            # Znane późniejsze wygaśnięcie (własne add() albo odłożone ponowienie) jest ważniejsze
+            known = self.expiry.get(grant_id)
+            if known is not None and known >= expires_at:
+                return
+            self._push(grant_id, expires_at)
+            self.wakeup.notify()
+
+    def _push(self, grant_id, expires_at):
+        """Dodaje wygaśnięcie do kopca - wywoływać pod wakeup"""
+        self.expiry[grant_id] = expires_at
+        heapq.heappush(self.heap, (expires_at, grant_id))
+
+    def add(self, guild_id, member_id, role_id, duration_hours, twitch_username=None, member_name=None):
+        """Zapisuje nadanie roli. Ponowny zakup aktywnej roli przedłuża ją zamiast dublować"""
+        now = time.time()
+        expires_at = now + duration_hours * 3600
+        with self.lock:
+            with self.get_connection() as conn:
+                row = conn.execute('''
+                    SELECT id, expires_at FROM role_grants
+                    WHERE guild_id = ? AND member_id = ? AND role_id = ? AND removed_at IS NULL
+                ''', (guild_id, member_id, role_id)).fetchone()
+                if row:
+                    grant_id = row[0]
+                    expires_at = max(row[1], expires_at)
+                    conn.execute('UPDATE role_grants SET expires_at = ? WHERE id = ?', (expires_at, grant_id))
+                else:
+                    cursor = conn.execute('''
+                        INSERT INTO role_grants (guild_id, member_id, role_id, twitch_username, member_name, granted_at, expires_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (guild_id, member_id, role_id, twitch_username, member_name, now, expires_at))
+                    grant_id = cursor.lastrowid
+                conn.commit()
+
+        if self.thread is not None:
+            with self.wakeup:
+                self._push(grant_id, expires_at)
+                self.wakeup.notify()
+        # Właściciel wątku wygasania może działać w innym procesie
+        get_event_bus().publish('role_granted', grant_id=grant_id, expires_at=expires_at)
+        return expires_at
+
+    def _run(self):
+        """Wątek zdejmujący role - śpi do najbliższego wygaśnięcia"""
+        while True:
+            with self.wakeup:
+                while True:
+                    # Pomiń wpisy nieaktualne (przedłużone lub już obsłużone)
+                    while self.heap and self.expiry.get(self.heap[0][1]) != self.heap[0][0]:
+                        heapq.heappop(self.heap)
+                    if self.heap and self.heap[0][0] <= time.time():
+                        break
+                    timeout = self.heap[0][0] - time.time() if self.heap else MAX_SLEEP
+                    self.wakeup.wait(min(timeout, MAX_SLEEP))
+
+                now = time.time()
+                due = []
+                while self.heap and self.heap[0][0] <= now and len(due) < EXPIRY_BATCH:
+                    expires_at, grant_id = heapq.heappop(self.heap)
+                    if self.expiry.get(grant_id) == expires_at:
+                        del self.expiry[grant_id]
+                        due.append(grant_id)
+
+            if due:
+                try:
+                    self._expire(due)
+                except Exception as e:
+                    safe_print(f"❌ Błąd zdejmowania ról Discord: {e}")
+                    self._retry_later(due)
+
+    def _expire(self, grant_ids):
+        """Zdejmuje partię wygasłych ról jednym zadaniem gateway"""
+        placeholders = ','.join('?' * len(grant_ids))
+        with self.lock:
+            with self.get_connection() as conn:
+                rows = conn.execute(f'''
+                    SELECT id, guild_id, member_id, role_id, twitch_username, member_name
+                    FROM role_grants WHERE id IN ({placeholders}) AND removed_at IS NULL
+                ''', grant_ids).fetchall()
+        grants = [
+            {'id': row[0], 'guild_id': row[1], 'member_id': row[2], 'role_id': row[3],
+             'twitch_username': row[4], 'member_name': row[5]}
+            for row in rows
+        ]
+        if not grants:
+            return
+
+        results = self.integration.gateway.run("role_expiry", self._remove_roles, grants, timeout=30 + 5 * len(grants))
+
+        done = [grant for grant in grants if results.get(grant['id']) in ('removed', 'missing')]
+        retry = [grant['id'] for grant in grants if results.get(grant['id']) not in ('removed', 'missing')]
+        if done:
+            now = time.time()
+            with self.lock:
+                with self.get_connection() as conn:
+                    conn.executemany('UPDATE role_grants SET removed_at = ? WHERE id = ?',
+                                     [(now, grant['id']) for grant in done])
+                    conn.commit()
+        for grant in done:
+            if results[grant['id']] == 'removed':
+                self.removed += 1
+                self.integration.notify_role_expired(grant['member_name'] or grant['twitch_username'])
+            else:
+                self.missing += 1
+        if retry:
+            self._retry_later(retry)
+
+    async def _remove_roles(self, client, grants):
+        """Zadanie gateway - zdejmuje role. Zwraca {grant_id: 'removed' | 'missing' | 'error'}"""
+        results = {}
+        for grant in grants:
+            try:
+                guild = client.get_guild(grant['guild_id'])
+                role = guild.get_role(grant['role_id']) if guild else None
+                if not guild or not role:
+                    results[grant['id']] = 'missing'
+                    continue
+                member = guild.get_member(grant['member_id'])
+                if member is None:
+                    member = await guild.fetch_member(grant['member_id'])
+                await member.remove_roles(role, reason="Automatyczne usunięcie roli po wygaśnięciu zakupu")
+                results[grant['id']] = 'removed'
+                safe_print(f"✅ Usunięto rolę '{role.name}' od użytkownika {member.display_name}")
+            except discord.NotFound:
+                # Użytkownik opuścił serwer - nie ma czego zdejmować
+                results[grant['id']] = 'missing'
+            except Exception as e:
+                results[grant['id']] = 'error'
+                safe_print(f"❌ Błąd usuwania roli ({grant['twitch_username']}): {e}")
+        return results
+
+    def _retry_later(self, grant_ids):
+        """Odkłada nieudane zdjęcia ról"""
+        self.failures += len(grant_ids)
+        retry_at = time.time() + EXPIRY_RETRY_DELAY
+        with self.wakeup:
+            for grant_id in grant_ids:
+                self._push(grant_id, retry_at)
+
+    def get_stats(self):
+        """Zwraca statystyki wygasania ról"""
+        with self.wakeup:
+            next_expiry = min(self.expiry.values()) if self.expiry else None
+            return {
+                'active': len(self.expiry),
+                'next_expiry_in': round(max(next_expiry - time.time(), 0)) if next_expiry else None,
+                'removed': self.removed,
+                'missing': self.missing,
+                'failures': self.failures,
+                'reconciled_at_startup': self.reconciled
+            }
+
+ROLE_EXPIRY = None
+ROLE_EXPIRY_LOCK = threading.Lock()
+
+def get_role_expiry(integration):
+    """Zwraca wspólny mechanizm wygasania ról procesu (wątek dopiero po start() - tylko w bocie Twitch)"""
+    global ROLE_EXPIRY
+    with ROLE_EXPIRY_LOCK:
+        if ROLE_EXPIRY is None:
+            ROLE_EXPIRY = RoleExpiry(integration)
+        return ROLE_EXPIRY
+
+def get_role_expiry_stats():
+    """Statystyki wygasania ról (dla web API) - pusty słownik gdy nieużywane"""
+    return ROLE_EXPIRY.get_stats() if ROLE_EXPIRY else {}
@@ -0,0 +1,290 @@
+import heapq
+import queue
+import itertools
+import random
+import threading
+import time
+from datetime import datetime
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+class Job:
+    """Zadanie harmonogramu wraz ze statystykami wykonania"""
+
+    def __init__(self, name, func, interval=None, delay=0, jitter=0, timeout=None, max_backoff=3600):
+        self.name = name
+        self.func = func
+        self.interval = interval        # None = zadanie jednorazowe
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.next_run = time.monotonic() + delay
+        self.cancelled = False
+        self.running = False
+        self.started_at = None
+        self.run_id = 0                 # Numer uruchomienia - wynik porzuconego (po timeoucie) jest pomijany
+        self.worker = None              # Wątek wykonujący bieżące uruchomienie
+
+        # Statystyki
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.timeouts = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+
+    def get_stats(self):
+        """Zwraca statystyki zadania do wyświetlenia w web API"""
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'timeouts': self.timeouts,
+            'running': self.running,
+            'last_run': self.last_run,
+            'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'last_error': self.last_error,
+            'next_run_in': None if self.cancelled else round(max(self.next_run - time.monotonic(), 0), 1)
+        }
+
+class Scheduler:
+    """Wspólny harmonogram zadań w tle: kolejka czasowa na kopcu + mała pula wątków.
+
+    Funkcja zadania może zwrócić liczbę sekund - wtedy nadpisuje odstęp do
+    następnego uruchomienia (np. kolejne kroki przypomnień, godzina statystyk).
+    Błędy wydłużają odstęp wykładniczo aż do max_backoff.
+
+    Zadanie przekraczające timeout liczy się jako błąd i jest planowane ponownie. Wątku nie da się
+    przerwać, więc zawieszony wątek jest spisywany, a pula dostaje nowy - wolne zostaje zawsze `workers` wątków.
+    """
+
+    def __init__(self, workers=2, name="scheduler"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.heap = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.tasks = queue.Queue()
+        self.workers = workers
+        self.worker_count = itertools.count(1)
+        self.abandoned = set()  # Wątki zawieszone po timeoucie - kończą się po powrocie zadania
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Uruchamia wątek dyspozytora"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        for _ in range(self.workers):
+            self._start_worker()
+        self.thread = threading.Thread(target=self._dispatch_loop, name=f"{self.name}-dispatch", daemon=True)
+        self.thread.start()
+
+    def _start_worker(self):
+        threading.Thread(target=self._worker_loop, name=f"{self.name}_{next(self.worker_count)}", daemon=True).start()
+
+    def _worker_loop(self):
+        """Wątek puli - wykonuje zadania przekazane przez dyspozytora"""
+        current = threading.current_thread()
+        while True:
+            job = self.tasks.get()
+            if job is None:
+                return
+            self._run_job(job)
+            with self.lock:
+                if current in self.abandoned:
+                    # Zastąpiony nowym wątkiem po przekroczeniu limitu - kończy pracę
+                    self.abandoned.discard(current)
+                    return
+
+    def stop(self):
+        """Zatrzymuje harmonogram (zadania w toku kończą się normalnie)"""
+        with self.wakeup:
+            self.running = False
+            self.wakeup.notify_all()
+        for _ in range(self.workers):
+            self.tasks.put(None)
+
+    def add_job(self, name, func, interval=None, delay=0, jitter=0, timeout=None, max_backoff=3600):
+        """Dodaje zadanie cykliczne (interval) lub jednorazowe (interval=None). Zastępuje zadanie o tej samej nazwie"""
+        job = Job(name, func, interval=interval, delay=delay, jitter=jitter, timeout=timeout, max_backoff=max_backoff)
+        with self.wakeup:
+            old_job = self.jobs.get(name)
+            if old_job:
+                old_job.cancelled = True
+            self.jobs[name] = job
+            heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+            self.wakeup.notify()
+        return job
+
+    def call_later(self, name, delay, func):
+        """Planuje jednorazowe wywołanie za delay sekund"""
+        return self.add_job(name, func, interval=None, delay=delay)
+
+    def cancel(self, name):
+        """Anuluje zadanie. Zwraca True jeśli istniało"""
+        with self.wakeup:
+            job = self.jobs.pop(name, None)
+            if job is None:
+                return False
+            job.cancelled = True
+            self.wakeup.notify()
+            return True
+
+    def has_job(self, name):
+        """Sprawdza czy zadanie jest zaplanowane"""
+        with self.lock:
+            return name in self.jobs
+
+    def run_now(self, name):
+        """Przyspiesza następne uruchomienie zadania na teraz"""
+        with self.wakeup:
+            job = self.jobs.get(name)
+            if job is None or job.running:
+                return False
+            job.next_run = time.monotonic()
+            heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+            self.wakeup.notify()
+            return True
+
+    def set_interval(self, name, interval):
+        """Zmienia odstęp zadania cyklicznego. Skrócenie odstępu przyspiesza też najbliższe uruchomienie"""
+        with self.wakeup:
+            job = self.jobs.get(name)
+            if job is None or job.interval is None:
+                return False
+            job.interval = interval
+            next_run = time.monotonic() + interval
+            if not job.running and next_run < job.next_run:
+                job.next_run = next_run
+                heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+                self.wakeup.notify()
+            return True
+
+    def _dispatch_loop(self):
+        """Czeka do najbliższego terminu i przekazuje zadania do puli wątków"""
+        with self.wakeup:
+            while self.running:
+                now = time.monotonic()
+                self._check_timeouts(now)
+
+                # Przy zadaniach z limitem czasu w toku budź się co sekundę, by je sprawdzić
+                watch_timeouts = any(j.running and j.timeout and j.started_at is not None for j in self.jobs.values())
+
+                if not self.heap:
+                    self.wakeup.wait(1.0 if watch_timeouts else None)
+                    continue
+
+                next_run, _, job = self.heap[0]
+                if job.cancelled or job.running or next_run != job.next_run:
+                    heapq.heappop(self.heap)  # Nieaktualny wpis
+                    continue
+
+                if next_run > now:
+                    wait_time = next_run - now
+                    self.wakeup.wait(min(wait_time, 1.0) if watch_timeouts else wait_time)
+                    continue
+
+                heapq.heappop(self.heap)
+                job.running = True
+                job.started_at = now
+                job.run_id += 1
+                self.tasks.put(job)
+
+    def _check_timeouts(self, now):
+        """Kończy zadania przekraczające timeout - wywoływać pod lockiem.
+
+        Uruchomienie liczy się jako błąd i jest planowane ponownie, a wątek (nie da się go przerwać)
+        zastępuje nowy. Wynik porzuconego uruchomienia jest pomijany.
+        """
+        for job in list(self.jobs.values()):
+            if job.running and job.timeout and job.started_at is not None:
+                if now - job.started_at > job.timeout:
+                    job.timeouts += 1
+                    job.started_at = None
+                    job.run_id += 1
+                    job.running = False
+                    job.runs += 1
+                    job.last_run = datetime.now().isoformat()
+                    job.last_duration = job.timeout
+                    job.last_error = f"Przekroczono limit {job.timeout}s"
+                    job.failures += 1
+                    job.consecutive_failures += 1
+                    if job.worker is not None:
+                        self.abandoned.add(job.worker)
+                        job.worker = None
+                        self._start_worker()
+                    safe_print(f"⏱️ Zadanie {job.name} przekroczyło limit {job.timeout}s - porzucone, ponowienie później")
+                    # Jednorazowe też są ponawiane (np. wysyłka kolejki) - inaczej ich stan utknąłby w połowie
+                    self._reschedule(job, job.interval or job.timeout, failed=True)
+
+    def _run_job(self, job):
+        """Wykonuje zadanie i planuje kolejne uruchomienie"""
+        with self.lock:
+            run_id = job.run_id
+            job.worker = threading.current_thread()
+        start = time.monotonic()
+        next_delay = None
+        failed = False
+        try:
+            result = job.func()
+            if isinstance(result, (int, float)) and not isinstance(result, bool):
+                next_delay = float(result)
+        except Exception as e:
+            failed = True
+            job.last_error = str(e)
+            safe_print(f"❌ Błąd zadania {job.name}: {e}")
+
+        duration = time.monotonic() - start
+        with self.wakeup:
+            if job.run_id != run_id:
+                # Uruchomienie porzucone po timeoucie - zadanie jest już zaplanowane ponownie
+                safe_print(f"⏱️ Porzucone uruchomienie zadania {job.name} zakończyło się po {duration:.0f}s")
+                return
+            job.worker = None
+            job.running = False
+            job.runs += 1
+            job.last_run = datetime.now().isoformat()
+            job.last_duration = duration
+            if failed:
+                job.failures += 1
+                job.consecutive_failures += 1
+            else:
+                job.consecutive_failures = 0
+                job.last_error = None
+
+            if next_delay is None and job.interval is None:
+                if not job.cancelled and self.jobs.get(job.name) is job:
+                    del self.jobs[job.name]
+                return
+            self._reschedule(job, next_delay if next_delay is not None else job.interval, failed)
+
+    def _reschedule(self, job, next_delay, failed):
+        """Planuje kolejne uruchomienie (z backoffem po błędzie i jitterem) - wywoływać pod lockiem"""
+        if job.cancelled:
+            return
+        if failed:
+            # Wykładnicze wydłużanie odstępu po kolejnych błędach
+            next_delay = min(next_delay * (2 ** (job.consecutive_failures - 1)), max(job.max_backoff, next_delay))
+        if job.jitter:
+            next_delay += random.uniform(0, job.jitter)
+
+        job.next_run = time.monotonic() + next_delay
+        heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+        self.wakeup.notify()
+
+    def get_stats(self):
+        """Zwraca statystyki wszystkich zadań"""
+        with self.lock:
+            return {name: job.get_stats() for name, job in self.jobs.items()}
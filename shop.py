@@ -1,10 +1,9 @@
 import sqlite3
 import threading
-import hashlib
-import json
 import shutil
 from datetime import datetime, timedelta
 from database import UserDatabase
+from event_bus import get_event_bus
 from discord_integration import DiscordIntegration
 
 class Shop:
@@ -14,8 +13,9 @@ class Shop:
         self.db_path = "shop.db"
         self.discord = DiscordIntegration()
         
-        # System monitorowania zmian
-        self.last_shop_hash = None
+        # System monitorowania zmian: wersja katalogu rośnie przy każdej zmianie self.rewards
+        self.catalog_version = 1
+        self.published_catalog_version = None
         self.shop_channel_id = 1401909828510679112  # ID kanału do aktualizacji sklepu
         self.last_shop_message_id = None
         
@@ -124,6 +124,11 @@ class Shop:
                     )
                 ''')
                 
+                # Aktywne zakupy użytkownika (inwentarz, web API) bez przeglądania całej tabeli
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_purchases_user ON purchases (username, is_active, expires_at)
+                ''')
+                
                 conn.commit()
     
     def get_shop_list(self):
@@ -173,6 +178,9 @@ class Shop:
                 ''', (username, reward_id, expires_at.isoformat()))
                 conn.commit()
         
+        get_event_bus().publish('purchase', username=username, reward_id=reward_id,
+                                price=0 if is_owner else reward['price'], expires_at=expires_at.isoformat())
+        
         # Format czasu zależny od długości trwania nagrody
         if reward['duration_hours'] >= 24:
             time_format = expires_at.strftime('%d.%m %H:%M')  # Data i godzina dla nagród 24h+
@@ -413,31 +421,27 @@ class Shop:
         }
         return details_map.get(reward_id, f"Realizuj nagrodę: {reward['name']}")
 
-    def get_shop_hash(self):
-        """Generuje hash aktualnego stanu sklepu"""
-        shop_data = json.dumps(self.rewards, sort_keys=True)
-        return hashlib.md5(shop_data.encode()).hexdigest()
+    def set_reward(self, reward_id, reward):
+        """Dodaje, zmienia lub (reward=None) usuwa nagrodę z katalogu i podbija wersję katalogu"""
+        with self.lock:
+            if reward is None:
+                self.rewards.pop(reward_id, None)
+            else:
+                self.rewards[reward_id] = reward
+            self.catalog_version += 1
 
     def check_shop_changes(self):
-        """Sprawdza czy sklep się zmienił od ostatniego sprawdzenia"""
-        current_hash = self.get_shop_hash()
-        
-        if self.last_shop_hash is None:
-            self.last_shop_hash = current_hash
+        """Sprawdza czy katalog zmienił się od ostatniej publikacji (porównanie wersji)"""
+        if self.published_catalog_version is None:
+            self.published_catalog_version = self.catalog_version
             return False  # Pierwsza inicjalizacja - nie wysyłaj wiadomości
-        
-        if current_hash != self.last_shop_hash:
-            self.last_shop_hash = current_hash
-            return True  # Sklep się zmienił
-        
-        return False  # Brak zmian
-    
-    def initialize_shop_hash(self):
-        """Inicjalizuje hash sklepu bez wysyłania wiadomości na Discord"""
-        current_hash = self.get_shop_hash()
-        if current_hash is not None:
-            self.last_shop_hash = current_hash
-            print("ℹ️ Zainicjalizowano hash sklepu bez wysyłania wiadomości")
+
+        return self.catalog_version != self.published_catalog_version
+
+    def initialize_shop_version(self):
+        """Zapamiętuje wersję katalogu bez wysyłania wiadomości na Discord"""
+        self.published_catalog_version = self.catalog_version
+        print("ℹ️ Zainicjalizowano wersję sklepu bez wysyłania wiadomości")
 
     def generate_shop_embed_data(self):
         """Generuje dane dla embed Discord z aktualnym sklepem"""
@@ -484,6 +488,7 @@ class Shop:
         """Aktualizuje post ze sklepem na Discord tylko jeśli coś się zmieniło"""
         if self.check_shop_changes():
             print("🔄 Wykryto zmiany w sklepie - aktualizuję post na Discord...")
+            version = self.catalog_version
             embed_data = self.generate_shop_embed_data()
             
             # Wyślij aktualizację przez Discord integration (asynchronicznie)
@@ -491,27 +496,34 @@ class Shop:
                 self.discord.update_shop_post_async(
                     channel_id=self.shop_channel_id,
                     embed_data=embed_data,
-                    message_id=self.last_shop_message_id
+                    message_id=self.last_shop_message_id,
+                    on_done=lambda message_id: self._remember_shop_message(message_id, version)
                 )
                 print("✅ Rozpoczęto aktualizację postu ze sklepem na Discord")
             except Exception as e:
                 print(f"❌ Błąd podczas aktualizacji postu ze sklepem: {e}")
-        else:
-            print("ℹ️ Brak zmian w sklepie - nie aktualizuję postu")
+
+    def _remember_shop_message(self, message_id, version):
+        """Zapamiętuje ID postu i opublikowaną wersję katalogu po udanej aktualizacji"""
+        if message_id:
+            self.last_shop_message_id = message_id
+            self.published_catalog_version = version
 
     def force_update_shop_post(self):
         """Wymusza aktualizację postu ze sklepem na Discord"""
         print("🔄 Wymuszam aktualizację postu ze sklepem na Discord...")
+        version = self.catalog_version
         embed_data = self.generate_shop_embed_data()
         
         try:
             # Uruchom asynchronicznie
+            # Edytuje istniejący post; nowy wysyłany tylko gdy posta nie ma
             self.discord.update_shop_post_async(
                 channel_id=self.shop_channel_id,
                 embed_data=embed_data,
-                message_id=None  # Wyślij nową wiadomość
+                message_id=self.last_shop_message_id,
+                on_done=lambda message_id: self._remember_shop_message(message_id, version)
             )
-            self.last_shop_hash = self.get_shop_hash()  # Zaktualizuj hash
             print("✅ Rozpoczęto wysyłanie postu ze sklepem na Discord")
             return True
         except Exception as e:
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+
+SONG_QUEUE_FILE = os.getenv("SONG_QUEUE_FILE", "song_queue.json")
+SONG_REQUEST_TIMEOUT = int(os.getenv("SONG_REQUEST_TIMEOUT", "300"))
+
+SELECTION_TTL = 120          # Ile sekund czeka propozycja z !sr na !select
+MAX_SELECTIONS = 200         # Limit oczekujących propozycji w pamięci
+MAX_QUEUED_PER_USER = 2      # Ile utworów użytkownik może mieć w kolejce naraz
+MAX_QUEUED_PER_SUB = 5       # To samo dla subów/VIP (subs_no_limit)
+MAX_QUEUE_SIZE = 50          # Limit całej kolejki
+DEDUP_WINDOW = 3600          # Ten sam utwór nie wróci do kolejki przez godzinę
+PUSH_BATCH = 3               # Ile utworów wysłać do Spotify w jednej partii
+PUSH_SPACING = 0.5           # Odstęp między wywołaniami add_to_queue w partii
+PUSH_INTERVAL = 10           # Odstęp między partiami
+PUSH_MAX_ATTEMPTS = 5        # Po tylu nieudanych próbach utwór wypada z kolejki
+HISTORY_SIZE = 50
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def format_track(track):
+    """Zwraca 'tytuł - wykonawcy' dla utworu ze Spotify"""
+    artists = ", ".join(artist['name'] for artist in track['artists'])
+    return f"{track['name']} - {artists}"
+
+class SongRequestQueue:
+    """Kolejka próśb o piosenki: zapis na dysku, limity per użytkownik, deduplikacja po URI,
+    wygasające propozycje z !sr i wysyłanie do Spotify partiami przez harmonogram bota"""
+
+    def __init__(self, spotify, scheduler=None, path=SONG_QUEUE_FILE):
+        self.spotify = spotify
+        self.scheduler = scheduler
+        self.path = path
+        self.lock = threading.Lock()
+        self.selections = OrderedDict()   # użytkownik -> (utwory, wygasa)
+        self.last_request = {}            # użytkownik -> czas ostatniej prośby (cooldown)
+        self.queue = []                   # utwory czekające na wysłanie do Spotify
+        self.history = deque(maxlen=HISTORY_SIZE)  # ostatnio wysłane utwory
+        self.push_scheduled = False
+        self.pushed = 0
+        self.push_failures = 0
+        self.duplicates = 0
+        self.expired_selections = 0
+        self.load()
+        
+        # Utwory z poprzedniego uruchomienia - wyślij gdy bot się rozkręci
+        if self.queue:
+            self.schedule_push(delay=30)
+
+    # === PROPOZYCJE Z !sr ===
+
+    def get_cooldown(self, username):
+        """Sekundy do następnej prośby użytkownika (0 = może już prosić)"""
+        with self.lock:
+            last_time = self.last_request.get(username, 0)
+        return max(int(SONG_REQUEST_TIMEOUT - (time.time() - last_time)), 0)
+
+    def set_selection(self, username, tracks):
+        """Zapamiętuje wyniki !sr do wyboru przez !select"""
+        with self.lock:
+            self._prune_selections()
+            self.selections[username] = (tracks, time.monotonic() + SELECTION_TTL)
+            self.selections.move_to_end(username)
+            while len(self.selections) > MAX_SELECTIONS:
+                self.selections.popitem(last=False)
+                self.expired_selections += 1
+
+    def get_selection(self, username):
+        """Zwraca oczekujące wyniki !sr użytkownika lub None jeśli nie ma/wygasły"""
+        with self.lock:
+            self._prune_selections()
+            entry = self.selections.get(username)
+            return entry[0] if entry else None
+
+    def _prune_selections(self):
+        """Usuwa wygasłe propozycje - wywoływać pod lockiem"""
+        now = time.monotonic()
+        expired = [user for user, (_, expires_at) in self.selections.items() if expires_at <= now]
+        for user in expired:
+            del self.selections[user]
+        self.expired_selections += len(expired)
+
+    # === KOLEJKA ===
+
+    def enqueue(self, username, track, unlimited=False):
+        """Dodaje wybrany utwór do kolejki. Zwraca (True, pozycja) lub (False, powód)"""
+        uri = track['uri']
+        now = time.time()
+        with self.lock:
+            if any(entry['uri'] == uri for entry in self.queue):
+                self.duplicates += 1
+                return False, "ten utwór już czeka w kolejce"
+            if any(entry['uri'] == uri and now - entry['pushed_at'] < DEDUP_WINDOW for entry in self.history):
+                self.duplicates += 1
+                return False, "ten utwór był niedawno grany"
+
+            quota = MAX_QUEUED_PER_SUB if unlimited else MAX_QUEUED_PER_USER
+            if sum(1 for entry in self.queue if entry['requested_by'] == username) >= quota:
+                return False, f"osiągnięto limit utworów w kolejce ({quota})"
+            if len(self.queue) >= MAX_QUEUE_SIZE:
+                return False, "kolejka jest pełna"
+
+            self.queue.append({
+                'uri': uri,
+                'title': format_track(track),
+                'requested_by': username,
+                'requested_at': now,
+                'attempts': 0
+            })
+            position = len(self.queue)
+            self.selections.pop(username, None)
+            self.last_request[username] = now
+            # Cooldown starszy niż limit nic nie znaczy - nie trzymaj go w pamięci
+            self.last_request = {user: ts for user, ts in self.last_request.items() if now - ts < SONG_REQUEST_TIMEOUT}
+            self._save()
+
+        self.schedule_push()
+        return True, position
+
+    def schedule_push(self, delay=0):
+        """Planuje wysłanie partii do Spotify (jedno zadanie naraz)"""
+        if not self.scheduler:
+            return
+        with self.lock:
+            if self.push_scheduled:
+                return
+            self.push_scheduled = True
+        self.scheduler.add_job('song_queue', self.push_batch, delay=delay, timeout=60)
+
+    def push_batch(self):
+        """Wysyła do Spotify do PUSH_BATCH utworów. Zwraca odstęp do następnej partii lub None gdy kolejka pusta"""
+        try:
+            return self._push_batch()
+        except Exception as e:
+            # Wyjątek usunąłby jednorazowe zadanie z push_scheduled=True - kolejka już by nie ruszyła
+            safe_print(f"❌ Błąd wysyłania kolejki do Spotify: {e}")
+            with self.lock:
+                if not self.queue:
+                    self.push_scheduled = False
+                    return None
+            return PUSH_INTERVAL * 3
+
+    def _push_batch(self):
+        with self.lock:
+            batch = list(self.queue[:PUSH_BATCH])
+            if not batch:
+                self.push_scheduled = False
+                return None
+
+        if not self.spotify.ensure_token_valid():
+            return PUSH_INTERVAL * 3
+
+        failed = False
+        for i, entry in enumerate(batch):
+            if i:
+                time.sleep(PUSH_SPACING)
+            try:
+                self.spotify.add_to_queue(entry['uri'])
+            except Exception as e:
+                self.push_failures += 1
+                entry['attempts'] += 1
+                safe_print(f"❌ Nie udało się dodać do Spotify \"{entry['title']}\" (próba {entry['attempts']}): {e}")
+                if entry['attempts'] >= PUSH_MAX_ATTEMPTS:
+                    with self.lock:
+                        if entry in self.queue:
+                            self.queue.remove(entry)
+                        self._save()
+                # Zwykle brak aktywnego urządzenia - nie próbuj reszty partii
+                failed = True
+                break
+
+            with self.lock:
+                if entry in self.queue:
+                    self.queue.remove(entry)
+                entry['pushed_at'] = time.time()
+                self.history.append(entry)
+                self.pushed += 1
+                self._save()
+            safe_print(f"🎶 Wysłano do Spotify: {entry['title']} (od {entry['requested_by']})")
+
+        with self.lock:
+            # Flaga zmieniana pod lockiem razem ze sprawdzeniem kolejki - enqueue nie zgubi partii
+            if not self.queue:
+                self.push_scheduled = False
+                return None
+        return PUSH_INTERVAL * 3 if failed else PUSH_INTERVAL
+
+    def remove(self, uri):
+        """Usuwa utwór z kolejki. Zwraca True jeśli był w kolejce"""
+        with self.lock:
+            for entry in self.queue:
+                if entry['uri'] == uri:
+                    self.queue.remove(entry)
+                    self._save()
+                    return True
+        return False
+
+    # === ZAPIS I ODCZYT ===
+
+    def load(self):
+        """Wczytuje kolejkę i historię z pliku"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.queue = data.get('queue', [])
+                self.history.extend(data.get('history', []))
+                if self.queue:
+                    safe_print(f"🎶 Wczytano {len(self.queue)} utworów z kolejki")
+        except Exception as e:
+            safe_print(f"❌ Błąd wczytywania kolejki piosenek: {e}")
+
+    def _save(self):
+        """Zapisuje kolejkę i historię do pliku (atomowo) - wywoływać pod lockiem"""
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            safe_print(f"❌ Błąd zapisywania kolejki piosenek: {e}")
+
+    def _snapshot(self):
+        """Stan kolejki do zapisu i dla web API - wywoływać pod lockiem"""
+        return {
+            'queue': list(self.queue),
+            'history': list(self.history),
+            'stats': {
+                'pending_selections': len(self.selections),
+                'pushed': self.pushed,
+                'push_failures': self.push_failures,
+                'duplicates': self.duplicates,
+                'expired_selections': self.expired_selections
+            },
+            'last_updated': time.time()
+        }
+
+    def get_snapshot(self):
+        """Zwraca stan kolejki"""
+        with self.lock:
+            return self._snapshot()
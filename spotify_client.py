@@ -0,0 +1,131 @@
+import time
+import threading
+import spotipy
+from metadata_cache import TTLCache
+from resilience import SERVICE_TIMEOUTS, get_breaker
+
+# Odśwież token tyle sekund przed wygaśnięciem
+TOKEN_REFRESH_MARGIN = 120
+# Ponowienie odświeżenia po błędzie
+TOKEN_RETRY_DELAY = 60
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def normalize_query(query):
+    """Normalizuje zapytanie wyszukiwania (wielkość liter, białe znaki) jako klucz cache"""
+    return " ".join(query.lower().split())
+
+class SpotifyClient:
+    """Warstwa nad spotipy: cache wyszukiwań, odświeżanie tokenu przed expires_at, jedno odświeżenie naraz"""
+
+    def __init__(self, sp_oauth, token_info, scheduler=None):
+        self.sp_oauth = sp_oauth
+        self.token_info = token_info
+        self.sp = self._create_client(token_info)
+        self.scheduler = scheduler
+        # Przy awarii Spotify komendy dostają błąd od razu zamiast czekać na timeout
+        self.breaker = get_breaker('spotify')
+        self.refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+        # Wyniki wyszukiwania dla popularnych zapytań; brak wyników pamiętany krócej
+        self.search_cache = TTLCache(maxsize=256, ttl=3600, negative_ttl=300, name="spotify_search")
+
+    @staticmethod
+    def _create_client(token_info):
+        """Tworzy klienta spotipy z limitem czasu zapytań"""
+        return spotipy.Spotify(auth=token_info['access_token'], requests_timeout=SERVICE_TIMEOUTS['spotify'], retries=1)
+
+    def seconds_until_refresh(self):
+        """Sekundy do planowanego odświeżenia tokenu (0 = już trzeba odświeżyć)"""
+        expires_at = self.token_info.get('expires_at') or 0
+        return max(expires_at - TOKEN_REFRESH_MARGIN - time.time(), 0)
+
+    def ensure_token_valid(self):
+        """Sprawdza token po expires_at (bez zapytań); odświeża tylko gdy wygasa"""
+        if self.seconds_until_refresh() > 0:
+            return True
+        return self.refresh_token()
+
+    def refresh_token(self):
+        """Odświeża token. Równoległe wywołania czekają na jedno odświeżenie i korzystają z jego wyniku"""
+        with self.refresh_lock:
+            # Inny wątek odświeżył token, gdy czekaliśmy na lock
+            if self.seconds_until_refresh() > 0:
+                return True
+
+            try:
+                safe_print(f"🔄 Odświeżam token Spotify...")
+                token_info = self.breaker.call(self.sp_oauth.refresh_access_token, self.token_info['refresh_token'])
+                self.token_info = token_info
+                self.sp = self._create_client(token_info)
+                self.refreshes += 1
+                safe_print(f"✅ Token Spotify odświeżony (bez zapisywania plików)")
+                return True
+            except Exception as e:
+                self.refresh_failures += 1
+                safe_print(f"❌ Błąd odświeżania tokenu Spotify: {e}")
+                return False
+
+    def schedule_refresh(self):
+        """Planuje odświeżenie tokenu tuż przed expires_at w harmonogramie bota"""
+        if not self.scheduler:
+            return
+
+        def refresh_job():
+            if self.seconds_until_refresh() > 0 or self.refresh_token():
+                delay = self.seconds_until_refresh()
+                safe_print(f"🎵 Następne odświeżenie tokenu Spotify za {int(delay)}s")
+                return max(delay, 1)
+            return TOKEN_RETRY_DELAY
+
+        self.scheduler.add_job('spotify_token', refresh_job, delay=self.seconds_until_refresh(), timeout=60)
+
+    def search_tracks(self, query, limit=3):
+        """Wyszukuje utwory (cache po znormalizowanym zapytaniu). Zwraca listę, pustą gdy brak wyników"""
+        key = (normalize_query(query), limit)
+
+        def load():
+            if not self.ensure_token_valid():
+                raise RuntimeError("Brak ważnego tokenu Spotify")
+            results = self.breaker.call(self.sp.search, q=key[0], limit=limit, type='track')
+            return results.get('tracks', {}).get('items', []) or None
+
+        return self.search_cache.get_or_load(key, load) or []
+
+    def add_to_queue(self, uri):
+        """Dodaje utwór do kolejki odtwarzania"""
+        return self.breaker.call(self.sp.add_to_queue, uri)
+
+    def next_track(self):
+        """Pomija aktualny utwór"""
+        return self.breaker.call(self.sp.next_track)
+
+    def current_playback(self):
+        """Zwraca aktualne odtwarzanie"""
+        return self.breaker.call(self.sp.current_playback)
+
+    def devices(self):
+        """Zwraca urządzenia Spotify"""
+        return self.breaker.call(self.sp.devices)
+
+    def start_playback(self, device_id=None):
+        """Rozpoczyna odtwarzanie na urządzeniu"""
+        return self.breaker.call(self.sp.start_playback, device_id=device_id)
+
+    def get_stats(self):
+        """Zwraca statystyki klienta Spotify"""
+        return {
+            'token_refresh_in': round(self.seconds_until_refresh(), 1),
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'breaker': self.breaker.get_stats(),
+            'search_cache': self.search_cache.stats()
+        }
@@ -1,14 +1,12 @@
 import irc.client
 import threading
 import time
-import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import random
 import sys
 import os
 import asyncio
 from dotenv import load_dotenv
-import requests
 import json
 from datetime import datetime, timedelta
 
@@ -41,6 +39,23 @@ from games import MiniGames
 from shop import Shop
 from discord_integration import DiscordIntegration
 from discord_bot import DiscordBot
+from helix_client import HelixClient
+from metadata_cache import TTLCache
+from permissions import PermissionResolver, parse_tags
+from scheduler import Scheduler
+from rate_limiter import CommandLimiter
+from spotify_client import SpotifyClient
+from song_queue import SongRequestQueue, format_track
+from now_playing import NowPlaying
+from cadence import AdaptiveCadence
+from resilience import SERVICE_TIMEOUTS, get_breakers_stats
+from webhook_outbox import get_outboxes_stats
+from discord_gateway import get_gateway_stats
+from role_expiry import get_role_expiry_stats
+from member_index import get_member_index_stats
+from leaderboard_cache import get_leaderboard_cache_stats
+from event_bus import get_event_bus, get_event_bus_stats, publish_database_changes
+from data_service import open_user_database, get_data_service_stats
 
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
@@ -75,7 +90,21 @@ CHANNEL = os.getenv("TWITCH_CHANNEL")
 # Dynamiczne listy uprawnień - będą pobierane z Twitch API
 # Zamiast hardkodowanych list używamy pustych setów, które będą wypełniane automatycznie
 
-SONG_REQUEST_TIMEOUT = int(os.getenv("SONG_REQUEST_TIMEOUT", "300"))
+
+# Co ile sekund porównywać wersję danych rankingu z opublikowaną na Discord
+# (zapasowo - zmiany przychodzą zdarzeniem points_changed z szyny)
+LEADERBOARD_CHECK_INTERVAL = int(os.getenv("LEADERBOARD_CHECK_INTERVAL", "300"))
+# Po zdarzeniu zmiany punktów czekaj tyle sekund, żeby seria zmian dała jedną edycję rankingu
+LEADERBOARD_PUSH_DELAY = 15
+
+# Cykl przypomnień: (wiadomość, odstęp w sekundach do następnej)
+REMINDER_STEPS = [
+    (ZBIORKA_MSG, 15),
+    (FOLLOW_MSG, 600),
+    (DISCORD_MSG, 900),
+    (PRIME_MSG, 0),
+    (BITS_MSG, 1800)
+]
 
 class TwitchBot:
     def __init__(self):
@@ -92,17 +121,20 @@ class TwitchBot:
         self.connection.add_global_handler("pubmsg", self.on_message)
         self.connection.add_global_handler("usernotice", self.on_usernotice)
 
+        # Wspólny harmonogram zadań w tle (zamiast osobnego wątku ze sleep dla każdej pętli)
+        # Dwa wątki wystarczają - zadanie zawieszone ponad swój timeout jest porzucane i zastępowane
+        self.scheduler = Scheduler(workers=2)
+        
         # Spotify konfiguracja z zmiennych środowiskowych
         spotify_client_id = os.getenv("SPOTIFY_CLIENT_ID")
         spotify_client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
         spotify_redirect_uri = os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8888/callback")
         
         # Zawsze inicjalizuj podstawowe atrybuty Spotify
-        self.pending_song_requests = {}
-        self.last_request_time = {}
         self.spotify_enabled = False
-        self.sp = None
-        self.token_info = None
+        self.spotify = None
+        self.song_queue = None
+        self.now_playing = None
         self.sp_oauth = None
         
         if not spotify_client_id or not spotify_client_secret:
@@ -114,7 +146,8 @@ class TwitchBot:
                     client_secret=spotify_client_secret,
                     redirect_uri=spotify_redirect_uri,
                     scope="user-modify-playback-state user-read-playback-state",
-                    open_browser=False  # Wyłączone dla serwera
+                    open_browser=False,  # Wyłączone dla serwera
+                    requests_timeout=SERVICE_TIMEOUTS['spotify']
                 )
                 
                 # Inicjalizacja Spotify z obsługą zmiennych środowiskowych dla serwera
@@ -141,8 +174,12 @@ class TwitchBot:
                         safe_print(f"✅ Znaleziono zapisane tokeny Spotify w cache")
                 
                 if token_info:
-                    self.token_info = token_info
-                    self.sp = spotipy.Spotify(auth=token_info['access_token'])
+                    # Klient z cache wyszukiwań i odświeżaniem tokenu przed expires_at
+                    self.spotify = SpotifyClient(self.sp_oauth, token_info, self.scheduler)
+                    self.song_queue = SongRequestQueue(self.spotify, self.scheduler)
+                    # Aktualny utwór: odpytywany tylko w trakcie streama, wspólny dla czatu/panelu/Discord
+                    self.now_playing = NowPlaying(self.spotify, self.scheduler)
+                    self.now_playing.on_track_change(self.on_track_change)
                     self.spotify_enabled = True
                 else:
                     # Na serwerze nie próbujemy autoryzować - wymagamy wcześniej zapisanych tokenów
@@ -156,22 +193,19 @@ class TwitchBot:
                 safe_print(f"❌ Błąd autoryzacji Spotify: {e}")
                 safe_print(f"⚠️ Moduł Spotify będzie wyłączony")
                 self.spotify_enabled = False
-                self.sp = None
-                self.token_info = None
+                self.spotify = None
         
         # Follow tracking
         self.follow_thanks_enabled = FOLLOW_THANKS_ENABLED
         self.last_followers = set()
-        self.check_followers_thread = None
         
         # Subscription tracking
         self.sub_thanks_enabled = SUB_THANKS_ENABLED
         self.last_subscribers = set()
-        self.check_subscribers_thread = None
         
         # Reminders tracking
         self.reminders_enabled = True
-        self.reminder_thread = None
+        self.reminder_step = 0
         
         # Dynamiczne listy uprawnień
         self.moderators = set()
@@ -180,11 +214,25 @@ class TwitchBot:
         self.trusted_users = {"kranik1606"}  # Właściciel zawsze ma uprawnienia
         self.subs_no_limit = {"kranik1606"}  # Właściciel zawsze ma unlimited
         self.allowed_skip = {"kranik1606"}   # Właściciel zawsze może skipować
+        self.permissions = PermissionResolver(self)
+        self.permissions_synced = False
+        
+        # Cooldowny komend gier (poziomy wg trusted_users / subs_no_limit)
+        self.limiter = CommandLimiter(self)
         
         # Sprawdź konfigurację Twitch API
         twitch_client_id = os.getenv('TWITCH_CLIENT_ID')
         twitch_access_token = os.getenv('TWITCH_ACCESS_TOKEN')
         
+        # Wspólny klient Helix (sesja keep-alive, cache ID kanału, limity zapytań)
+        self.helix = HelixClient(twitch_client_id, twitch_access_token, CHANNEL)
+        
+        # Tempo zadań zależne od stanu streama (LIVE szybko, OFFLINE wolno)
+        self.cadence = AdaptiveCadence(self.scheduler, self.helix)
+        
+        # Cache metadanych kanałów i gier (rajdy, !setgame, powiadomienia LIVE)
+        self.metadata_cache = TTLCache(maxsize=512, ttl=600, negative_ttl=120, name="metadata")
+        
         # Debug logi
         safe_print(f"🔍 DEBUG: TWITCH_CLIENT_ID = {'***' + twitch_client_id[-4:] if twitch_client_id else 'BRAK'}")
         safe_print(f"🔍 DEBUG: TWITCH_ACCESS_TOKEN = {'***' + twitch_access_token[-4:] if twitch_access_token else 'BRAK'}")
@@ -216,23 +264,30 @@ class TwitchBot:
             safe_print(f"❌ Automatyczne dziękowanie za suby WYŁĄCZONE")
         
         # Inicjalizacja systemu gier i bazy danych
-        self.db = UserDatabase()
+        # Przy DATA_SERVICE=true bot jest jedynym procesem piszącym do bazy (Discord i web API wysyłają mu zapytania)
+        self.db = open_user_database(owner=True)
+        # Szyna zdarzeń: zmiany punktów, followy, zakupy i stan bota od razu trafiają do web API
+        self.bus = get_event_bus('twitch_bot')
+        publish_database_changes(self.db, self.bus)
         self.games = MiniGames(self.db, self)
         self.shop = Shop(self.db)
         self.discord = DiscordIntegration()
+        # Role z bazy nadań zdejmuje tylko ten proces (inne procesy jedynie zapisują nadania)
+        if self.discord.role_expiry:
+            self.discord.role_expiry.start()
         safe_print(f"🎮 System gier i punktów zainicjalizowany!")
         safe_print(f"🛒 Sklep nagród zainicjalizowany!")
         safe_print(f"🔗 Integracja Discord zainicjalizowana!")
         
         # Inicjalizacja hash bez wysyłania wiadomości na Discord
-        self.discord.initialize_leaderboard_hash(self.db)
-        self.shop.initialize_shop_hash()
+        self.discord.initialize_leaderboard_version(self.db)
+        self.shop.initialize_shop_version()
         safe_print(f"🔧 Zainicjalizowano hash rankingu i sklepu bez wysyłania wiadomości")
         
         # Inicjalizacja Discord bot z slash commands (opcjonalnie)
         discord_auto_start = os.getenv('DISCORD_AUTO_START', 'false').lower() == 'true'
         if discord_auto_start:
-            self.discord_bot = DiscordBot(self.db, self.discord, self.shop)
+            self.discord_bot = DiscordBot(self.db, self.discord, self.shop, self.now_playing, gateway=self.discord.gateway)
             if self.discord_bot.start_bot():
                 safe_print(f"🤖 Discord bot z slash commands uruchomiony!")
             else:
@@ -247,21 +302,22 @@ class TwitchBot:
         # Uruchom dzienne statystyki Discord
         self.start_daily_stats()
         
-        # Uruchom sprawdzanie timeout quizu
-        self.start_quiz_timeout_checker()
-        
         # Uruchom automatyczne aktualizacje Discord
         self.start_leaderboard_updater()
         
         # Uruchom monitor zmian w sklepie
         self.start_shop_monitor()
         
-        # Uruchom automatyczne odświeżanie tokenu Spotify
+        # Zaplanuj odświeżenie tokenu Spotify tuż przed jego wygaśnięciem
         if self.spotify_enabled:
-            self.start_spotify_token_refresher()
+            self.spotify.schedule_refresh()
         
-        # Zapisz początkowe dane do pliku dla web API
+        # Zapisz początkowe dane do pliku dla web API, potem odświeżaj co minutę
         self.save_bot_data()
+        self.scheduler.add_job('bot_data', self.save_bot_data, interval=60, delay=60)
+        
+        # Uruchom harmonogram po pełnej inicjalizacji (zadania korzystają z bazy i Discord)
+        self.scheduler.start()
 
     def get_channel_name(self):
         """Zwraca poprawny format nazwy kanału z # na początku"""
@@ -269,19 +325,9 @@ class TwitchBot:
 
     def ensure_token_valid(self):
         """Sprawdza i odświeża token Spotify jeśli to konieczne"""
-        if not self.spotify_enabled or not self.token_info:
-            return False
-            
-        try:
-            if self.sp_oauth.is_token_expired(self.token_info):
-                safe_print(f"🔄 Odświeżam token Spotify...")
-                self.token_info = self.sp_oauth.refresh_access_token(self.token_info['refresh_token'])
-                self.sp = spotipy.Spotify(auth=self.token_info['access_token'])
-                safe_print(f"✅ Token Spotify odświeżony (bez zapisywania plików)")
-            return True
-        except Exception as e:
-            safe_print(f"❌ Błąd odświeżania tokenu Spotify: {e}")
+        if not self.spotify_enabled or not self.spotify:
             return False
+        return self.spotify.ensure_token_valid()
 
     def on_connect(self, connection, event):
         safe_print(f"✅ Połączono z Twitch IRC!")
@@ -311,7 +357,20 @@ class TwitchBot:
         if username == "kranikbot":
             return
         
-        # Używamy dynamicznych list uprawnień zamiast hardkodowanych
+        # Aktualizuj uprawnienia z tagów wiadomości (badges/mod/subscriber/vip)
+        # Bez zapisu pliku w wątku IRC - listy trafią do bot_data.json przy zadaniu bot_data (co 60 s)
+        if self.permissions.update_from_event(username, event):
+            safe_print(f"🔧 Zaktualizowano uprawnienia {username} z tagów IRC")
+
+        # Limity komend gier - spam odrzucamy zanim dotknie bazy danych
+        # (rozpoznawanie komend jak w obsłudze poniżej - przy zmianie reguł popraw rate_limiter.COMMAND_MATCH)
+        command = self.limiter.match(message)
+        if command:
+            allowed, retry_after, notify = self.limiter.check(username, command)
+            if not allowed:
+                if notify:
+                    connection.privmsg(channel_name, f"⏳ @{username}, zwolnij! Spróbuj ponownie za {int(retry_after) + 1}s.")
+                return
 
         # Sprawdź czy użytkownik jest followerem
         is_follower = self.is_follower(username)
@@ -368,8 +427,8 @@ class TwitchBot:
                 connection.privmsg(channel_name, f"❌ @{username}, musisz być followerem kanału aby otrzymać dzienny bonus!")
                 return
                 
-            success, bonus = self.db.daily_bonus(username, is_follower)
-            if success and bonus > 0:
+            bonus = self.db.daily_bonus(username, is_follower)
+            if bonus > 0:
                 result = f"🎁 @{username} otrzymał dzienny bonus: +{bonus} punktów!"
             else:
                 result = f"❌ @{username}, już odebrałeś dzienny bonus! Spróbuj jutro."
@@ -415,6 +474,17 @@ class TwitchBot:
             connection.privmsg(channel_name, result)
             return
 
+        elif message.startswith("!link "):
+            code = message[len("!link "):].strip()
+            member_index = self.discord.member_index
+            if not member_index:
+                connection.privmsg(channel_name, f"❌ @{username}, łączenie kont Discord jest wyłączone.")
+            elif member_index.redeem_link_code(username, code):
+                connection.privmsg(channel_name, f"🔗 @{username}, konto Twitch połączone z Discordem!")
+            else:
+                connection.privmsg(channel_name, f"❌ @{username}, nieprawidłowy lub wygasły kod. Użyj /link na Discordzie.")
+            return
+
         elif message.startswith("!daj "):
             if username.lower() == "kranik1606":  # Tylko właściciel
                 parts = message[len("!daj "):].strip().split()
@@ -472,6 +542,9 @@ class TwitchBot:
 
         elif message == "!spotifyon":
             if username in self.trusted_users:
+                if not self.spotify:
+                    connection.privmsg(channel_name, f"❌ @{username}, brak konfiguracji Spotify.")
+                    return
                 self.spotify_enabled = True
                 connection.privmsg(channel_name, f"🎵 @{username} ponownie włączył moduł Spotify.")
             else:
@@ -483,12 +556,9 @@ class TwitchBot:
                 connection.privmsg(channel_name, f"❌ @{username}, moduł Spotify jest obecnie wyłączony.")
                 return
 
-            now = time.time()
-            last_time = self.last_request_time.get(username, 0)
-
             if username not in self.subs_no_limit:
-                remaining = int(SONG_REQUEST_TIMEOUT - (now - last_time))
-                if now - last_time < SONG_REQUEST_TIMEOUT:
+                remaining = self.song_queue.get_cooldown(username)
+                if remaining > 0:
                     minutes = remaining // 60
                     seconds = remaining % 60
                     connection.privmsg(channel_name, f"❌ @{username}, możesz dodać kolejną piosenkę za {minutes}m {seconds}s.")
@@ -504,17 +574,15 @@ class TwitchBot:
                     connection.privmsg(channel_name, f"❌ @{username}, problem z autoryzacją Spotify.")
                     return
                     
-                results = self.sp.search(q=song_name, limit=3, type='track')
-                tracks = results.get('tracks', {}).get('items', [])
+                tracks = self.spotify.search_tracks(song_name, limit=3)
                 if not tracks:
                     connection.privmsg(channel_name, f"❌ @{username}, nie znalazłem żadnych wyników dla \"{song_name}\".")
                     return
 
-                self.pending_song_requests[username] = tracks
+                self.song_queue.set_selection(username, tracks)
                 connection.privmsg(channel_name, f"@{username}, wybierz piosenkę wpisując !select <numer>:")
                 for i, track in enumerate(tracks, 1):
-                    artists = ", ".join(artist['name'] for artist in track['artists'])
-                    connection.privmsg(channel_name, f"{i}. {track['name']} - {artists}")
+                    connection.privmsg(channel_name, f"{i}. {format_track(track)}")
 
             except Exception as e:
                 safe_print(f"Spotify error:", e)
@@ -525,25 +593,23 @@ class TwitchBot:
                 connection.privmsg(channel_name, f"❌ @{username}, moduł Spotify jest obecnie wyłączony.")
                 return
 
-            if username not in self.pending_song_requests:
+            tracks = self.song_queue.get_selection(username)
+            if not tracks:
                 connection.privmsg(channel_name, f"@{username}, nie masz żadnych oczekujących propozycji.")
                 return
             try:
                 choice = int(message[len("!select "):].strip())
-                tracks = self.pending_song_requests[username]
                 if choice < 1 or choice > len(tracks):
                     connection.privmsg(channel_name, f"@{username}, wybierz numer od 1 do {len(tracks)}.")
                     return
                 track = tracks[choice - 1]
-                if not self.ensure_token_valid():
-                    connection.privmsg(channel_name, f"❌ @{username}, problem z autoryzacją Spotify.")
-                    return
-                    
-                self.sp.add_to_queue(track['uri'])
-                artists = ", ".join(artist['name'] for artist in track['artists'])
-                connection.privmsg(channel_name, f"🎶 @{username}, dodano: \"{track['name']}\" - {artists}")
-                self.last_request_time[username] = time.time()
-                del self.pending_song_requests[username]
+                
+                # Utwór trafia do lokalnej kolejki, do Spotify wysyłany jest partiami
+                added, result = self.song_queue.enqueue(username, track, username in self.subs_no_limit)
+                if added:
+                    connection.privmsg(channel_name, f"🎶 @{username}, dodano do kolejki (#{result}): \"{format_track(track)}\"")
+                else:
+                    connection.privmsg(channel_name, f"❌ @{username}, {result}.")
             except Exception as e:
                 safe_print(f"Spotify error:", e)
                 connection.privmsg(channel_name, f"❌ @{username}, błąd przy dodawaniu piosenki.")
@@ -575,7 +641,7 @@ class TwitchBot:
                     connection.privmsg(channel_name, f"❌ @{username}, problem z autoryzacją Spotify.")
                     return
                     
-                self.sp.next_track()
+                self.spotify.next_track()
                 connection.privmsg(channel_name, f"⏭️ @{username} pominął aktualną piosenkę.")
             except Exception as e:
                 safe_print(f"Spotify skip error:", e)
@@ -587,15 +653,10 @@ class TwitchBot:
                 return
 
             try:
-                if not self.ensure_token_valid():
-                    connection.privmsg(channel_name, f"❌ @{username}, problem z autoryzacją Spotify.")
-                    return
-                    
-                playback = self.sp.current_playback()
-                if playback and playback.get('item'):
-                    track = playback['item']
-                    artists = ", ".join(artist['name'] for artist in track['artists'])
-                    connection.privmsg(channel_name, f"🎵 Teraz gra: \"{track['name']}\" - {artists}")
+                # Z cache odpytywania - spam komendy nie generuje zapytań do Spotify
+                track = self.now_playing.get_current()
+                if track:
+                    connection.privmsg(channel_name, f"🎵 Teraz gra: \"{track['name']}\" - {track['artists']}")
                 else:
                     connection.privmsg(channel_name, "❌ Nie ma aktualnie odtwarzanej piosenki.")
             except Exception as e:
@@ -613,7 +674,7 @@ class TwitchBot:
                 "💰 Punkty: !points | !top | !daily | !give @user <punkty> | !motywacja"
             )
             help_msg4 = (
-                "🛒 Sklep: !shop | !kup <nagroda> | !inventory"
+                "🛒 Sklep: !shop | !kup <nagroda> | !inventory | !link <kod z /link na Discordzie>"
             )
             connection.privmsg(channel_name, help_msg1)
             connection.privmsg(channel_name, help_msg2)
@@ -636,7 +697,7 @@ class TwitchBot:
                     return
                     
                 self.follow_thanks_enabled = True
-                if not self.check_followers_thread or not self.check_followers_thread.is_alive():
+                if not self.scheduler.has_job('followers'):
                     self.start_follow_checker()
                 connection.privmsg(channel_name, f"💜 @{username} włączył automatyczne dziękowanie za followy.")
             else:
@@ -659,7 +720,7 @@ class TwitchBot:
                     return
                     
                 self.sub_thanks_enabled = True
-                if not self.check_subscribers_thread or not self.check_subscribers_thread.is_alive():
+                if not self.scheduler.has_job('subscribers'):
                     self.start_subscription_checker()
                 connection.privmsg(channel_name, f"🌟 @{username} włączył automatyczne dziękowanie za suby.")
             else:
@@ -678,7 +739,7 @@ class TwitchBot:
         elif message == "!reminderson":
             if username in self.trusted_users:
                 self.reminders_enabled = True
-                if not self.reminder_thread or not self.reminder_thread.is_alive():
+                if not self.scheduler.has_job('reminders'):
                     self.start_reminder()
                 connection.privmsg(channel_name, f"📢 @{username} włączył automatyczne przypomnienia.")
             else:
@@ -796,13 +857,7 @@ class TwitchBot:
                 # Uruchom czyszczenie w osobnym wątku
                 def clear_channel_thread():
                     try:
-                        import asyncio
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        success = loop.run_until_complete(
-                            self.discord.clear_discord_channel(channel_id, username)
-                        )
-                        loop.close()
+                        success = self.discord.clear_channel(channel_id, username)
                         
                         if success:
                             self.connection.privmsg(channel_name, f"✅ @{username}, czyszczenie kanału Discord zakończone!")
@@ -888,24 +943,27 @@ class TwitchBot:
 
     # === METODY OBSŁUGI FOLLOWÓW ===
     def start_follow_checker(self):
-        """Uruchamia wątek sprawdzający nowych followerów"""
-        def follow_checker_loop():
-            # Pobierz początkową listę followerów
-            initial_followers = self.get_twitch_followers()
-            if initial_followers:
-                self.last_followers = set(initial_followers)
-                safe_print(f"📊 Załadowano {len(self.last_followers)} followerów")
+        """Rejestruje w harmonogramie sprawdzanie nowych followerów"""
+        self.followers_loaded = False
+        
+        def follow_checker_job():
+            if not self.follow_thanks_enabled:
+                self.scheduler.cancel('followers')
+                return
             
-            while self.follow_thanks_enabled:
-                try:
-                    time.sleep(15)  # Sprawdzaj co 15 sekund
-                    self.check_new_followers()
-                except Exception as e:
-                    safe_print(f"❌ Błąd sprawdzania followów: {e}")
-                    time.sleep(60)  # Czekaj dłużej przy błędzie
+            # Pobierz początkową listę followerów przy pierwszym uruchomieniu
+            if not self.followers_loaded:
+                initial_followers = self.get_twitch_followers()
+                if initial_followers:
+                    self.last_followers = set(initial_followers)
+                    safe_print(f"📊 Załadowano {len(self.last_followers)} followerów")
+                self.followers_loaded = True
+                return
+            
+            self.check_new_followers()
 
-        self.check_followers_thread = threading.Thread(target=follow_checker_loop, daemon=True)
-        self.check_followers_thread.start()
+        # Co 15 s w trakcie streama, rzadziej poza nim; przy błędach odstęp rośnie do 5 minut
+        self.scheduler.add_job('followers', follow_checker_job, interval=self.cadence.interval_for('followers'), jitter=2, timeout=120, max_backoff=300)
         safe_print(f"🔄 Uruchomiono sprawdzanie followów")
 
     def check_new_followers(self):
@@ -922,6 +980,7 @@ class TwitchBot:
             safe_print(f"🆕 Nowi followerzy: {list(new_followers)}")
         
         for follower in new_followers:
+            self.bus.publish('follower_added', username=follower)
             self.thank_for_follow(follower)
             time.sleep(2)  # Odstęp między podziękowaniami
         
@@ -938,56 +997,16 @@ class TwitchBot:
     def get_twitch_followers(self):
         """Pobiera listę followerów z Twitch API z paginacją"""
         try:
-            # Używamy Twitch Helix API
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Najpierw pobierz ID kanału
-            user_url = f"https://api.twitch.tv/helix/users?login={CHANNEL.lstrip('#')}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika: {user_response.status_code}")
-                return None
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            broadcaster_id = self.helix.get_broadcaster_id()
+            if not broadcaster_id:
                 safe_print(f"❌ Nie znaleziono danych użytkownika")
                 return None
-                
-            broadcaster_id = user_data['data'][0]['id']
             
             # Pobierz wszystkich followerów z paginacją
-            all_followers = []
-            cursor = None
-            
-            while True:
-                # Buduj URL z cursorem jeśli istnieje
-                followers_url = f"https://api.twitch.tv/helix/channels/followers?broadcaster_id={broadcaster_id}&first=100"
-                if cursor:
-                    followers_url += f"&after={cursor}"
-                
-                followers_response = requests.get(followers_url, headers=headers)
-                
-                if followers_response.status_code != 200:
-                    safe_print(f"❌ Błąd pobierania followerów: {followers_response.status_code}")
-                    return None
-                    
-                followers_data = followers_response.json()
-                page_followers = [follower['user_name'].lower() for follower in followers_data.get('data', [])]
-                all_followers.extend(page_followers)
-                
-                # Sprawdź czy są kolejne strony
-                pagination = followers_data.get('pagination', {})
-                cursor = pagination.get('cursor')
-                
-                if not cursor:
-                    break  # Brak kolejnych stron
-                    
-                # Dodaj małe opóźnienie między requestami
-                time.sleep(0.1)
+            followers = self.helix.get_paginated('channels/followers', {'broadcaster_id': broadcaster_id})
+            if followers is None:
+                return None
+            all_followers = [follower['user_name'].lower() for follower in followers]
             
             safe_print(f"📊 Pobrano {len(all_followers)} followerów (wszystkich)")
             
@@ -1020,24 +1039,27 @@ class TwitchBot:
 
     # === METODY OBSŁUGI SUBSKRYPCJI ===
     def start_subscription_checker(self):
-        """Uruchamia wątek sprawdzający nowych subskrybentów"""
-        def subscription_checker_loop():
-            # Pobierz początkową listę subskrybentów
-            initial_subscribers = self.get_twitch_subscribers()
-            if initial_subscribers:
-                self.last_subscribers = set(initial_subscribers)
-                safe_print(f"📊 Załadowano {len(self.last_subscribers)} subskrybentów")
+        """Rejestruje w harmonogramie sprawdzanie nowych subskrybentów"""
+        self.subscribers_loaded = False
+        
+        def subscription_checker_job():
+            if not self.sub_thanks_enabled:
+                self.scheduler.cancel('subscribers')
+                return
             
-            while self.sub_thanks_enabled:
-                try:
-                    time.sleep(15)  # Sprawdzaj co 15 sekund
-                    self.check_new_subscribers()
-                except Exception as e:
-                    safe_print(f"❌ Błąd sprawdzania subskrypcji: {e}")
-                    time.sleep(60)  # Czekaj dłużej przy błędzie
+            # Pobierz początkową listę subskrybentów przy pierwszym uruchomieniu
+            if not self.subscribers_loaded:
+                initial_subscribers = self.get_twitch_subscribers()
+                if initial_subscribers:
+                    self.last_subscribers = set(initial_subscribers)
+                    safe_print(f"📊 Załadowano {len(self.last_subscribers)} subskrybentów")
+                self.subscribers_loaded = True
+                return
+            
+            self.check_new_subscribers()
 
-        self.check_subscribers_thread = threading.Thread(target=subscription_checker_loop, daemon=True)
-        self.check_subscribers_thread.start()
+        # Co 15 s w trakcie streama, rzadziej poza nim; przy błędach odstęp rośnie do 5 minut
+        self.scheduler.add_job('subscribers', subscription_checker_job, interval=self.cadence.interval_for('subscribers'), jitter=2, timeout=120, max_backoff=300)
         safe_print(f"🔄 Uruchomiono sprawdzanie subskrypcji")
 
     def check_new_subscribers(self):
@@ -1060,56 +1082,16 @@ class TwitchBot:
     def get_twitch_subscribers(self):
         """Pobiera listę subskrybentów z Twitch API z paginacją"""
         try:
-            # Używamy Twitch Helix API
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Najpierw pobierz ID kanału
-            user_url = f"https://api.twitch.tv/helix/users?login={CHANNEL.lstrip('#')}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika: {user_response.status_code}")
-                return None
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            broadcaster_id = self.helix.get_broadcaster_id()
+            if not broadcaster_id:
                 safe_print(f"❌ Nie znaleziono danych użytkownika")
                 return None
-                
-            broadcaster_id = user_data['data'][0]['id']
             
             # Pobierz wszystkich subskrybentów z paginacją
-            all_subscribers = []
-            cursor = None
-            
-            while True:
-                # Buduj URL z cursorem jeśli istnieje
-                subscribers_url = f"https://api.twitch.tv/helix/subscriptions?broadcaster_id={broadcaster_id}&first=100"
-                if cursor:
-                    subscribers_url += f"&after={cursor}"
-                
-                subscribers_response = requests.get(subscribers_url, headers=headers)
-                
-                if subscribers_response.status_code != 200:
-                    safe_print(f"❌ Błąd pobierania subskrybentów: {subscribers_response.status_code}")
-                    return None
-                    
-                subscribers_data = subscribers_response.json()
-                page_subscribers = [sub['user_name'].lower() for sub in subscribers_data.get('data', [])]
-                all_subscribers.extend(page_subscribers)
-                
-                # Sprawdź czy są kolejne strony
-                pagination = subscribers_data.get('pagination', {})
-                cursor = pagination.get('cursor')
-                
-                if not cursor:
-                    break  # Brak kolejnych stron
-                    
-                # Dodaj małe opóźnienie między requestami
-                time.sleep(0.1)
+            subscribers = self.helix.get_paginated('subscriptions', {'broadcaster_id': broadcaster_id})
+            if subscribers is None:
+                return None
+            all_subscribers = [sub['user_name'].lower() for sub in subscribers]
             
             safe_print(f"📊 Pobrano {len(all_subscribers)} subskrybentów (wszystkich)")
             return all_subscribers
@@ -1135,70 +1117,41 @@ class TwitchBot:
 
     # === METODY OBSŁUGI UPRAWNIEŃ ===
     def update_permissions_on_startup(self):
-        """Uruchamia pierwsze pobieranie uprawnień w osobnym wątku"""
-        def permissions_updater():
-            try:
+        """Rejestruje pobieranie uprawnień: od razu przy starcie, potem rzadka synchronizacja z Helix"""
+        def permissions_job():
+            first_sync = not self.permissions_synced
+            if first_sync:
                 safe_print(f"🔄 Pobieranie uprawnień z Twitch API...")
-                self.fetch_moderators()
-                self.fetch_vips()
-                self.fetch_subscribers_for_permissions()
-                self.update_permission_lists()
+            
+            self.fetch_moderators()
+            self.fetch_vips()
+            self.fetch_subscribers_for_permissions()
+            self.update_permission_lists()
+            self.permissions_synced = True
+            
+            if first_sync:
                 safe_print(f"✅ Uprawnienia zaktualizowane!")
-                
-                # Uruchom cykliczne odświeżanie co 5 minut
-                while True:
-                    time.sleep(300)  # 5 minut
-                    try:
-                        self.fetch_moderators()
-                        self.fetch_vips()
-                        self.fetch_subscribers_for_permissions()
-                        self.update_permission_lists()
-                        # Wyczyść punkty użytkownikom bez follow
-                        self.clear_non_followers_points()
-                        safe_print(f"🔄 Uprawnienia odświeżone")
-                    except Exception as e:
-                        safe_print(f"❌ Błąd odświeżania uprawnień: {e}")
-                        
-            except Exception as e:
-                safe_print(f"❌ Błąd inicjalizacji uprawnień: {e}")
+            else:
+                # Wyczyść punkty użytkownikom bez follow
+                self.clear_non_followers_points()
+                safe_print(f"🔄 Uprawnienia odświeżone")
         
-        permissions_thread = threading.Thread(target=permissions_updater, daemon=True)
-        permissions_thread.start()
+        # Rzadka synchronizacja z Helix - na bieżąco role aktualizują tagi IRC
+        self.scheduler.add_job('permissions', permissions_job, interval=self.cadence.interval_for('permissions'), jitter=30, timeout=300)
 
     def fetch_moderators(self):
         """Pobiera listę moderatorów z Twitch API"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Pobierz ID kanału
-            user_url = f"https://api.twitch.tv/helix/users?login={CHANNEL.lstrip('#')}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika dla moderatorów: {user_response.status_code}")
-                return
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            broadcaster_id = self.helix.get_broadcaster_id()
+            if not broadcaster_id:
                 safe_print(f"❌ Nie znaleziono danych użytkownika dla moderatorów")
                 return
-                
-            broadcaster_id = user_data['data'][0]['id']
             
             # Pobierz moderatorów
-            moderators_url = f"https://api.twitch.tv/helix/moderation/moderators?broadcaster_id={broadcaster_id}&first=100"
-            moderators_response = requests.get(moderators_url, headers=headers)
-            
-            if moderators_response.status_code == 200:
-                moderators_data = moderators_response.json()
-                moderators = [mod['user_name'].lower() for mod in moderators_data.get('data', [])]
-                self.moderators = set(moderators)
+            moderators = self.helix.get_paginated('moderation/moderators', {'broadcaster_id': broadcaster_id})
+            if moderators is not None:
+                self.moderators = set(mod['user_name'].lower() for mod in moderators)
                 safe_print(f"📋 Pobrano {len(self.moderators)} moderatorów")
-            else:
-                safe_print(f"❌ Błąd pobierania moderatorów: {moderators_response.status_code}")
                 
         except Exception as e:
             safe_print(f"❌ Błąd API moderatorów: {e}")
@@ -1206,37 +1159,16 @@ class TwitchBot:
     def fetch_vips(self):
         """Pobiera listę VIP-ów z Twitch API"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Pobierz ID kanału
-            user_url = f"https://api.twitch.tv/helix/users?login={CHANNEL.lstrip('#')}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika dla VIP: {user_response.status_code}")
-                return
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            broadcaster_id = self.helix.get_broadcaster_id()
+            if not broadcaster_id:
                 safe_print(f"❌ Nie znaleziono danych użytkownika dla VIP")
                 return
-                
-            broadcaster_id = user_data['data'][0]['id']
             
             # Pobierz VIP-ów
-            vips_url = f"https://api.twitch.tv/helix/channels/vips?broadcaster_id={broadcaster_id}&first=100"
-            vips_response = requests.get(vips_url, headers=headers)
-            
-            if vips_response.status_code == 200:
-                vips_data = vips_response.json()
-                vips = [vip['user_name'].lower() for vip in vips_data.get('data', [])]
-                self.vips = set(vips)
+            vips = self.helix.get_paginated('channels/vips', {'broadcaster_id': broadcaster_id})
+            if vips is not None:
+                self.vips = set(vip['user_name'].lower() for vip in vips)
                 safe_print(f"⭐ Pobrano {len(self.vips)} VIP-ów")
-            else:
-                safe_print(f"❌ Błąd pobierania VIP-ów: {vips_response.status_code}")
                 
         except Exception as e:
             safe_print(f"❌ Błąd API VIP-ów: {e}")
@@ -1300,43 +1232,28 @@ class TwitchBot:
             return 0
 
     def get_channel_info(self, username):
-        """Pobiera informacje o kanale z Twitch API (tytuł i grę)"""
+        """Pobiera informacje o kanale z Twitch API (tytuł i grę) - z cache metadanych"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Pobierz ID użytkownika
-            user_url = f"https://api.twitch.tv/helix/users?login={username}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika {username}: {user_response.status_code}")
-                return None
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            # Pobierz ID użytkownika (z cache klienta Helix)
+            user_id = self.helix.get_user_id(username)
+            if not user_id:
                 safe_print(f"❌ Nie znaleziono użytkownika {username}")
                 return None
-                
-            user_id = user_data['data'][0]['id']
             
-            # Pobierz informacje o kanale
-            channel_url = f"https://api.twitch.tv/helix/channels?broadcaster_id={user_id}"
-            channel_response = requests.get(channel_url, headers=headers)
+            def load_channel_info():
+                channel_data = self.helix.get_data('channels', {'broadcaster_id': user_id})
+                if channel_data is None:
+                    raise RuntimeError(f"Błąd pobierania informacji o kanale {username}")
+                if not channel_data:
+                    return None
+                channel_info = channel_data[0]
+                return {
+                    'game_name': channel_info.get('game_name', 'Nieznana gra'),
+                    'title': channel_info.get('title', 'Brak tytułu')
+                }
             
-            if channel_response.status_code == 200:
-                channel_data = channel_response.json()
-                if channel_data.get('data'):
-                    channel_info = channel_data['data'][0]
-                    return {
-                        'game_name': channel_info.get('game_name', 'Nieznana gra'),
-                        'title': channel_info.get('title', 'Brak tytułu')
-                    }
-            else:
-                safe_print(f"❌ Błąd pobierania informacji o kanale {username}: {channel_response.status_code}")
-                return None
+            # Cache po ID kanału - powtórne rajdy i powiadomienia LIVE bez zapytań do Helix
+            return self.metadata_cache.get_or_load(('channel', user_id), load_channel_info)
                 
         except Exception as e:
             safe_print(f"❌ Błąd API kanału dla {username}: {e}")
@@ -1345,26 +1262,10 @@ class TwitchBot:
     def modify_channel_info(self, title=None, game_name=None):
         """Modyfikuje informacje o kanale (tytuł i/lub grę)"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}',
-                'Content-Type': 'application/json'
-            }
-            
-            # Pobierz ID użytkownika
-            user_url = f"https://api.twitch.tv/helix/users?login={CHANNEL.lstrip('#')}"
-            user_response = requests.get(user_url, headers=headers)
-            
-            if user_response.status_code != 200:
-                safe_print(f"❌ Błąd pobierania danych użytkownika: {user_response.status_code}")
-                return False
-                
-            user_data = user_response.json()
-            if not user_data.get('data'):
+            user_id = self.helix.get_broadcaster_id()
+            if not user_id:
                 safe_print(f"❌ Nie znaleziono użytkownika")
                 return False
-                
-            user_id = user_data['data'][0]['id']
             
             # Przygotuj dane do modyfikacji
             modify_data = {}
@@ -1384,10 +1285,11 @@ class TwitchBot:
                 return False
             
             # Modyfikuj kanał
-            channel_url = f"https://api.twitch.tv/helix/channels?broadcaster_id={user_id}"
-            response = requests.patch(channel_url, headers=headers, json=modify_data)
+            response = self.helix.patch('channels', params={'broadcaster_id': user_id}, json=modify_data)
             
-            if response.status_code == 204:
+            if response is not None and response.status_code == 204:
+                # Unieważnij zapamiętane informacje o własnym kanale
+                self.metadata_cache.invalidate(('channel', user_id))
                 safe_print(f"✅ Pomyślnie zaktualizowano kanał")
                 if title:
                     safe_print(f"📝 Nowy tytuł: {title}")
@@ -1395,8 +1297,9 @@ class TwitchBot:
                     safe_print(f"🎮 Nowa gra: {game_name}")
                 return True
             else:
-                safe_print(f"❌ Błąd modyfikacji kanału: {response.status_code}")
-                safe_print(f"❌ Odpowiedź: {response.text}")
+                safe_print(f"❌ Błąd modyfikacji kanału: {response.status_code if response is not None else 'brak odpowiedzi'}")
+                if response is not None:
+                    safe_print(f"❌ Odpowiedź: {response.text}")
                 return False
                 
         except Exception as e:
@@ -1404,21 +1307,18 @@ class TwitchBot:
             return False
 
     def get_game_id(self, game_name):
-        """Pobiera ID gry na podstawie nazwy"""
+        """Pobiera ID gry na podstawie nazwy - z cache metadanych"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
-            # Szukaj gry
-            game_url = f"https://api.twitch.tv/helix/games?name={requests.utils.quote(game_name)}"
-            response = requests.get(game_url, headers=headers)
+            def load_game_id():
+                data = self.helix.get_data('games', {'name': game_name})
+                if data is None:
+                    raise RuntimeError(f"Błąd wyszukiwania gry: {game_name}")
+                return data[0]['id'] if data else None
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('data'):
-                    return data['data'][0]['id']
+            # Szukaj gry (nazwa znormalizowana, brak wyniku też jest pamiętany)
+            game_id = self.metadata_cache.get_or_load(('game', game_name.strip().lower()), load_game_id)
+            if game_id:
+                return game_id
             
             safe_print(f"❌ Nie znaleziono gry: {game_name}")
             return None
@@ -1431,15 +1331,11 @@ class TwitchBot:
         """Obsługuje USERNOTICE wiadomości (rajdy, suby, etc.)"""
         try:
             # Parsuj tagi z wiadomości
-            tags = {}
-            if hasattr(event, 'tags'):
-                for tag in event.tags:
-                    if '=' in tag:
-                        key, value = tag.split('=', 1)
-                        tags[key] = value
+            tags = parse_tags(event)
             
             # Sprawdź czy to rajd
             msg_id = tags.get('msg-id', '')
+            channel_name = self.get_channel_name()
             if msg_id == 'raid':
                 raider_name = tags.get('msg-param-displayName', tags.get('display-name', 'Nieznany'))
                 viewer_count = tags.get('msg-param-viewerCount', '0')
@@ -1470,10 +1366,10 @@ class TwitchBot:
 
     def start_playback(self):
         try:
-            devices = self.sp.devices()
+            devices = self.spotify.devices()
             if devices['devices']:
                 device_id = devices['devices'][0]['id']
-                self.sp.start_playback(device_id=device_id)
+                self.spotify.start_playback(device_id=device_id)
                 return True
             else:
                 safe_print(f"Brak aktywnych urządzeń Spotify.")
@@ -1483,220 +1379,145 @@ class TwitchBot:
             return False
 
     def start_reminder(self):
-        def reminder_loop():
-            # Opóźnienie pierwszego przypomnienia o 15 sekund
-            time.sleep(15)
+        """Rejestruje w harmonogramie cykl przypomnień na czacie"""
+        self.reminder_step = 0
+        
+        def reminder_job():
+            if not self.reminders_enabled:
+                self.scheduler.cancel('reminders')
+                return
             
-            while True:
-                if not self.reminders_enabled:
-                    time.sleep(60)  # Sprawdzaj co minutę czy remindery zostały włączone
-                    continue
-                    
-                channel_name = self.get_channel_name()
-                self.connection.privmsg(channel_name, ZBIORKA_MSG)
-                time.sleep(15)
-                
-                if not self.reminders_enabled:
-                    continue
-                self.connection.privmsg(channel_name, FOLLOW_MSG)
-                time.sleep(600)
-                
-                if not self.reminders_enabled:
-                    continue
-                self.connection.privmsg(channel_name, DISCORD_MSG)
-                time.sleep(900)
-                
-                if not self.reminders_enabled:
-                    continue
-                self.connection.privmsg(channel_name, PRIME_MSG)
-                time.sleep(0)
-                
-                if not self.reminders_enabled:
-                    continue
-                self.connection.privmsg(channel_name, BITS_MSG)
-                time.sleep(1800)
+            message, delay = REMINDER_STEPS[self.reminder_step]
+            self.connection.privmsg(self.get_channel_name(), message)
+            self.reminder_step = (self.reminder_step + 1) % len(REMINDER_STEPS)
+            return delay  # Odstęp do następnego kroku cyklu
 
-        self.reminder_thread = threading.Thread(target=reminder_loop, daemon=True)
-        self.reminder_thread.start()
+        # Opóźnienie pierwszego przypomnienia o 15 sekund
+        self.scheduler.add_job('reminders', reminder_job, interval=REMINDER_STEPS[0][1], delay=15)
 
     # === MONITOROWANIE STATUSU STREAMA ===
     def start_stream_monitor(self):
-        """Uruchamia monitorowanie statusu streama"""
-        def stream_monitor_loop():
-            last_status = None
-            first_check = True
-            while True:
-                try:
-                    current_status = self.check_stream_status()
-                    safe_print(f"📺 Status streama: {current_status} (poprzedni: {last_status}, pierwszy: {first_check})")
-                    
-                    if current_status != last_status:
-                        if current_status:
-                            # Stream się rozpoczął
-                            safe_print(f"🔴 Wykryto rozpoczęcie streama!")
-                            channel_info = self.get_channel_info(CHANNEL.lstrip('#'))
-                            title = channel_info.get('title', '') if channel_info else ''
-                            game = channel_info.get('game_name', '') if channel_info else ''
-                            self.discord.notify_stream_status(True, title, game)
-                            safe_print(f"🔴 Stream LIVE - powiadomienie Discord wysłane")
-                        elif not first_check:
-                            # Stream się zakończył (ale nie przy pierwszym sprawdzeniu)
-                            safe_print(f"⚫ Wykryto zakończenie streama!")
-                            self.discord.notify_stream_status(False)
-                            safe_print(f"⚫ Stream OFFLINE - powiadomienie Discord wysłane")
-                        else:
-                            safe_print(f"⚫ Stream offline przy pierwszym sprawdzeniu - pomijam powiadomienie")
-                        last_status = current_status
-                        first_check = False
-                    time.sleep(60)  # Sprawdzaj co minutę
-                except Exception as e:
-                    safe_print(f"❌ Błąd monitorowania streama: {e}")
-                    time.sleep(60)
+        """Rejestruje w harmonogramie monitorowanie statusu streama"""
+        self.stream_last_status = None
+        self.stream_first_check = True
+        
+        def stream_monitor_job():
+            current_status = self.check_stream_status()
+            if current_status is None:
+                return  # Błąd API - nie traktuj jako zakończenia streama
+            
+            # Przestaw tempo zadań (przy starcie streama od razu nadrabia followy/suby/uprawnienia)
+            self.cadence.set_live(current_status)
+            
+            last_status = self.stream_last_status
+            first_check = self.stream_first_check
+            safe_print(f"📺 Status streama: {current_status} (poprzedni: {last_status}, pierwszy: {first_check})")
+            
+            if current_status != last_status:
+                channel_info = self.get_channel_info(CHANNEL.lstrip('#')) if current_status else None
+                title = channel_info.get('title', '') if channel_info else ''
+                game = channel_info.get('game_name', '') if channel_info else ''
+                self.bus.publish('stream_status', live=current_status, title=title, game=game)
+                
+                if self.now_playing:
+                    if current_status:
+                        self.now_playing.start()
+                    elif not first_check:
+                        self.now_playing.stop()
+                
+                if current_status:
+                    # Stream się rozpoczął
+                    safe_print(f"🔴 Wykryto rozpoczęcie streama!")
+                    self.discord.notify_stream_status(True, title, game)
+                    safe_print(f"🔴 Stream LIVE - powiadomienie Discord wysłane")
+                elif not first_check:
+                    # Stream się zakończył (ale nie przy pierwszym sprawdzeniu)
+                    safe_print(f"⚫ Wykryto zakończenie streama!")
+                    self.discord.notify_stream_status(False)
+                    safe_print(f"⚫ Stream OFFLINE - powiadomienie Discord wysłane")
+                else:
+                    safe_print(f"⚫ Stream offline przy pierwszym sprawdzeniu - pomijam powiadomienie")
+                self.stream_last_status = current_status
+                self.stream_first_check = False
         
-        monitor_thread = threading.Thread(target=stream_monitor_loop, daemon=True)
-        monitor_thread.start()
+        # Co minutę w trakcie streama, rzadziej poza nim
+        self.scheduler.add_job('stream_monitor', stream_monitor_job, interval=self.cadence.interval_for('stream_monitor'), jitter=5, timeout=120, max_backoff=300)
         safe_print(f"📺 Monitor statusu streama uruchomiony")
 
     def check_stream_status(self):
         """Sprawdza czy stream jest live"""
         try:
-            headers = {
-                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                'Authorization': f'Bearer {os.getenv("TWITCH_ACCESS_TOKEN")}'
-            }
-            
             # Sprawdź status streama
-            stream_url = f"https://api.twitch.tv/helix/streams?user_login={CHANNEL.lstrip('#')}"
-            response = requests.get(stream_url, headers=headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                is_live = len(data.get('data', [])) > 0
-                safe_print(f"🔍 API Twitch: kanał {CHANNEL.lstrip('#')} - {'LIVE' if is_live else 'OFFLINE'}")
-                return is_live  # True jeśli stream jest live
-            else:
-                safe_print(f"❌ Błąd sprawdzania statusu streama: {response.status_code}")
+            data = self.helix.get_data('streams', {'user_login': self.helix.channel})
+            if data is None:
+                safe_print(f"❌ Błąd sprawdzania statusu streama")
                 return None
+            
+            is_live = len(data) > 0
+            safe_print(f"🔍 API Twitch: kanał {self.helix.channel} - {'LIVE' if is_live else 'OFFLINE'}")
+            return is_live  # True jeśli stream jest live
                 
         except Exception as e:
             safe_print(f"❌ Błąd API statusu streama: {e}")
             return None
 
-    def start_daily_stats(self):
-        """Uruchamia wysyłanie dziennych statystyk Discord"""
-        def daily_stats_loop():
-            while True:
-                try:
-                    # Czekaj do 20:00 każdego dnia
-                    now = datetime.now()
-                    target_time = now.replace(hour=20, minute=0, second=0, microsecond=0)
-                    
-                    # Jeśli już minęła 20:00 dzisiaj, ustaw na jutro
-                    if now >= target_time:
-                        target_time += timedelta(days=1)
-                    
-                    # Oblicz czas do czekania
-                    wait_seconds = (target_time - now).total_seconds()
-                    safe_print(f"📊 Następne statystyki Discord o {target_time.strftime('%Y-%m-%d %H:%M')}")
-                    
-                    time.sleep(wait_seconds)
-                    
-                    # Wyślij statystyki
-                    self.discord.send_daily_stats()
-                    safe_print(f"📊 Dzienne statystyki Discord wysłane")
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd wysyłania dziennych statystyk: {e}")
-                    time.sleep(3600)  # Spróbuj ponownie za godzinę
+    def seconds_until_daily_stats(self):
+        """Zwraca liczbę sekund do najbliższej 20:00"""
+        now = datetime.now()
+        target_time = now.replace(hour=20, minute=0, second=0, microsecond=0)
         
-        stats_thread = threading.Thread(target=daily_stats_loop, daemon=True)
-        stats_thread.start()
-        safe_print(f"📊 Harmonogram dziennych statystyk Discord uruchomiony")
+        # Jeśli już minęła 20:00 dzisiaj, ustaw na jutro
+        if now >= target_time:
+            target_time += timedelta(days=1)
+        
+        safe_print(f"📊 Następne statystyki Discord o {target_time.strftime('%Y-%m-%d %H:%M')}")
+        return (target_time - now).total_seconds()
 
-    def start_quiz_timeout_checker(self):
-        """Uruchamia sprawdzanie timeout quizu co 5 sekund"""
-        def quiz_timeout_loop():
-            while True:
-                try:
-                    quiz_timeout_msg = self.games.check_quiz_timeout()
-                    if quiz_timeout_msg:
-                        channel_name = self.get_channel_name()
-                        self.connection.privmsg(channel_name, quiz_timeout_msg)
-                    time.sleep(5)  # Sprawdzaj co 5 sekund
-                except Exception as e:
-                    safe_print(f"❌ Błąd sprawdzania timeout quizu: {e}")
-                    time.sleep(5)
+    def start_daily_stats(self):
+        """Rejestruje w harmonogramie wysyłanie dziennych statystyk Discord o 20:00"""
+        def daily_stats_job():
+            # Wyślij statystyki
+            self.discord.send_daily_stats()
+            safe_print(f"📊 Dzienne statystyki Discord wysłane")
+            return self.seconds_until_daily_stats()
         
-        quiz_thread = threading.Thread(target=quiz_timeout_loop, daemon=True)
-        quiz_thread.start()
-        safe_print(f"❓ Monitor timeout quizu uruchomiony")
+        # Przy błędzie spróbuj ponownie za godzinę
+        self.scheduler.add_job('daily_stats', daily_stats_job, interval=3600,
+                               delay=self.seconds_until_daily_stats(), max_backoff=3600)
+        safe_print(f"📊 Harmonogram dziennych statystyk Discord uruchomiony")
 
     def start_leaderboard_updater(self):
-        """Uruchamia automatyczne sprawdzanie zmian w rankingu Discord co 30 minut"""
-        def leaderboard_updater_loop():
-            # Pierwsze uruchomienie po 60 sekundach
-            time.sleep(60)
-            
-            while True:
-                try:
-                    safe_print(f"🏆 Sprawdzam zmiany w rankingu...")
-                    self.discord.update_leaderboard_if_changed(self.db)
-                    
-                    # Sprawdzaj co 30 minut
-                    time.sleep(1800)
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd sprawdzania rankingu Discord: {e}")
-                    time.sleep(1800)  # Spróbuj ponownie za 30 minut
+        """Rejestruje w harmonogramie sprawdzanie zmian w rankingu Discord (porównanie wersji danych)"""
+        def leaderboard_updater_job():
+            self.discord.update_leaderboard_if_changed(self.db)
         
-        leaderboard_thread = threading.Thread(target=leaderboard_updater_loop, daemon=True)
-        leaderboard_thread.start()
+        def on_points_changed(data, event):
+            # Zmiana danych (również z web API) - jedna aktualizacja po oknie zbierającym serię zmian
+            if not self.scheduler.has_job('leaderboard_push'):
+                self.scheduler.call_later('leaderboard_push', LEADERBOARD_PUSH_DELAY, leaderboard_updater_job)
+        
+        self.bus.subscribe('points_changed', on_points_changed)
+        
+        # Okresowe sprawdzenie wersji zostaje jako zabezpieczenie, gdy szyna zdarzeń nie działa
+        self.scheduler.add_job('leaderboard', leaderboard_updater_job, interval=LEADERBOARD_CHECK_INTERVAL, delay=60,
+                               jitter=10, timeout=60, max_backoff=1800)
         safe_print(f"🏆 Automatyczne sprawdzanie zmian w rankingu Discord uruchomione")
 
     def start_shop_monitor(self):
-        """Uruchamia monitorowanie zmian w sklepie i automatyczne aktualizacje Discord"""
-        def shop_monitor_loop():
-            # Pierwsze uruchomienie po 30 sekundach
-            time.sleep(30)
-            
-            while True:
-                try:
-                    safe_print(f"🛒 Sprawdzam zmiany w sklepie...")
-                    self.shop.update_shop_post_if_changed()
-                    
-                    # Sprawdzaj co 5 minut
-                    time.sleep(300)
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd monitorowania sklepu: {e}")
-                    time.sleep(300)  # Spróbuj ponownie za 5 minut
+        """Rejestruje w harmonogramie monitorowanie zmian w sklepie i automatyczne aktualizacje Discord"""
+        def shop_monitor_job():
+            self.shop.update_shop_post_if_changed()
         
-        shop_thread = threading.Thread(target=shop_monitor_loop, daemon=True)
-        shop_thread.start()
+        # Porównanie wersji katalogu - pierwsze po 30 sekundach, potem co minutę
+        self.scheduler.add_job('shop_monitor', shop_monitor_job, interval=60, delay=30,
+                               jitter=10, timeout=120, max_backoff=300)
         safe_print(f"🛒 Monitor zmian w sklepie uruchomiony")
 
-    def start_spotify_token_refresher(self):
-        """Uruchamia automatyczne odświeżanie tokenu Spotify co 2 minuty"""
-        def spotify_refresher_loop():
-            # Pierwsze uruchomienie po 30 sekundach
-            time.sleep(30)
-            
-            while True:
-                try:
-                    if self.spotify_enabled and self.token_info:
-                        safe_print(f"🎵 Sprawdzam token Spotify...")
-                        self.ensure_token_valid()
-                    
-                    # Sprawdzaj co 2 minuty (120 sekund)
-                    time.sleep(120)
-                    
-                except Exception as e:
-                    safe_print(f"❌ Błąd automatycznego odświeżania Spotify: {e}")
-                    time.sleep(120)  # Spróbuj ponownie za 2 minuty
-        
-        spotify_thread = threading.Thread(target=spotify_refresher_loop, daemon=True)
-        spotify_thread.start()
-        safe_print(f"🎵 Automatyczne odświeżanie tokenu Spotify uruchomione (co 2 minuty)")
+    def on_track_change(self, track):
+        """Zmiana utworu na Spotify - odśwież dane dla web panelu"""
+        if track:
+            safe_print(f"🎵 Teraz gra: {track['name']} - {track['artists']}")
+        self.save_bot_data()
 
     def save_bot_data(self):
         """Zapisuje dane bota do pliku JSON dla web API"""
@@ -1708,11 +1529,32 @@ class TwitchBot:
                 'vips': list(self.vips) if hasattr(self, 'vips') else [],
                 'trusted_users': list(self.trusted_users) if hasattr(self, 'trusted_users') else [],
                 'spotify_enabled': getattr(self, 'spotify_enabled', False),
+                'spotify': self.spotify.get_stats() if getattr(self, 'spotify', None) else {},
+                'song_queue': self.song_queue.get_snapshot()['stats'] if getattr(self, 'song_queue', None) else {},
+                'now_playing': self.now_playing.get_current(refresh=False) if getattr(self, 'now_playing', None) else None,
+                'now_playing_stats': self.now_playing.get_stats() if getattr(self, 'now_playing', None) else {},
+                'helix_metrics': self.helix.get_metrics() if hasattr(self, 'helix') else {},
+                'cadence': self.cadence.get_stats() if hasattr(self, 'cadence') else {},
+                'breakers': get_breakers_stats(),
+                'webhook_outbox': get_outboxes_stats(),
+                'discord_gateway': get_gateway_stats(),
+                'role_expiry': get_role_expiry_stats(),
+                'member_index': get_member_index_stats(),
+                'leaderboard_cache': get_leaderboard_cache_stats(),
+                'event_bus': get_event_bus_stats(),
+                'data_service': get_data_service_stats(),
+                'metadata_cache': self.metadata_cache.stats() if hasattr(self, 'metadata_cache') else {},
+                'scheduler': self.scheduler.get_stats() if hasattr(self, 'scheduler') else {},
+                'rate_limiter': self.limiter.stats() if hasattr(self, 'limiter') else {},
                 'last_updated': datetime.now().isoformat()
             }
             
             with open('bot_data.json', 'w', encoding='utf-8') as f:
                 json.dump(bot_data, f, ensure_ascii=False, indent=2)
+            
+            # Web API dostaje stan od razu ze zdarzenia, plik zostaje dla startu i gdy szyna nie działa
+            if getattr(self, 'bus', None):
+                self.bus.publish('bot_health', **bot_data)
                 
         except Exception as e:
             safe_print(f"❌ Błąd zapisywania danych bota: {e}")
@@ -5,7 +5,7 @@
 Backend API dla web-based panelu kontrolnego
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, Response
 from flask_cors import CORS
 import subprocess
 import psutil
@@ -13,13 +13,23 @@ import time
 import os
 import sys
 import sqlite3
+import base64
+import hmac
+import hashlib
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 import logging
 from pathlib import Path
 import requests
+import atexit
 from database import UserDatabase
+from leaderboard_cache import get_leaderboard_cache, get_leaderboard_cache_stats, LEADERBOARD_SNAPSHOT_SIZE
+from event_bus import get_event_bus, get_event_bus_stats, publish_database_changes
+from data_service import open_user_database, get_data_service_stats
+from live_stream import get_live_stream, get_live_stream_stats, diff_ranking
+from response_cache import get_response_cache, get_response_cache_stats
+from song_queue import SONG_QUEUE_FILE
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +43,11 @@ API_KEY = os.getenv('API_KEY', 'kranikbot-secure-key-2024')  # Używa zmiennej 
 BOT_SCRIPT = "testBot.py"
 DISCORD_BOT_SCRIPT = "discord_bot_standalone.py"
 DB_PATH = "users.db"
+SHOP_DB_PATH = "shop.db"
+RANKING_PAGE_MAX = 100   # Maksymalna liczba pozycji na stronie rankingu
+LIVE_RANKING_LIMIT = 10  # Ile pozycji rankingu panel dostaje w strumieniu na żywo
+LIVE_TOKEN_TTL = 60      # Ważność tokenu strumienia na żywo (sekundy) - wystarcza na otwarcie połączenia
+STATS_CACHE_TTL = 10     # Liczniki diagnostyczne w /api/stats (cache, szyna) mogą być starsze o tyle sekund
 
 # Globalne zmienne stanu
 bot_processes = {
@@ -65,6 +80,20 @@ def check_auth(request):
     
     return False
 
+def create_stream_token():
+    """Krótkotrwały token strumienia na żywo - podpisany kluczem API, więc ważny w każdym workerze"""
+    expires = int(time.time()) + LIVE_TOKEN_TTL
+    signature = hmac.new(API_KEY.encode('utf-8'), f"events:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+def check_stream_token(token):
+    """Sprawdza token strumienia (podpis i czas ważności)"""
+    expires, _, signature = (token or '').partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(API_KEY.encode('utf-8'), f"events:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
 def find_python_executable():
     """Znajduje python.exe w systemie"""
     python_executable = sys.executable
@@ -120,6 +149,23 @@ def detect_existing_bot(script_name):
         safe_print(f"❌ Błąd wykrywania bota: {e}")
     return None
 
+def get_bots_status():
+    """Status botów dla strumienia na żywo - czas startu zamiast uptime (panel liczy uptime sam)"""
+    result = {}
+    for bot_type in ['twitch', 'discord']:
+        bot_info = bot_processes[bot_type]
+        start_time = bot_info['start_time']
+        result[bot_type] = {
+            'status': bot_info['status'],
+            'pid': bot_info['pid'],
+            'started_at': start_time.timestamp() if start_time else None
+        }
+    return result
+
+def get_bots_version():
+    """Wersja stanu procesów botów (do cache odpowiedzi)"""
+    return tuple((bot_type, info['status'], info['pid'], info['start_time']) for bot_type, info in bot_processes.items())
+
 def get_bot_uptime(start_time):
     """Oblicza uptime bota"""
     if not start_time:
@@ -237,28 +283,13 @@ def get_database_stats():
         if not os.path.exists(DB_PATH):
             return {'total_users': 0, 'total_points': 0, 'top_user': 'Brak danych'}
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Łączna liczba użytkowników
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        # Łączne punkty
-        cursor.execute("SELECT SUM(points) FROM users")
-        total_points_result = cursor.fetchone()[0]
-        total_points = total_points_result if total_points_result else 0
-        
-        # Top użytkownik
-        cursor.execute("SELECT username FROM users ORDER BY points DESC LIMIT 1")
-        top_user_result = cursor.fetchone()
-        top_user = top_user_result[0] if top_user_result else 'Brak danych'
-        
-        conn.close()
+        # Wspólny snapshot rankingu - zapytania do bazy tylko po zmianie wersji danych
+        snapshot = get_leaderboard_cache(get_db()).get_snapshot()
+        top_user = snapshot.rows[0][0] if snapshot.rows else 'Brak danych'
         
         return {
-            'total_users': total_users,
-            'total_points': total_points,
+            'total_users': snapshot.total_users,
+            'total_points': snapshot.total_points or 0,
             'top_user': top_user
         }
         
@@ -266,8 +297,139 @@ def get_database_stats():
         safe_print(f"❌ Błąd pobierania statystyk bazy danych: {e}")
         return {'total_users': 'Błąd', 'total_points': 'Błąd', 'top_user': 'Błąd'}
 
+# Ostatni stan bota ze zdarzenia bot_health (szyna zdarzeń) - zamiast czytania pliku przy każdym zapytaniu
+latest_bot_data = None
+
+def on_bot_health(data, event):
+    global latest_bot_data
+    latest_bot_data = data
+
+event_bus_subscribed = False
+event_bus_lock = threading.Lock()
+
+def get_event_bus_client():
+    """Szyna zdarzeń procesu web API (łączy się przy pierwszym użyciu)"""
+    global event_bus_subscribed
+    bus = get_event_bus('web_api')
+    with event_bus_lock:
+        if not event_bus_subscribed:
+            bus.subscribe('bot_health', on_bot_health, replay_latest=True)
+            event_bus_subscribed = True
+    return bus
+
+database_lock = threading.Lock()
+
+def get_db():
+    """Baza użytkowników (lub klient usługi danych) - jedna na worker, tworzona przy pierwszym użyciu.
+    
+    Każdy wątek workera trzyma własne połączenie z puli, sprzątanie backupów i plików WAL robi proces bota.
+    """
+    db = app.extensions.get('user_database')
+    if db is not None:
+        return db
+    with database_lock:
+        db = app.extensions.get('user_database')
+        if db is None:
+            db = open_user_database(db_path=DB_PATH, pooled=True, maintenance=False)
+            if isinstance(db, UserDatabase):
+                # Zmiany punktów z panelu trafiają na szynę zdarzeń (klient usługi danych - zgłasza właściciel bazy)
+                publish_database_changes(db, get_event_bus_client())
+            app.extensions['user_database'] = db
+            safe_print("🗄️ Otwarto bazę użytkowników dla workera web API")
+    return db
+
+@app.teardown_appcontext
+def release_database(exception=None):
+    """Po każdym zapytaniu zwalnia połączenie wątku (niezatwierdzona transakcja jest wycofywana)"""
+    db = app.extensions.get('user_database')
+    if db is not None and hasattr(db, 'release_connection'):
+        try:
+            db.release_connection()
+        except Exception as e:
+            safe_print(f"⚠️ Błąd zwalniania połączenia z bazą: {e}")
+
+@atexit.register
+def close_database():
+    """Zamyka połączenia z bazą przy zamykaniu workera"""
+    db = app.extensions.pop('user_database', None)
+    if db is not None and hasattr(db, 'close'):
+        db.close()
+
+def get_panel_stats(bot_data=None):
+    """Statystyki wyświetlane w panelu (Twitch i baza danych)"""
+    if bot_data is None:
+        bot_data = get_bot_data()
+    return {
+        'twitch': {
+            'followers': len(bot_data.get('followers', [])),
+            'subscribers': len(bot_data.get('subscribers', [])),
+            'vips': bot_data.get('vips', []),  # Zwracamy listę VIPów
+            'moderators': bot_data.get('moderators', []),  # Zwracamy listę moderatorów
+            'trusted_users': len(bot_data.get('trusted_users', [])),
+            'spotify_enabled': bot_data.get('spotify_enabled', False),
+            'now_playing': bot_data.get('now_playing')
+        },
+        'discord': {
+            'status': 'N/A'  # Wymagałoby integracji z Discord API
+        },
+        'database': get_database_stats()
+    }
+
+def get_live_ranking():
+    """Ranking dla strumienia na żywo (pełny stan - zmiany liczy diff_ranking)"""
+    return {**get_leaderboard_cache(get_db()).json(LIVE_RANKING_LIMIT), 'full': True}
+
+live_stream_lock = threading.Lock()
+
+def get_live_stream_server():
+    """Strumień zmian workera: status botów, statystyki i ranking, sprawdzane po zdarzeniach z szyny"""
+    stream = get_live_stream()
+    with live_stream_lock:
+        if not stream.channels:
+            stream.add_channel('status', get_bots_status)
+            stream.add_channel('stats', get_panel_stats)
+            stream.add_channel('ranking', get_live_ranking, diff=diff_ranking, ignore=('data_version', 'generated_at'))
+            bus = get_event_bus_client()
+            for event_type in ['points_changed', 'bot_health', 'follower_added', 'stream_status']:
+                bus.subscribe(event_type, lambda data, event: stream.wake())
+    return stream
+
+def get_bot_data_version():
+    """Wersja danych bota bez czytania pliku - ostatnie zdarzenie bot_health albo czas modyfikacji pliku"""
+    get_event_bus_client()
+    if latest_bot_data is not None:
+        return ('bus', latest_bot_data.get('last_updated'))
+    try:
+        return ('file', os.path.getmtime('bot_data.json'))
+    except OSError:
+        return None
+
+def get_data_version():
+    """Wersja danych bazy (do cache odpowiedzi) - None gdy baza nie odpowiada"""
+    try:
+        return get_db().get_data_version()
+    except Exception as e:
+        safe_print(f"❌ Błąd odczytu wersji danych: {e}")
+        return None
+
+def cached_json(endpoint, version, build):
+    """Odpowiedź JSON z cache (endpoint + parametry zapytania, ważna dla wersji danych) z ETag i 304"""
+    cache = get_response_cache()
+    params = tuple(sorted((key, value) for key, value in request.args.items(multi=True)))
+    entry = cache.get(endpoint, params, version, lambda: (app.json.dumps(build()) + "\n").encode('utf-8'))
+    
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # Przeglądarka zawsze pyta z If-None-Match
+    if request.if_none_match.contains(entry.etag):
+        cache.record_not_modified(endpoint)
+    return response.make_conditional(request)
+
 def get_bot_data():
-    """Pobiera dane bota z pliku JSON"""
+    """Pobiera dane bota (ostatnie zdarzenie bot_health, a bez niego plik JSON)"""
+    get_event_bus_client()
+    if latest_bot_data is not None:
+        return latest_bot_data
     try:
         if os.path.exists('bot_data.json'):
             with open('bot_data.json', 'r', encoding='utf-8') as f:
@@ -368,6 +530,19 @@ def api_status():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/health', methods=['GET'])
+def api_health():
+    """Stan bazy danych workera (nie wymaga autoryzacji) - 503 gdy baza nie odpowiada"""
+    try:
+        database = get_db().health_check()
+    except Exception as e:
+        database = {'ok': False, 'error': str(e)}
+    return jsonify({
+        'status': 'ok' if database['ok'] else 'error',
+        'database': database,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if database['ok'] else 503
+
 @app.route('/api/debug', methods=['GET'])
 def api_debug():
     """Debug endpoint - nie wymaga autoryzacji"""
@@ -394,16 +569,19 @@ def api_bots_status():
     if not check_auth(request):
         return jsonify({'error': 'Unauthorized'}), 401
     
-    result = {}
-    for bot_type in ['twitch', 'discord']:
-        bot_info = bot_processes[bot_type]
-        result[bot_type] = {
-            'status': bot_info['status'],
-            'pid': bot_info['pid'],
-            'uptime': get_bot_uptime(bot_info['start_time'])
-        }
+    def build():
+        result = {}
+        for bot_type in ['twitch', 'discord']:
+            bot_info = bot_processes[bot_type]
+            result[bot_type] = {
+                'status': bot_info['status'],
+                'pid': bot_info['pid'],
+                'uptime': get_bot_uptime(bot_info['start_time'])
+            }
+        return result
     
-    return jsonify(result)
+    # Uptime zmienia się co sekundę - odpowiedź jest wspólna dla zapytań z tej samej sekundy
+    return cached_json('bots_status', (get_bots_version(), int(time.time())), build)
 
 @app.route('/api/action', methods=['POST'])
 def api_action():
@@ -433,6 +611,9 @@ def api_action():
     else:
         return jsonify({'error': 'Nieznana akcja'}), 400
     
+    # Panele na żywo dostają nowy status od razu
+    get_live_stream().wake()
+    
     if result['success']:
         return jsonify({'message': result['message']})
     else:
@@ -444,24 +625,123 @@ def api_stats():
     if not check_auth(request):
         return jsonify({'error': 'Unauthorized'}), 401
     
-    db_stats = get_database_stats()
+    version = (get_data_version(), get_bot_data_version(), get_bots_version(), int(time.time() // STATS_CACHE_TTL))
+    return cached_json('stats', version, build_stats)
+
+def build_stats():
+    """Treść /api/stats"""
     bot_data = get_bot_data()
     
-    return jsonify({
-        'twitch': {
-            'followers': len(bot_data.get('followers', [])),
-            'subscribers': len(bot_data.get('subscribers', [])),
-            'vips': bot_data.get('vips', []),  # Zwracamy listę VIPów
-            'moderators': bot_data.get('moderators', []),  # Zwracamy listę moderatorów
-            'trusted_users': len(bot_data.get('trusted_users', [])),
-            'spotify_enabled': bot_data.get('spotify_enabled', False)
+    return {
+        **get_panel_stats(bot_data),
+        'leaderboard_cache': {
+            'bot': bot_data.get('leaderboard_cache', {}),
+            'api': get_leaderboard_cache_stats()
         },
-        'discord': {
-            'status': 'N/A'  # Wymagałoby integracji z Discord API
+        'event_bus': {
+            'bot': bot_data.get('event_bus', {}),
+            'api': get_event_bus_stats()
+        },
+        'data_service': {
+            'bot': bot_data.get('data_service', {}),
+            'api': get_data_service_stats()
         },
-        'database': db_stats,
+        'live_stream': get_live_stream_stats(),
+        'response_cache': get_response_cache_stats(),
         'last_updated': bot_data.get('last_updated')
+    }
+
+@app.route('/api/events/token', methods=['POST'])
+def api_events_token():
+    """Token do otwarcia strumienia na żywo (klucz API nie trafia do adresu i logów dostępu)"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'token': create_stream_token(), 'expires_in': LIVE_TOKEN_TTL})
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """Strumień zmian na żywo (Server-Sent Events): status, stats, ranking i heartbeat"""
+    # EventSource w przeglądarce nie wysyła nagłówków - krótkotrwały token z POST /api/events/token
+    if not check_auth(request) and not check_stream_token(request.args.get('token')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    stream = get_live_stream_server()
+    # Strumień zajmuje wątek workera - ponad limit panel odświeża dane co interwał
+    if not stream.open():
+        return jsonify({'error': 'Za dużo strumieni na żywo'}), 503, {'Retry-After': '60'}
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(stream.stream(last_event_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Bez buforowania odpowiedzi przez proxy
     })
+    response.call_on_close(stream.release)
+    return response
+
+@app.route('/api/scheduler', methods=['GET'])
+def api_scheduler():
+    """Statystyki zadań harmonogramu bota (uruchomienia, błędy, czasy, następne wykonanie)"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    bot_data = get_bot_data()
+
+    return jsonify({
+        'jobs': bot_data.get('scheduler', {}),
+        'cadence': bot_data.get('cadence', {}),
+        'role_expiry': bot_data.get('role_expiry', {}),
+        'last_updated': bot_data.get('last_updated')
+    })
+
+@app.route('/api/breakers', methods=['GET'])
+def api_breakers():
+    """Stan bezpieczników usług zewnętrznych bota (Helix, Spotify, Discord)"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    bot_data = get_bot_data()
+    breakers = bot_data.get('breakers', {})
+
+    return jsonify({
+        'breakers': breakers,
+        'degraded': sorted(name for name, stats in breakers.items() if stats.get('state') != 'closed'),
+        'webhook_outbox': bot_data.get('webhook_outbox', {}),
+        'discord_gateway': bot_data.get('discord_gateway', {}),
+        'last_updated': bot_data.get('last_updated')
+    })
+
+@app.route('/api/songs/now-playing', methods=['GET'])
+def api_now_playing():
+    """Aktualnie grany utwór (z cache bota Twitch)"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    bot_data = get_bot_data()
+
+    return jsonify({
+        'track': bot_data.get('now_playing'),
+        'stats': bot_data.get('now_playing_stats', {}),
+        'last_updated': bot_data.get('last_updated')
+    })
+
+@app.route('/api/songs/queue', methods=['GET'])
+def api_song_queue():
+    """Kolejka próśb o piosenki (oczekujące na wysłanie do Spotify i ostatnio wysłane)"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        if not os.path.exists(SONG_QUEUE_FILE):
+            return jsonify({'queue': [], 'history': [], 'stats': {}, 'last_updated': None})
+        with open(SONG_QUEUE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # Najnowsze wysłane utwory na początku
+        data['history'] = list(reversed(data.get('history', [])))
+        return jsonify(data)
+    except Exception as e:
+        safe_print(f"❌ Błąd odczytu kolejki piosenek: {e}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/users/points/add', methods=['POST'])
 def api_add_points():
@@ -480,8 +760,7 @@ def api_add_points():
         return jsonify({'error': 'Punkty muszą być liczbą większą od 0'}), 400
     
     try:
-        # Inicjalizuj bazę danych
-        db = UserDatabase()
+        db = get_db()
         
         # Dodaj punkty
         db.add_points(username, points, is_follower=True)
@@ -510,51 +789,56 @@ def api_get_logs():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        # Symulowane logi systemu (w rzeczywistej implementacji można czytać z pliku logów)
-        logs = [
-            {
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'type': 'info',
-                'message': '🚀 Web API Server działa'
-            },
-            {
-                'timestamp': (datetime.now() - timedelta(minutes=1)).strftime('%H:%M:%S'),
-                'type': 'success',
-                'message': '✅ Połączenie z bazą danych OK'
-            },
-            {
-                'timestamp': (datetime.now() - timedelta(minutes=2)).strftime('%H:%M:%S'),
-                'type': 'info',
-                'message': f'🔑 API Key: {API_KEY[:10]}...'
-            }
-        ]
-        
-        # Dodaj informacje o botach
-        for bot_type, bot_info in bot_processes.items():
-            if bot_info['status'] == 'online':
-                uptime = get_bot_uptime(bot_info['start_time'])
-                logs.append({
-                    'timestamp': (datetime.now() - timedelta(minutes=3)).strftime('%H:%M:%S'),
-                    'type': 'success',
-                    'message': f'✅ {bot_type.title()} Bot działa (uptime: {uptime})'
-                })
-            else:
-                logs.append({
-                    'timestamp': (datetime.now() - timedelta(minutes=3)).strftime('%H:%M:%S'),
-                    'type': 'warning',
-                    'message': f'⚠️ {bot_type.title()} Bot offline'
-                })
-        
-        return jsonify({
-            'success': True,
-            'logs': logs,
-            'total_logs': len(logs)
-        })
+        # Znaczniki czasu i uptime zmieniają się co sekundę - odpowiedź wspólna dla zapytań z tej samej sekundy
+        return cached_json('logs', (get_bots_version(), int(time.time())), build_logs)
         
     except Exception as e:
         safe_print(f"❌ Błąd pobierania logów: {e}")
         return jsonify({'error': f'Błąd pobierania logów: {str(e)}'}), 500
 
+def build_logs():
+    """Treść /api/logs"""
+    # Symulowane logi systemu (w rzeczywistej implementacji można czytać z pliku logów)
+    logs = [
+        {
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'type': 'info',
+            'message': '🚀 Web API Server działa'
+        },
+        {
+            'timestamp': (datetime.now() - timedelta(minutes=1)).strftime('%H:%M:%S'),
+            'type': 'success',
+            'message': '✅ Połączenie z bazą danych OK'
+        },
+        {
+            'timestamp': (datetime.now() - timedelta(minutes=2)).strftime('%H:%M:%S'),
+            'type': 'info',
+            'message': f'🔑 API Key: {API_KEY[:10]}...'
+        }
+    ]
+    
+    # Dodaj informacje o botach
+    for bot_type, bot_info in bot_processes.items():
+        if bot_info['status'] == 'online':
+            uptime = get_bot_uptime(bot_info['start_time'])
+            logs.append({
+                'timestamp': (datetime.now() - timedelta(minutes=3)).strftime('%H:%M:%S'),
+                'type': 'success',
+                'message': f'✅ {bot_type.title()} Bot działa (uptime: {uptime})'
+            })
+        else:
+            logs.append({
+                'timestamp': (datetime.now() - timedelta(minutes=3)).strftime('%H:%M:%S'),
+                'type': 'warning',
+                'message': f'⚠️ {bot_type.title()} Bot offline'
+            })
+    
+    return {
+        'success': True,
+        'logs': logs,
+        'total_logs': len(logs)
+    }
+
 @app.route('/api/users/points/remove', methods=['POST'])
 def api_remove_points():
     """Usuwa punkty użytkownikowi"""
@@ -574,8 +858,7 @@ def api_remove_points():
         return jsonify({'error': 'Punkty muszą być liczbą większą lub równą 0'}), 400
     
     try:
-        # Inicjalizuj bazę danych
-        db = UserDatabase()
+        db = get_db()
         
         # Pobierz aktualne punkty użytkownika
         current_points = db.get_user_points(username)
@@ -614,34 +897,116 @@ def api_get_ranking():
     try:
         # Pobierz limit z parametrów (domyślnie 20)
         limit = request.args.get('limit', 20, type=int)
-        if limit > 50:  # Maksymalnie 50 użytkowników
-            limit = 50
+        limit = max(1, min(limit, RANKING_PAGE_MAX))
         
-        # Inicjalizuj bazę danych
-        db = UserDatabase()
+        # Kolejna strona: kursor z next_cursor poprzedniej odpowiedzi
+        cursor = request.args.get('cursor')
+        after = decode_ranking_cursor(cursor) if cursor else None
+        if cursor and after is None:
+            return jsonify({'error': 'Nieprawidłowy kursor'}), 400
         
-        # Pobierz ranking
-        top_users = db.get_top_users(limit)
+        db = get_db()
+        version = db.get_data_version()
         
-        # Formatuj dane
-        ranking = []
-        for i, (username, points, messages) in enumerate(top_users):
-            ranking.append({
-                'position': i + 1,
-                'username': username,
-                'points': points,
-                'messages': messages
-            })
+        return cached_json('ranking', version, lambda: build_ranking_page(db, limit, after, version))
+        
+    except Exception as e:
+        safe_print(f"❌ Błąd pobierania rankingu: {e}")
+        return jsonify({'error': f'Błąd pobierania rankingu: {str(e)}'}), 500
+
+def encode_ranking_cursor(entry):
+    """Kursor strony rankingu - klucz (punkty, nazwa) i miejsce ostatniej pozycji"""
+    key = json.dumps([entry['points'], entry['username'], entry['position']], ensure_ascii=False)
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_ranking_cursor(cursor):
+    """Zwraca (punkty, nazwa, miejsce) z kursora albo None, gdy kursor jest nieprawidłowy"""
+    try:
+        points, username, position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(points, int) or not isinstance(username, str) or not isinstance(position, int):
+        return None
+    return points, username, position
+
+def build_ranking_page(db, limit, after, version):
+    """Strona rankingu: pierwsza ze wspólnego snapshotu, kolejne zapytaniem po kluczu (punkty, nazwa)"""
+    cache = get_leaderboard_cache(db)
+    if after is None and limit <= LEADERBOARD_SNAPSHOT_SIZE:
+        page = cache.json(limit)
+        # Snapshot nie wie, czy za nim są kolejne pozycje - kursor, gdy strona jest pełna
+        has_more = len(page['ranking']) == limit
+    else:
+        position = after[2] if after else 0
+        if after:
+            rows = db.get_ranking_page(limit + 1, after[0], after[1])
+        else:
+            rows = db.get_ranking_page(limit + 1)
+        has_more = len(rows) > limit
+        ranking = [
+            {'position': position + i, 'username': username, 'points': points, 'messages': messages}
+            for i, (username, points, messages) in enumerate(rows[:limit], 1)
+        ]
+        page = {
+            'ranking': ranking,
+            'total_users': cache.get_snapshot().total_users,  # Ta sama liczba na każdej stronie
+            'data_version': version,
+            'generated_at': datetime.now(timezone.utc).isoformat()
+        }
+    
+    return {
+        'success': True,
+        **page,
+        'next_cursor': encode_ranking_cursor(page['ranking'][-1]) if has_more and page['ranking'] else None
+    }
+
+def get_active_purchases(username):
+    """Aktywne zakupy użytkownika (shop.db tylko do odczytu - bazą sklepu zarządza bot)"""
+    try:
+        conn = sqlite3.connect(f'file:{SHOP_DB_PATH}?mode=ro', uri=True, timeout=10.0)
+    except sqlite3.OperationalError:
+        return []  # Sklep jeszcze nie utworzył bazy
+    
+    try:
+        cursor = conn.execute('''
+            SELECT reward_id, purchase_time, expires_at, used FROM purchases 
+            WHERE username = ? AND is_active = 1 AND expires_at > ?
+            ORDER BY expires_at ASC
+        ''', (username, datetime.now().isoformat()))
+        return [
+            {'reward_id': reward_id, 'purchased_at': purchase_time, 'expires_at': expires_at, 'used': bool(used)}
+            for reward_id, purchase_time, expires_at, used in cursor.fetchall()
+        ]
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+@app.route('/api/users/<username>', methods=['GET'])
+def api_get_user(username):
+    """Dane użytkownika: punkty, miejsce w rankingu, wiadomości, statystyki gier i aktywne zakupy"""
+    if not check_auth(request):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        db = get_db()
+        username = username.strip()
+        
+        profile = db.get_user_profile(username)
+        if profile is None and username.lower() != username:
+            profile = db.get_user_profile(username.lower())
+        if profile is None:
+            return jsonify({'error': f'Nie znaleziono użytkownika {username}'}), 404
         
         return jsonify({
             'success': True,
-            'ranking': ranking,
-            'total_users': len(ranking)
+            **profile,
+            'purchases': get_active_purchases(profile['username'])
         })
-        
+    
     except Exception as e:
-        safe_print(f"❌ Błąd pobierania rankingu: {e}")
-        return jsonify({'error': f'Błąd pobierania rankingu: {str(e)}'}), 500
+        safe_print(f"❌ Błąd pobierania użytkownika: {e}")
+        return jsonify({'error': f'Błąd pobierania użytkownika: {str(e)}'}), 500
 
 @app.route('/favicon.ico')
 def favicon():
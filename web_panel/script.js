@@ -7,6 +7,14 @@ let apiKey = '';
 let autoRefreshInterval = null;
 let isConnected = false;
 
+// Strumień na żywo (/api/events) - serwer wysyła tylko zmiany
+let liveSource = null;
+let liveAttempt = 0;       // Zwiększany przy zamknięciu strumienia - przerywa trwające otwieranie
+let uptimeTimer = null;
+let serverTimeOffset = 0;  // Różnica zegara serwera i przeglądarki (z heartbeatów)
+let botStartTimes = {};    // Czas startu botów (sekundy, zegar serwera)
+let liveRanking = [];
+
 // Inicjalizacja po załadowaniu strony
 document.addEventListener('DOMContentLoaded', function() {
     loadSettings();
@@ -276,12 +284,39 @@ function updateBotStatus(botType, status, pid, uptime) {
 async function refreshAllData() {
     await Promise.all([
         refreshBotStatus(),
-        refreshStats()
+        refreshStats(),
+        refreshRanking()
     ]);
     
     document.getElementById('lastUpdate').textContent = new Date().toLocaleTimeString();
 }
 
+// Uptime liczony w przeglądarce z czasu startu - serwer nie wysyła zmian co sekundę
+function formatUptime(startedAt) {
+    if (!startedAt) return '00:00:00';
+    const seconds = Math.max(0, Math.floor(Date.now() / 1000 + serverTimeOffset - startedAt));
+    const hours = Math.floor(seconds / 3600);
+    const minutes = Math.floor((seconds % 3600) / 60);
+    return [hours, minutes, seconds % 60].map(value => String(value).padStart(2, '0')).join(':');
+}
+
+function renderUptimes() {
+    for (const botType of Object.keys(botStartTimes)) {
+        const uptimeElement = document.getElementById(`${botType}Uptime`);
+        if (uptimeElement && botStartTimes[botType]) {
+            uptimeElement.textContent = formatUptime(botStartTimes[botType]);
+        }
+    }
+}
+
+function applyLiveStatus(data) {
+    for (const botType of ['twitch', 'discord']) {
+        const bot = data[botType];
+        botStartTimes[botType] = bot.status === 'online' ? bot.started_at : null;
+        updateBotStatus(botType, bot.status, bot.pid, formatUptime(botStartTimes[botType]));
+    }
+}
+
 async function refreshBotStatus() {
     if (!isConnected) return;
 
@@ -313,33 +348,92 @@ async function refreshStats() {
         });
 
         if (response.ok) {
-            const data = await response.json();
-            
-            // Aktualizuj statystyki Twitch
-            document.getElementById('twitchFollowers').textContent = data.twitch.followers || 'N/A';
-            document.getElementById('twitchSubs').textContent = data.twitch.subscribers || 'N/A';
-            
-            // Aktualizuj liczby VIPów i moderatorów
-            const vipCount = Array.isArray(data.twitch.vips) ? data.twitch.vips.length : (data.twitch.vips || 0);
-            const modCount = Array.isArray(data.twitch.moderators) ? data.twitch.moderators.length : (data.twitch.moderators || 0);
-            
-            document.getElementById('twitchVips').textContent = vipCount;
-            document.getElementById('twitchMods').textContent = modCount;
-            
-            // Aktualizuj listy VIPów i moderatorów
-            updateUserList('vipList', data.twitch.vips, 'vip');
-            updateUserList('modList', data.twitch.moderators, 'mod');
-            
-            // Aktualizuj statystyki bazy danych
-            document.getElementById('totalUsers').textContent = data.database.total_users || 'N/A';
-            document.getElementById('totalPoints').textContent = data.database.total_points || 'N/A';
-            document.getElementById('topUser').textContent = data.database.top_user || 'N/A';
+            applyStats(await response.json());
         }
     } catch (error) {
         console.error('Error refreshing stats:', error);
     }
 }
 
+function applyStats(data) {
+    // Aktualizuj statystyki Twitch
+    document.getElementById('twitchFollowers').textContent = data.twitch.followers || 'N/A';
+    document.getElementById('twitchSubs').textContent = data.twitch.subscribers || 'N/A';
+    
+    // Aktualizuj liczby VIPów i moderatorów
+    const vipCount = Array.isArray(data.twitch.vips) ? data.twitch.vips.length : (data.twitch.vips || 0);
+    const modCount = Array.isArray(data.twitch.moderators) ? data.twitch.moderators.length : (data.twitch.moderators || 0);
+    
+    document.getElementById('twitchVips').textContent = vipCount;
+    document.getElementById('twitchMods').textContent = modCount;
+    
+    // Aktualny utwór z cache bota
+    const track = data.twitch.now_playing;
+    document.getElementById('nowPlaying').textContent = track ? `${track.name} - ${track.artists}` : '-';
+    
+    // Aktualizuj listy VIPów i moderatorów
+    updateUserList('vipList', data.twitch.vips, 'vip');
+    updateUserList('modList', data.twitch.moderators, 'mod');
+    
+    // Aktualizuj statystyki bazy danych
+    document.getElementById('totalUsers').textContent = data.database.total_users || 'N/A';
+    document.getElementById('totalPoints').textContent = data.database.total_points || 'N/A';
+    document.getElementById('topUser').textContent = data.database.top_user || 'N/A';
+}
+
+async function refreshRanking() {
+    if (!isConnected) return;
+
+    try {
+        const response = await fetch(`${serverUrl}/api/users/ranking?limit=10`, {
+            headers: {
+                'Authorization': `Bearer ${apiKey}`
+            }
+        });
+
+        if (response.ok) {
+            const data = await response.json();
+            applyRanking({ ...data, full: true });
+        }
+    } catch (error) {
+        console.error('Error refreshing ranking:', error);
+    }
+}
+
+// Ranking: pełny stan albo zmiany (changed - nowe/zmienione pozycje, removed - użytkownicy spoza rankingu)
+function applyRanking(data) {
+    if (data.full) {
+        liveRanking = data.ranking;
+    } else {
+        const changed = new Set(data.changed.map(entry => entry.username));
+        const removed = new Set(data.removed);
+        liveRanking = liveRanking
+            .filter(entry => !changed.has(entry.username) && !removed.has(entry.username))
+            .concat(data.changed)
+            .sort((a, b) => a.position - b.position);
+    }
+    renderRanking();
+}
+
+function renderRanking() {
+    const listElement = document.getElementById('rankingList');
+    
+    if (!listElement) return;
+    
+    if (liveRanking.length === 0) {
+        listElement.innerHTML = '<div class="no-users">Ranking jest pusty</div>';
+        return;
+    }
+    
+    listElement.innerHTML = liveRanking.map(entry => `
+        <div class="user-item">
+            <span class="badge">${entry.position}.</span>
+            <span class="username">${entry.username}</span>
+            <span>${entry.points} pkt</span>
+        </div>
+    `).join('');
+}
+
 // Funkcja do aktualizacji list użytkowników (VIPy, moderatorzy)
 function updateUserList(elementId, users, type) {
     const listElement = document.getElementById(elementId);
@@ -367,10 +461,18 @@ function refreshStatus() {
     checkServerConnection();
 }
 
-// Auto-refresh
+// Auto-refresh: strumień na żywo, a bez EventSource (lub gdy serwer go odrzuci) - odpytywanie co interwał
 function startAutoRefresh() {
     stopAutoRefresh();
     
+    if (window.EventSource) {
+        startLiveStream();
+    } else {
+        startPolling();
+    }
+}
+
+function startPolling() {
     const interval = parseInt(document.getElementById('refreshInterval').value) * 1000;
     autoRefreshInterval = setInterval(() => {
         if (isConnected) {
@@ -386,6 +488,110 @@ function stopAutoRefresh() {
         clearInterval(autoRefreshInterval);
         autoRefreshInterval = null;
     }
+    stopLiveStream();
+}
+
+async function fetchStreamToken() {
+    // EventSource nie wysyła nagłówków - krótkotrwały token zamiast klucza API w adresie
+    const response = await fetch(`${serverUrl}/api/events/token`, {
+        method: 'POST',
+        headers: {
+            'Authorization': `Bearer ${apiKey}`
+        }
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    return (await response.json()).token;
+}
+
+function fallbackToPolling() {
+    // Serwer odrzucił strumień (limit strumieni, starsza wersja API) - powrót do odpytywania
+    addLog('warning', '⚠️ Strumień na żywo niedostępny - odświeżanie co interwał');
+    stopLiveStream();
+    startPolling();
+}
+
+async function startLiveStream(lastEventId = null) {
+    const attempt = liveAttempt;
+    let token;
+    try {
+        token = await fetchStreamToken();
+    } catch (error) {
+        if (attempt === liveAttempt) fallbackToPolling();
+        return;
+    }
+    if (attempt !== liveAttempt) return;
+
+    let url = `${serverUrl}/api/events?token=${encodeURIComponent(token)}`;
+    if (lastEventId) {
+        url += `&last_event_id=${encodeURIComponent(lastEventId)}`;
+    }
+    const source = new EventSource(url);
+    let opened = false;
+    let lastId = lastEventId;
+    liveSource = source;
+
+    source.onopen = function() {
+        opened = true;
+        isConnected = true;
+        updateConnectionStatus('connected', 'Połączono (na żywo)');
+    };
+
+    source.onerror = function() {
+        if (source.readyState === EventSource.CLOSED) {
+            if (opened) {
+                // Token wygasł przed ponownym połączeniem - nowy token, brakujące zmiany od lastId
+                source.close();
+                clearInterval(uptimeTimer);
+                uptimeTimer = null;
+                startLiveStream(lastId);
+            } else {
+                fallbackToPolling();
+            }
+        } else {
+            // Przeglądarka połączy się ponownie sama i wyśle Last-Event-ID
+            updateConnectionStatus('connecting', 'Ponowne łączenie...');
+        }
+    };
+
+    source.addEventListener('heartbeat', function(event) {
+        serverTimeOffset = JSON.parse(event.data).server_time - Date.now() / 1000;
+    });
+    source.addEventListener('status', function(event) {
+        lastId = event.lastEventId || lastId;
+        applyLiveStatus(JSON.parse(event.data));
+        markUpdated();
+    });
+    source.addEventListener('stats', function(event) {
+        lastId = event.lastEventId || lastId;
+        applyStats(JSON.parse(event.data));
+        markUpdated();
+    });
+    source.addEventListener('ranking', function(event) {
+        lastId = event.lastEventId || lastId;
+        applyRanking(JSON.parse(event.data));
+        markUpdated();
+    });
+
+    uptimeTimer = setInterval(renderUptimes, 1000);
+}
+
+function stopLiveStream() {
+    liveAttempt++;
+    if (liveSource) {
+        liveSource.close();
+        liveSource = null;
+    }
+    if (uptimeTimer) {
+        clearInterval(uptimeTimer);
+        uptimeTimer = null;
+    }
+    botStartTimes = {};
+}
+
+function markUpdated() {
+    document.getElementById('lastUpdate').textContent = new Date().toLocaleTimeString();
 }
 
 // Zarządzanie zakładkami
@@ -541,31 +747,53 @@ async function searchUser() {
     resultDiv.innerHTML = '<div class="loading">🔍 Szukanie...</div>';
     
     try {
-        // Symulacja wyszukiwania - w rzeczywistości potrzebowałby endpoint do wyszukiwania
-        // Na razie pokażemy przykładowe dane
-        setTimeout(() => {
-            resultDiv.innerHTML = `
+        const response = await fetch(`${serverUrl}/api/users/${encodeURIComponent(username)}`, {
+            headers: {
+                'Authorization': `Bearer ${apiKey}`
+            }
+        });
+        const user = await response.json();
+        
+        if (response.status === 404) {
+            resultDiv.innerHTML = `<div class="loading">❓ Nie znaleziono użytkownika ${username}</div>`;
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(user.error || `HTTP ${response.status}`);
+        }
+        
+        const games = Object.entries(user.game_stats).map(([game, stats]) => `
+                    <div class="stat-row">
+                        <span>🎲 ${game}:</span>
+                        <span>${stats.wins}W / ${stats.losses}L (${stats.total_played})</span>
+                    </div>`).join('');
+        const purchases = user.purchases.map(purchase => `
+                    <div class="stat-row">
+                        <span>🎁 ${purchase.reward_id}:</span>
+                        <span>do ${new Date(purchase.expires_at).toLocaleString()}</span>
+                    </div>`).join('');
+        
+        resultDiv.innerHTML = `
                 <div class="user-info">
-                    <h4>👤 ${username}</h4>
+                    <h4>👤 ${user.username}</h4>
                     <div class="stat-row">
                         <span>💰 Punkty:</span>
-                        <span>1,234</span>
+                        <span>${user.points}</span>
                     </div>
                     <div class="stat-row">
-                        <span>💬 Wiadomości:</span>
-                        <span>567</span>
+                        <span>🏆 Miejsce w rankingu:</span>
+                        <span>${user.rank || '-'}</span>
                     </div>
                     <div class="stat-row">
-                        <span>📅 Ostatnio widziany:</span>
-                        <span>2024-01-15 14:30</span>
+                        <span>💬 Wiadomości:</span>
+                        <span>${user.messages_count}</span>
                     </div>
                     <div class="stat-row">
-                        <span>👥 Status:</span>
-                        <span>Follower</span>
-                    </div>
+                        <span>📅 Ostatnio widziany:</span>
+                        <span>${user.last_seen || '-'}</span>
+                    </div>${games}${purchases}
                 </div>
             `;
-        }, 1000);
         
     } catch (error) {
         resultDiv.innerHTML = `<div class="loading">❌ Błąd wyszukiwania: ${error.message}</div>`;
@@ -0,0 +1,309 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import atexit
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from resilience import SERVICE_TIMEOUTS, backoff_delay, get_breaker
+
+# Plik bazowy - każdy proces (bot Twitch, samodzielny bot Discord) ma własny plik kolejki
+WEBHOOK_OUTBOX_FILE = os.getenv("WEBHOOK_OUTBOX_FILE", "webhook_outbox.json")
+
+MAX_EMBEDS_PER_MESSAGE = 10  # Limit Discorda na jedno wywołanie webhooka
+MAX_EMBED_CHARS = 6000       # Limit Discorda na łączną długość tekstów embedów w jednej wiadomości
+MAX_OUTBOX_SIZE = 500        # Przy dłuższej awarii najstarsze wiadomości wypadają
+MAX_SEND_ATTEMPTS = 8        # Po tylu błędach serwera wiadomość jest porzucana
+SAVE_DELAY = 1.0             # Grupowanie zapisów pliku przy serii wiadomości
+
+def safe_print(text):
+    """Bezpieczne wyświetlanie tekstu z emoji na Windows"""
+    try:
+        print(text, flush=True)
+    except UnicodeEncodeError:
+        safe_text = text.encode('ascii', 'replace').decode('ascii')
+        print(safe_text, flush=True)
+
+def embed_length(embed):
+    """Długość embeda liczona jak przez Discorda (tytuł, opis, pola, stopka, autor)"""
+    length = len(embed.get('title') or '') + len(embed.get('description') or '')
+    length += len((embed.get('footer') or {}).get('text') or '') + len((embed.get('author') or {}).get('name') or '')
+    for field in embed.get('fields') or []:
+        length += len(field.get('name') or '') + len(field.get('value') or '')
+    return length
+
+class WebhookOutbox:
+    """Kolejka wiadomości webhooka Discord wysyłana w tle.
+
+    send() tylko dopisuje wiadomość i od razu wraca - gry i sklep nie czekają na Discorda.
+    Wątek wysyłający łączy kolejne wiadomości w jedno wywołanie (do 10 embedów),
+    respektuje Retry-After przy 429, a niewysłane wiadomości trzyma w pliku między restartami.
+    """
+
+    def __init__(self, webhook_url, path=WEBHOOK_OUTBOX_FILE):
+        self.webhook_url = webhook_url
+        self.path = path
+        self.breaker = get_breaker('discord_webhook')
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.queue = []
+        self.dirty = False
+        self.retry_at = 0.0        # time.monotonic() do którego czekamy (429 / błąd serwera)
+        self.sent_messages = 0
+        self.sent_requests = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.dropped = 0
+        self.load()
+
+        self.thread = threading.Thread(target=self._run, name='webhook-outbox', daemon=True)
+        self.thread.start()
+        atexit.register(self.flush_to_disk)
+
+    def send(self, content, embeds=None, username="KranikBot", avatar_url=None):
+        """Dodaje wiadomość do kolejki (nie blokuje)"""
+        message = {
+            'content': content or "",
+            'username': username,
+            'embeds': list(embeds or [])[:MAX_EMBEDS_PER_MESSAGE],
+            'queued_at': time.time(),
+            'attempts': 0
+        }
+        if avatar_url:
+            message['avatar_url'] = avatar_url
+        with self.wakeup:
+            self.queue.append(message)
+            if len(self.queue) > MAX_OUTBOX_SIZE:
+                overflow = len(self.queue) - MAX_OUTBOX_SIZE
+                del self.queue[:overflow]
+                self.dropped += overflow
+            self.dirty = True
+            self.wakeup.notify()
+        return True
+
+    def _next_batch(self):
+        """Wybiera wiadomości do jednego wywołania - wywoływać pod lockiem.
+
+        Do pierwszej wiadomości dołączane są kolejne bez treści tekstowej od tego samego
+        nadawcy, dopóki liczba embedów i ich łączna długość mieszczą się w limitach Discorda.
+        Wiadomości z odrzuconej partii (single) idą osobno.
+        """
+        first = self.queue[0]
+        batch = [first]
+        if first.get('single'):
+            return batch
+        embed_count = len(first['embeds'])
+        embed_chars = sum(embed_length(embed) for embed in first['embeds'])
+        for message in self.queue[1:]:
+            chars = sum(embed_length(embed) for embed in message['embeds'])
+            if (message['content'] or message['username'] != first['username']
+                    or message.get('avatar_url') != first.get('avatar_url')
+                    or not message['embeds'] or message.get('single')
+                    or embed_count + len(message['embeds']) > MAX_EMBEDS_PER_MESSAGE
+                    or embed_chars + chars > MAX_EMBED_CHARS):
+                break
+            batch.append(message)
+            embed_count += len(message['embeds'])
+            embed_chars += chars
+        return batch
+
+    def _run(self):
+        """Pętla wątku wysyłającego"""
+        while True:
+            with self.wakeup:
+                while not self.queue or time.monotonic() < self.retry_at:
+                    if self.dirty:
+                        self._save()
+                    timeout = self.retry_at - time.monotonic() if self.queue else None
+                    self.wakeup.wait(timeout)
+                if self.dirty:
+                    # Krótka pauza - kolejne wiadomości z tej samej chwili trafią do jednej partii
+                    # (notify() z send() nie skraca pauzy)
+                    deadline = time.monotonic() + SAVE_DELAY
+                    remaining = SAVE_DELAY
+                    while remaining > 0:
+                        self.wakeup.wait(remaining)
+                        remaining = deadline - time.monotonic()
+                    self._save()
+                batch = self._next_batch()
+
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                safe_print(f"❌ Błąd wątku webhooka Discord: {e}")
+                with self.lock:
+                    self.retry_at = time.monotonic() + 5
+
+    def _send_batch(self, batch):
+        """Wysyła partię jednym wywołaniem webhooka i obsługuje odpowiedź"""
+        if not self.breaker.allow():
+            with self.lock:
+                self.retry_at = time.monotonic() + 10
+            return
+
+        data = {
+            'content': batch[0]['content'],
+            'username': batch[0]['username'],
+            'embeds': [embed for message in batch for embed in message['embeds']]
+        }
+        if batch[0].get('avatar_url'):
+            data['avatar_url'] = batch[0]['avatar_url']
+
+        try:
+            response = self.session.post(self.webhook_url, json=data, timeout=SERVICE_TIMEOUTS['discord'])
+        except requests.RequestException as e:
+            self.breaker.record_failure(e)
+            self._retry_later(batch, e)
+            return
+
+        self.sent_requests += 1
+        if response.status_code == 429:
+            self.breaker.record_success()
+            self.rate_limited += 1
+            retry_after = self._retry_after(response)
+            safe_print(f"⏳ Discord webhook: limit zapytań - ponowienie za {retry_after:.1f}s")
+            with self.lock:
+                self.retry_at = time.monotonic() + retry_after
+            return
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+            self._retry_later(batch, f"HTTP {response.status_code}")
+            return
+
+        self.breaker.record_success()
+        if response.status_code >= 400 and len(batch) > 1:
+            # Odrzucona partia - wiadomości idą pojedynczo, żeby jedna błędna nie zabrała pozostałych
+            safe_print(f"⚠️ Discord odrzucił partię {len(batch)} wiadomości (HTTP {response.status_code}) - wysyłam osobno")
+            with self.lock:
+                for message in batch:
+                    message['single'] = True
+                self.dirty = True
+            return
+        if response.status_code >= 400:
+            # Błędna wiadomość - ponawianie nic nie da
+            self.failures += 1
+            self.dropped += len(batch)
+            safe_print(f"❌ Discord odrzucił wiadomość webhooka (HTTP {response.status_code}): {response.text[:200]}")
+        else:
+            self.sent_messages += len(batch)
+        self._remove(batch)
+
+    def _retry_after(self, response):
+        """Czas oczekiwania z odpowiedzi 429 (nagłówek Retry-After lub pole retry_after)"""
+        try:
+            return max(float(response.headers.get('Retry-After')), 0.5)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return max(float(response.json().get('retry_after', 5)), 0.5)
+        except Exception:
+            return 5.0
+
+    def _retry_later(self, batch, error):
+        """Odkłada partię po błędzie serwera/sieci z rosnącym opóźnieniem"""
+        self.failures += 1
+        with self.lock:
+            attempts = max(message['attempts'] for message in batch) + 1
+            for message in batch:
+                message['attempts'] += 1
+            expired = [message for message in batch if message['attempts'] >= MAX_SEND_ATTEMPTS]
+            self.retry_at = time.monotonic() + backoff_delay(attempts, base=2, cap=300)
+            self.dirty = True
+        if expired:
+            safe_print(f"❌ Porzucono {len(expired)} wiadomości webhooka po {MAX_SEND_ATTEMPTS} próbach: {error}")
+            self.dropped += len(expired)
+            self._remove(expired)
+        else:
+            safe_print(f"⚠️ Błąd webhooka Discord (próba {attempts}): {error}")
+
+    def _remove(self, batch):
+        """Usuwa wysłane/porzucone wiadomości z kolejki"""
+        with self.lock:
+            self.queue = [message for message in self.queue if not any(message is sent for sent in batch)]
+            self.dirty = True
+
+    # === ZAPIS I ODCZYT ===
+
+    def load(self):
+        """Wczytuje niewysłane wiadomości z pliku"""
+        try:
+            if not os.path.exists(self.path) and os.path.exists(WEBHOOK_OUTBOX_FILE):
+                # Wspólny plik sprzed podziału na procesy - przejmuje go jeden proces (os.replace jest atomowe)
+                try:
+                    os.replace(WEBHOOK_OUTBOX_FILE, self.path)
+                except OSError:
+                    pass
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.queue = json.load(f).get('queue', [])[-MAX_OUTBOX_SIZE:]
+                if self.queue:
+                    safe_print(f"📬 Wczytano {len(self.queue)} niewysłanych wiadomości Discord")
+        except Exception as e:
+            safe_print(f"❌ Błąd wczytywania kolejki webhooka: {e}")
+
+    def _save(self):
+        """Zapisuje kolejkę do pliku (atomowo) - wywoływać pod lockiem"""
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'queue': self.queue, 'last_updated': time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            safe_print(f"❌ Błąd zapisywania kolejki webhooka: {e}")
+
+    def flush_to_disk(self):
+        """Zapisuje niewysłane wiadomości przy zamykaniu"""
+        with self.lock:
+            if self.dirty:
+                self._save()
+
+    def get_stats(self):
+        """Zwraca statystyki wysyłki"""
+        with self.lock:
+            return {
+                'pending': len(self.queue),
+                'sent_messages': self.sent_messages,
+                'sent_requests': self.sent_requests,
+                'rate_limited': self.rate_limited,
+                'failures': self.failures,
+                'dropped': self.dropped,
+                'retry_in': round(max(self.retry_at - time.monotonic(), 0), 1)
+            }
+
+OUTBOXES = {}
+OUTBOXES_LOCK = threading.Lock()
+
+def get_outbox_path(webhook_url, role=None):
+    """Plik kolejki procesu: webhook_outbox.<skrypt>.<skrót webhooka>.json.
+
+    Procesy nie mogą dzielić pliku - każdy zapisuje tylko swoją kolejkę i nadpisywałby cudze wiadomości.
+    """
+    role = role or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+    base, ext = os.path.splitext(WEBHOOK_OUTBOX_FILE)
+    url_hash = hashlib.sha1(webhook_url.encode('utf-8')).hexdigest()[:8]
+    return f"{base}.{role}.{url_hash}{ext or '.json'}"
+
+def get_outbox(webhook_url):
+    """Zwraca wspólną kolejkę procesu dla webhooka (gry, sklep i bot używają jednej)"""
+    with OUTBOXES_LOCK:
+        outbox = OUTBOXES.get(webhook_url)
+        if outbox is None:
+            outbox = WebhookOutbox(webhook_url, get_outbox_path(webhook_url))
+            OUTBOXES[webhook_url] = outbox
+        return outbox
+
+def get_outboxes_stats():
+    """Statystyki wszystkich kolejek webhooków (dla web API)"""
+    with OUTBOXES_LOCK:
+        outboxes = list(OUTBOXES.values())
+    stats = {'pending': 0, 'sent_messages': 0, 'sent_requests': 0, 'rate_limited': 0, 'failures': 0, 'dropped': 0}
+    for outbox in outboxes:
+        for key, value in outbox.get_stats().items():
+            if key in stats:
+                stats[key] += value
+    return stats